@@ -0,0 +1,7 @@
+# api/__init__.py
+
+from .server import app
+
+__all__ = [
+    'app',
+]
@@ -0,0 +1,22 @@
+# api/__main__.py
+
+import sys
+
+from data import get_user_by_username, create_api_token
+
+if __name__ == '__main__':
+    # Usage: python -m api [serve [host] [port] | token <username> [name]]
+    command = sys.argv[1] if len(sys.argv) > 1 else 'serve'
+    if command == 'serve':
+        import uvicorn
+        from .server import app
+        host = sys.argv[2] if len(sys.argv) > 2 else '127.0.0.1'
+        port = int(sys.argv[3]) if len(sys.argv) > 3 else 8000
+        uvicorn.run(app, host=host, port=port, log_level='warning')
+    elif command == 'token' and len(sys.argv) in (3, 4):
+        user = get_user_by_username(sys.argv[2])
+        if user is None:
+            sys.exit(f"No user named {sys.argv[2]}")
+        print(create_api_token(user.user_id, sys.argv[3] if len(sys.argv) > 3 else 'default'))
+    else:
+        sys.exit("Usage: python -m api [serve [host] [port] | token <username> [name]]")
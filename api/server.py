@@ -0,0 +1,257 @@
+# api/server.py
+
+import threading
+import time
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+
+import anyio
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from config import POOL_SIZE, API_MAX_IN_FLIGHT, API_MAX_BATCH_SIZE, API_TOKEN_CACHE_SECONDS
+from data import (
+    add_activities_bulk,
+    get_activities,
+    add_category,
+    get_categories,
+    add_goal,
+    get_goals,
+    get_api_token_user,
+)
+from data.pool import enable_connection_pool, disable_connection_pool
+
+GOAL_PERIODS = ('Daily', 'Weekly', 'Monthly', 'Custom')
+
+# token -> (user_id, checked_at); a revoked token keeps working until its entry expires
+_token_cache = {}
+_token_cache_lock = threading.Lock()
+# Model calls at once; more than the pool has connections would only queue inside the pool
+_db_limiter = None
+
+
+class ApiError(Exception):
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+class InFlightLimit:
+    """
+    ASGI middleware answering 503 with Retry-After once max_in_flight requests are being handled.
+
+    Rejecting early keeps latency bounded for the accepted requests; a
+    client that backs off and retries sees its batch through instead of
+    timing out in a queue.
+    """
+
+    def __init__(self, app, max_in_flight=API_MAX_IN_FLIGHT):
+        self.app = app
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.rejected = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        if self.in_flight >= self.max_in_flight:
+            self.rejected += 1
+            response = JSONResponse({'error': 'server busy, retry later'}, status_code=503, headers={'Retry-After': '1'})
+            return await response(scope, receive, send)
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+
+async def _call(func, *args, **kwargs):
+    """Run a blocking data layer call on a worker thread, at most POOL_SIZE at a time."""
+    return await anyio.to_thread.run_sync(lambda: func(*args, **kwargs), limiter=_db_limiter)
+
+
+def _cached_token_user(token):
+    with _token_cache_lock:
+        entry = _token_cache.get(token)
+    if entry is not None and time.monotonic() - entry[1] < API_TOKEN_CACHE_SECONDS:
+        return entry[0]
+    return None
+
+
+async def _authenticate(request):
+    """Return the user_id for the request's bearer token, or raise a 401."""
+    scheme, _, token = request.headers.get('authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        raise ApiError(401, 'missing bearer token')
+    user_id = _cached_token_user(token)
+    if user_id is None:
+        user_id = await _call(get_api_token_user, token)
+        if user_id is None:
+            raise ApiError(401, 'invalid API token')
+        with _token_cache_lock:
+            _token_cache[token] = (user_id, time.monotonic())
+    return user_id
+
+
+async def _read_batch(request, key):
+    """Parse a JSON body holding a list of items, either bare or under key; returns (items, body)."""
+    try:
+        body = await request.json()
+    except ValueError:
+        raise ApiError(400, 'request body is not valid JSON')
+    items = body.get(key) if isinstance(body, dict) else body
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise ApiError(400, f"expected a list of objects under '{key}'")
+    if len(items) > API_MAX_BATCH_SIZE:
+        raise ApiError(413, f'at most {API_MAX_BATCH_SIZE} {key} per request')
+    return items, body if isinstance(body, dict) else {}
+
+
+def _is_iso(value, parse=datetime.fromisoformat):
+    """True if value is a string parse() accepts."""
+    if not isinstance(value, str):
+        return False
+    try:
+        parse(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _query_date(request, key):
+    """An optional ISO 8601 date or timestamp query parameter, or a 400."""
+    value = request.query_params.get(key)
+    if value is not None and not _is_iso(value):
+        raise ApiError(400, f'{key} must be an ISO 8601 date or timestamp')
+    return value
+
+
+def endpoint(handler):
+    """Authenticate, run the handler and turn ApiErrors, and bad input the data layer rejects, into JSON error responses."""
+    async def wrapped(request):
+        try:
+            user_id = await _authenticate(request)
+            return JSONResponse(await handler(request, user_id))
+        except ApiError as e:
+            return JSONResponse({'error': e.message}, status_code=e.status_code)
+        except (ValueError, TypeError) as e:
+            return JSONResponse({'error': f'invalid request: {e}'}, status_code=400)
+    return wrapped
+
+
+@endpoint
+async def post_activities(request, user_id):
+    activities, body = await _read_batch(request, 'activities')
+    if not isinstance(body.get('skip_overlaps', False), bool):
+        raise ApiError(400, 'skip_overlaps must be true or false')
+    # add_activities_bulk checks each row's types, timestamps and category ownership
+    results = await _call(add_activities_bulk, user_id, activities, skip_overlaps=body.get('skip_overlaps', False))
+    inserted = sum(1 for result in results if result['status'] in ('inserted', 'overlap'))
+    return {'inserted': inserted, 'results': results}
+
+
+@endpoint
+async def list_activities(request, user_id):
+    start_date, end_date = _query_date(request, 'start_date'), _query_date(request, 'end_date')
+    activities = await _call(get_activities, user_id, start_date, end_date)
+    return {'activities': [activity.as_dict() for activity in activities]}
+
+
+def _add_categories(user_id, categories):
+    results = []
+    for category in categories:
+        name = category.get('name')
+        description = category.get('description')
+        if not isinstance(name, str) or not name.strip():
+            results.append({'status': 'invalid', 'message': 'missing category name'})
+            continue
+        if description is not None and not isinstance(description, str):
+            results.append({'status': 'invalid', 'message': 'description must be text'})
+            continue
+        category_id = add_category(user_id, name, description)
+        if category_id is None:
+            results.append({'status': 'duplicate', 'message': f"category '{name}' already exists"})
+        else:
+            results.append({'status': 'inserted', 'category_id': category_id})
+    return results
+
+
+@endpoint
+async def post_categories(request, user_id):
+    categories, _ = await _read_batch(request, 'categories')
+    return {'results': await _call(_add_categories, user_id, categories)}
+
+
+@endpoint
+async def list_categories(request, user_id):
+    return {'categories': [category.as_dict() for category in await _call(get_categories, user_id)]}
+
+
+def _add_goals(user_id, goals):
+    category_ids = {category.category_id for category in get_categories(user_id)}
+    results = []
+    for goal in goals:
+        target = goal.get('time_target')
+        if goal.get('category_id') not in category_ids:
+            message = 'unknown category_id'
+        elif not isinstance(target, int) or isinstance(target, bool) or target <= 0:
+            message = 'time_target must be a positive number of minutes'
+        elif goal.get('period') not in GOAL_PERIODS:
+            message = f"period must be one of {', '.join(GOAL_PERIODS)}"
+        elif not _is_iso(goal.get('start_date'), date.fromisoformat):
+            message = 'start_date must be an ISO 8601 date'
+        elif goal.get('end_date') is not None and not _is_iso(goal['end_date'], date.fromisoformat):
+            message = 'end_date must be an ISO 8601 date'
+        else:
+            goal_id = add_goal(user_id, goal['category_id'], target, goal['period'], goal['start_date'], goal.get('end_date'))
+            if goal_id is None:
+                results.append({'status': 'invalid', 'message': 'database error'})
+            else:
+                results.append({'status': 'inserted', 'goal_id': goal_id})
+            continue
+        results.append({'status': 'invalid', 'message': message})
+    return results
+
+
+@endpoint
+async def post_goals(request, user_id):
+    goals, _ = await _read_batch(request, 'goals')
+    return {'results': await _call(_add_goals, user_id, goals)}
+
+
+@endpoint
+async def list_goals(request, user_id):
+    return {'goals': [goal.as_dict() for goal in await _call(get_goals, user_id)]}
+
+
+async def health(request):
+    return JSONResponse({'status': 'ok', 'in_flight': in_flight_limit.in_flight, 'rejected': in_flight_limit.rejected})
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global _db_limiter
+    _db_limiter = anyio.CapacityLimiter(POOL_SIZE)
+    enable_connection_pool()
+    try:
+        yield
+    finally:
+        disable_connection_pool()
+
+
+routes = [
+    Route('/api/v1/health', health),
+    Route('/api/v1/activities', post_activities, methods=['POST']),
+    Route('/api/v1/activities', list_activities, methods=['GET']),
+    Route('/api/v1/categories', post_categories, methods=['POST']),
+    Route('/api/v1/categories', list_categories, methods=['GET']),
+    Route('/api/v1/goals', post_goals, methods=['POST']),
+    Route('/api/v1/goals', list_goals, methods=['GET']),
+]
+
+in_flight_limit = InFlightLimit(Starlette(routes=routes, lifespan=lifespan))
+# The limit wraps the whole app, so rejected requests never reach routing or auth
+app = in_flight_limit
+
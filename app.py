@@ -8,20 +8,41 @@ from pagers import (
     analytics_page,
     goals_page,
     settings_page,
+    admin_page,
+    team_page,
+    search_page,
 )
 from utils.authentication import (
     login,
     signup,
     logout,
+    restore_session,
     is_authenticated,
     get_current_user,
 )
-from config import APP_NAME
+from utils.profiling import tracer, instrument_streamlit, render_performance_panel
+from utils.scheduler import start_scheduler
+from config import APP_NAME, PERF_PANEL
 
 def main():
     # Set the app title and layout
     st.set_page_config(page_title=APP_NAME, layout='wide')
 
+    # Maintenance and precomputation jobs run on one thread per server process
+    start_scheduler()
+
+    # Time the whole script run and every chart it draws
+    instrument_streamlit()
+    with tracer.trace():
+        render_app()
+
+    if PERF_PANEL or st.query_params.get('debug') == '1':
+        render_performance_panel()
+
+def render_app():
+    # Log in from the signed session token in the session cookie, if there is one
+    restore_session()
+
     # Display the navigation bar and get the selected page
     selection = navbar()
 
@@ -42,7 +63,10 @@ def main():
         "Time Tracking": time_tracking_page,
         "Goals": goals_page,
         "Analytics": analytics_page,
+        "Team": team_page,
+        "Search": search_page,
         "Settings": settings_page,
+        "Admin": admin_page,
     }
 
     # Check if the user is authenticated
@@ -0,0 +1,118 @@
+# benchmarks/bench_api_load.py
+#
+# Starts the ingestion API under uvicorn against a scratch database and has
+# several client threads POST activity batches over keep-alive connections
+# for a fixed time, backing off on 503s. Reports sustained requests and
+# activities per second, latency percentiles and how many requests the
+# server shed.
+#
+# Usage: python -m benchmarks.bench_api_load [clients] [seconds] [batch_size]
+
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from benchmarks.common import REPO_ROOT
+
+SETUP = '''
+from data import add_user, get_user_by_username, create_api_token
+add_user('loadtest', 'loadtest@example.com', 'pw')
+print(create_api_token(get_user_by_username('loadtest').user_id, 'load test'))
+'''
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(port, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/v1/health')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('API server did not start')
+
+
+def client(port, token, client_id, batch_size, stop_at, stats):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
+    # Each client writes its own back-to-back stretch of time, so no batch overlaps another
+    start = datetime(2020, 1, 1) + timedelta(days=3650 * client_id)
+    latencies, rejected, activities = [], 0, 0
+    while time.time() < stop_at:
+        batch = []
+        for _ in range(batch_size):
+            end = start + timedelta(minutes=5)
+            batch.append({'name': 'Load test', 'start_time': start.isoformat(), 'end_time': end.isoformat()})
+            start = end
+        body = json.dumps({'activities': batch})
+        began = time.perf_counter()
+        conn.request('POST', '/api/v1/activities', body, headers)
+        response = conn.getresponse()
+        payload = response.read()
+        if response.status == 503:
+            rejected += 1
+            # Shorter than Retry-After, to keep the server saturated
+            time.sleep(0.1)
+            continue
+        if response.status != 200:
+            raise RuntimeError(f'{response.status}: {payload[:200]}')
+        latencies.append(time.perf_counter() - began)
+        activities += json.loads(payload)['inserted']
+    conn.close()
+    stats.append((latencies, rejected, activities))
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    batch_size = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    directory = tempfile.mkdtemp(prefix='tm_bench_')
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, SCHEDULER_ENABLED='0', OPTIMIZE_ON_CLOSE='0', SLOW_QUERY_THRESHOLD_MS='1e9')
+    token = subprocess.run([sys.executable, '-c', SETUP], cwd=directory, env=env, check=True,
+                           capture_output=True, text=True).stdout.strip().splitlines()[-1]
+    port = free_port()
+    server = subprocess.Popen([sys.executable, '-m', 'api', 'serve', '127.0.0.1', str(port)], cwd=directory, env=env)
+    try:
+        wait_until_up(port)
+        stats = []
+        stop_at = time.time() + seconds
+        threads = [threading.Thread(target=client, args=(port, token, i, batch_size, stop_at, stats)) for i in range(clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+    latencies = np.array([latency for client_latencies, _, _ in stats for latency in client_latencies]) * 1000
+    rejected = sum(client_rejected for _, client_rejected, _ in stats)
+    activities = sum(client_activities for _, _, client_activities in stats)
+    print(f'{clients} clients, {batch_size} activities per request, {elapsed:.1f} s')
+    print(f'{len(latencies) / elapsed:>10.0f} requests/s')
+    print(f'{activities / elapsed:>10.0f} activities/s')
+    print(f'{np.percentile(latencies, 50):>10.1f} ms p50 latency')
+    print(f'{np.percentile(latencies, 95):>10.1f} ms p95 latency')
+    print(f'{rejected:>10} requests shed with 503')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# benchmarks/bench_change_log.py
+#
+# Measures what the change_log triggers add to writes (bulk inserts of
+# activities with and without the triggers), and what following the log
+# saves a derived structure: bringing the DuckDB mirror up to date after a
+# handful of edits, incrementally versus with a full re-copy.
+#
+# Usage: python -m benchmarks.bench_change_log [n_activities]
+
+import sys
+import time
+
+from benchmarks.common import use_scratch_database, seed_activities
+
+CAPTURED_TABLES = ('categories', 'activities', 'goals')
+
+
+def drop_change_triggers():
+    from data import create_connection
+
+    conn = create_connection()
+    for table in CAPTURED_TABLES:
+        for operation in ('insert', 'update', 'delete'):
+            conn.execute(f'DROP TRIGGER IF EXISTS {table}_change_{operation}')
+    conn.commit()
+    conn.close()
+
+
+def main():
+    n_activities = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    use_scratch_database()
+
+    from data import models, create_connection
+    from data.database import create_change_log
+
+    print(f'{n_activities} activities')
+    timings = {}
+    for label in ('with triggers', 'without triggers'):
+        if label == 'without triggers':
+            drop_change_triggers()
+        start = time.perf_counter()
+        seed_activities(n_activities, prefix=label.replace(' ', '_'))
+        timings[label] = time.perf_counter() - start
+        print(f'{label:>18}: {timings[label] * 1000:>8.0f} ms insert')
+    print(f"{'overhead':>18}: {(timings['with triggers'] / timings['without triggers'] - 1) * 100:>8.0f} %")
+
+    from data.analytics import duckdb, DuckDBMirror
+
+    if duckdb is None:
+        sys.exit("The duckdb package is not installed; skipping the mirror sync comparison")
+    conn = create_connection()
+    create_change_log(conn)
+    conn.close()
+    mirror = DuckDBMirror()
+    start = time.perf_counter()
+    mirror.sync()
+    print(f"{'full copy':>18}: {(time.perf_counter() - start) * 1000:>8.1f} ms")
+    user_id = models.get_user_by_username('with_triggers0').user_id
+    for activity in models.get_activities(user_id)[:20]:
+        models.update_activity(activity.activity_id, activity.category_id, activity.name,
+                               activity.start_time, activity.end_time, 'edited')
+    start = time.perf_counter()
+    copied = mirror.sync()
+    print(f"{'incremental sync':>18}: {(time.perf_counter() - start) * 1000:>8.1f} ms ({copied} rows re-copied)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+# benchmarks/bench_columnar_fetch.py
+#
+# Compares the tuple path used by the pages (fetchall -> DataFrame ->
+# pd.to_datetime) with fetch_activity_columns streaming into NumPy arrays.
+#
+# Usage: python -m benchmarks.bench_columnar_fetch [n_activities]
+
+import sys
+
+from benchmarks.common import use_scratch_database, seed_activities, measure
+
+
+def main():
+    n_activities = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    use_scratch_database()
+
+    import pandas as pd
+    from data import get_activities, fetch_activity_columns
+
+    user_id = seed_activities(n_activities)[0]
+
+    def tuple_path():
+        activities = get_activities(user_id)
+        df = pd.DataFrame([tuple(a) for a in activities], columns=['activity_id', 'category_id', 'name', 'start_time', 'end_time', 'duration', 'notes'])
+        df['start_time'] = pd.to_datetime(df['start_time'])
+        df['end_time'] = pd.to_datetime(df['end_time'])
+        return df
+
+    def columnar_path():
+        return fetch_activity_columns(user_id)
+
+    def columnar_text_path():
+        return fetch_activity_columns(user_id, include_text=True)
+
+    print(f'{n_activities} activities')
+    print(f"{'path':<28}{'time (ms)':>12}{'peak (MB)':>12}")
+    for label, func in [
+        ('tuples -> DataFrame', tuple_path),
+        ('columnar (numeric)', columnar_path),
+        ('columnar (with text)', columnar_text_path),
+    ]:
+        seconds, peak_mb, _ = measure(func)
+        print(f'{label:<28}{seconds * 1000:>12.1f}{peak_mb:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# benchmarks/bench_duckdb_analytics.py
+#
+# Runs the chart aggregates (by day, category, weekday/hour, week, month)
+# on SQLite and on the DuckDB mirror at several table sizes, to find where
+# DuckDB starts to win. The one-off copy into DuckDB is reported separately.
+#
+# Usage: python -m benchmarks.bench_duckdb_analytics [n_activities ...]
+
+import sys
+import time
+
+from benchmarks.common import use_scratch_database, seed_activities, measure
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or list(DEFAULT_SIZES)
+    use_scratch_database()
+
+    from data import models
+    from data.analytics import duckdb, DuckDBMirror, _SELECTS
+
+    if duckdb is None:
+        sys.exit("The duckdb package is not installed")
+
+    def sqlite_path(user_id):
+        return (
+            models.durations_by_day(user_id),
+            models.durations_by_category(user_id),
+            models.durations_by_weekday_hour(user_id),
+            models.durations_by_period(user_id, 'week'),
+            models.durations_by_period(user_id, 'month'),
+        )
+
+    def duckdb_path(mirror, user_id):
+        return [mirror.aggregate(user_id, select, group_by) for select, group_by in _SELECTS.values()]
+
+    print(f"{'activities':>12}{'sqlite (ms)':>14}{'duckdb (ms)':>14}{'copy (ms)':>12}")
+    for n_activities in sizes:
+        user_id = seed_activities(n_activities, prefix=f'bench{n_activities}_')[0]
+        mirror = DuckDBMirror()
+        start = time.perf_counter()
+        mirror.sync()
+        copy_ms = (time.perf_counter() - start) * 1000
+        repeat = 3 if n_activities < 1000000 else 1
+        sqlite_s, _, _ = measure(lambda: sqlite_path(user_id), repeat=repeat)
+        duckdb_s, _, _ = measure(lambda: duckdb_path(mirror, user_id), repeat=repeat)
+        print(f'{n_activities:>12}{sqlite_s * 1000:>14.1f}{duckdb_s * 1000:>14.1f}{copy_ms:>12.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/bench_fragment_reruns.py
+#
+# Compares a full page run with a rerun of one fragment (a goal card, the
+# ticking timer, the analytics trends panel) using Streamlit's AppTest.
+# AppTest always runs the whole script, so a fragment rerun is approximated
+# by a script that renders only that fragment with arguments prepared on
+# the first run, which is what Streamlit does when a fragment reruns.
+#
+# Usage: python -m benchmarks.bench_fragment_reruns [n_activities] [n_goals]
+
+import statistics
+import sys
+import time
+
+from benchmarks.common import REPO_ROOT, use_scratch_database, seed_activities
+
+HEADER = f"import sys; sys.path.insert(0, {REPO_ROOT!r})\n"
+
+GOAL_CARD = '''
+import streamlit as st
+import pandas as pd
+from pagers import goals
+from data import get_categories, get_goals, records_to_frame, Goal
+if not hasattr(goals, '_bench_args'):
+    categories = get_categories(USER_ID)
+    names = {None: 'Uncategorized', **{category.category_id: category.name for category in categories}}
+    frame = records_to_frame(get_goals(USER_ID), Goal)
+    frame['Category'] = frame['category_id'].map(names)
+    frame['Start Date'] = pd.to_datetime(frame['start_date']).dt.date
+    frame['End Date'] = None
+    goals._bench_args = (frame.iloc[0], categories, names)
+st.session_state[f"edit_goal_{goals._bench_args[0]['goal_id']}"] = True
+goals._goal_card(*goals._bench_args)
+'''
+
+TIMER = '''
+from components.timers import init_timer_state, _timer_panel
+init_timer_state('main_timer')
+_timer_panel('main_timer')
+'''
+
+TRENDS = '''
+from datetime import date, timedelta
+from pagers.analytics import _trends_panel
+_trends_panel(USER_ID, date.today() - timedelta(days=30), date.today(), None)
+'''
+
+
+def median_run_ms(script, user_id, navigation, repeat=7):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_string(HEADER + script.replace('USER_ID', str(user_id)), default_timeout=120)
+    at.session_state['authenticated'] = True
+    at.session_state['username'] = 'fragments0'
+    at.session_state['navigation'] = navigation
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        at.run()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    n_activities = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    n_goals = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    use_scratch_database()
+
+    from data import add_goal, get_categories
+
+    user_id = seed_activities(n_activities, days=60, prefix='fragments')[0]
+    categories = get_categories(user_id)
+    for i in range(n_goals):
+        add_goal(user_id, categories[i % len(categories)].category_id, 60 + i, 'Daily', '2024-01-01')
+
+    cases = [
+        ('goal card', 'Goals', 'from pagers.goals import goals_page\ngoals_page()', GOAL_CARD),
+        ('timer tick', 'Time Tracking', 'from pagers.time_tracking import time_tracking_page\ntime_tracking_page()', TIMER),
+        ('trends panel', 'Analytics', 'from pagers.analytics import analytics_page\nanalytics_page()', TRENDS),
+    ]
+    print(f'{n_activities} activities, {n_goals} goals')
+    print(f"{'fragment':<14}{'page (ms)':>11}{'fragment (ms)':>15}")
+    for name, navigation, page, fragment in cases:
+        page_ms = median_run_ms(page, user_id, navigation)
+        fragment_ms = median_run_ms(fragment, user_id, navigation)
+        print(f'{name:<14}{page_ms:>11.0f}{fragment_ms:>15.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# benchmarks/bench_sharded_writes.py
+#
+# Runs several writer processes, each committing single activities for its
+# own user, against one database file and against one shard per writer.
+#
+# Usage: python -m benchmarks.bench_sharded_writes [writers] [inserts_per_writer]
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import REPO_ROOT
+
+WRITER = '''
+import sys, time
+from data import add_user, get_user_by_username, add_activity
+name = sys.argv[1]
+add_user(name, name + '@example.com', 'pw')
+user_id = get_user_by_username(name).user_id
+sys.stdout.write('ready\\n')
+sys.stdout.flush()
+sys.stdin.readline()
+start = time.perf_counter()
+for i in range(int(sys.argv[2])):
+    add_activity(user_id, None, 'Write', f'2024-01-01T{i % 24:02d}:{i % 60:02d}:00', f'2024-01-01T{i % 24:02d}:{i % 60:02d}:30')
+print(time.perf_counter() - start)
+'''
+
+
+def run(writers, inserts, sharded):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, SHARDING_ENABLED='1' if sharded else '0', SHARD_COUNT=str(writers), SCHEDULER_ENABLED='0', OPTIMIZE_ON_CLOSE='0', SLOW_QUERY_THRESHOLD_MS='1e9')
+    directory = tempfile.mkdtemp(prefix='tm_bench_')
+    # Create the database (and shards) once, before the writers start
+    subprocess.run([sys.executable, '-c', 'import data'], cwd=directory, env=env, check=True, capture_output=True)
+    processes = [
+        subprocess.Popen([sys.executable, '-c', WRITER, f'writer{i}', str(inserts)], cwd=directory, env=env,
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for i in range(writers)
+    ]
+    for process in processes:
+        while process.stdout.readline().strip() != 'ready':
+            pass
+    start = time.perf_counter()
+    for process in processes:
+        process.stdin.write('go\n')
+        process.stdin.flush()
+    for process in processes:
+        process.communicate()
+    return time.perf_counter() - start
+
+
+def main():
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    inserts = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    print(f"{'mode':>10}{'writers':>9}{'seconds':>10}{'inserts/s':>12}")
+    for label, sharded in [('single', False), ('sharded', True)]:
+        seconds = run(writers, inserts, sharded)
+        print(f'{label:>10}{writers:>9}{seconds:>10.2f}{writers * inserts / seconds:>12.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+# benchmarks/bench_sql_aggregates.py
+#
+# Compares building the chart aggregates in pandas from raw rows with the
+# GROUP BY functions in data.models, at several table sizes.
+#
+# Usage: python -m benchmarks.bench_sql_aggregates [n_activities ...]
+
+import sys
+
+from benchmarks.common import use_scratch_database, seed_activities, measure
+
+DEFAULT_SIZES = (10000, 100000, 1000000)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or list(DEFAULT_SIZES)
+    use_scratch_database()
+
+    import pandas as pd
+    from data import (
+        get_activities,
+        durations_by_day,
+        durations_by_category,
+        durations_by_weekday_hour,
+        durations_by_period,
+    )
+
+    def pandas_path(user_id):
+        df = pd.DataFrame([tuple(a) for a in get_activities(user_id)], columns=['activity_id', 'category_id', 'name', 'start_time', 'end_time', 'duration', 'notes'])
+        df['start_time'] = pd.to_datetime(df['start_time'], format='ISO8601')
+        by_day = df.groupby(df['start_time'].dt.date)['duration'].sum()
+        by_category = df.groupby('category_id', dropna=False)['duration'].agg(['sum', 'count'])
+        by_weekday_hour = df.groupby([df['start_time'].dt.dayofweek, df['start_time'].dt.hour])['duration'].sum()
+        by_week = df.groupby(df['start_time'].dt.to_period('W').dt.start_time)['duration'].sum()
+        by_month = df.groupby(df['start_time'].dt.to_period('M').dt.start_time)['duration'].sum()
+        return by_day, by_category, by_weekday_hour, by_week, by_month
+
+    def sql_path(user_id):
+        return (
+            durations_by_day(user_id),
+            durations_by_category(user_id),
+            durations_by_weekday_hour(user_id),
+            durations_by_period(user_id, 'week'),
+            durations_by_period(user_id, 'month'),
+        )
+
+    print(f"{'activities':>12}{'path':>10}{'time (ms)':>12}{'peak (MB)':>12}")
+    for n_activities in sizes:
+        user_id = seed_activities(n_activities, prefix=f'bench{n_activities}_')[0]
+        for label, func in [('pandas', pandas_path), ('sql', sql_path)]:
+            seconds, peak_mb, _ = measure(lambda: func(user_id), repeat=3 if n_activities < 1000000 else 1)
+            print(f'{n_activities:>12}{label:>10}{seconds * 1000:>12.1f}{peak_mb:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
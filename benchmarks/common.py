@@ -0,0 +1,87 @@
+# benchmarks/common.py
+
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+# Make the app packages importable when run as a script from the repo root
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+def use_scratch_database():
+    """
+    Switch to an empty temporary directory before the data package is imported.
+
+    The data layer opens 'timemanagement.db' relative to the working
+    directory, so benchmarks never touch the real database.
+    """
+    os.chdir(tempfile.mkdtemp(prefix='tm_bench_'))
+    # Every benchmark query is "slow" at these sizes; keep the output readable
+    logging.getLogger('timemanagement.slow_query').setLevel(logging.ERROR)
+
+
+def seed_activities(n_activities, n_users=1, n_categories=8, days=730, seed=42, prefix='bench'):
+    """Insert users, categories and n_activities random activities; returns the user ids."""
+    from data import models
+
+    rng = random.Random(seed)
+    names = ['Standup', 'Email', 'Deep work', 'Code review', 'Meeting', 'Planning', 'Reading', 'Exercise']
+    conn = models.create_connection()
+    cursor = conn.cursor()
+    user_ids = []
+    for u in range(n_users):
+        cursor.execute(
+            'INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)',
+            (f'{prefix}{u}', f'{prefix}{u}@example.com', b'x')
+        )
+        user_id = cursor.lastrowid
+        user_ids.append(user_id)
+        category_ids = []
+        for c in range(n_categories):
+            cursor.execute('INSERT INTO categories (user_id, name) VALUES (?, ?)', (user_id, f'Category {c}'))
+            category_ids.append(cursor.lastrowid)
+
+        start_of_range = datetime.now() - timedelta(days=days)
+        rows = []
+        for _ in range(n_activities // n_users):
+            start = start_of_range + timedelta(minutes=rng.randrange(days * 24 * 60))
+            duration = rng.randrange(5, 180)
+            end = start + timedelta(minutes=duration)
+            rows.append((
+                user_id,
+                rng.choice(category_ids + [None]),
+                rng.choice(names),
+                start.isoformat(),
+                end.isoformat(),
+                duration,
+                None,
+            ))
+        cursor.executemany('''
+            INSERT INTO activities (user_id, category_id, name, start_time, end_time, duration, notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+    conn.commit()
+    conn.close()
+    return user_ids
+
+
+def measure(func, repeat=3):
+    """Run func repeat times; return (best seconds, peak traced memory in MB, last result)."""
+    best = float('inf')
+    peak = 0
+    result = None
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return best, peak / (1024 * 1024), result
@@ -1,7 +1,7 @@
 # components/navbar.py
 
 import streamlit as st
-from utils.authentication import is_authenticated
+from utils.authentication import is_authenticated, is_admin
 
 def navbar():
     """Render the navigation bar."""
@@ -18,9 +18,13 @@ def navbar():
             "Time Tracking": "Time Tracking",
             "Goals": "Goals",
             "Analytics": "Analytics",
+            "Team": "Team",
+            "Search": "Search",
             "Settings": "Settings",
             "Logout": "Logout",
         }
+        if is_admin():
+            pages["Admin"] = "Admin"
     else:
         pages = {
             "Login": "Login",
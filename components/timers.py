@@ -1,12 +1,12 @@
 # components/timers.py
 
 import streamlit as st
-import time
 from datetime import datetime, timedelta
 import threading
 
 # Import necessary modules for custom components
 import streamlit.components.v1 as components
+from utils.profiling import set_rerun_cause, traced_fragment
 
 # Initialize or update session state variables for timers
 def init_timer_state(timer_id):
@@ -27,6 +27,9 @@ def timer_component(timer_id, activity_name='', category_id=None, notes='', auto
     """
     Render a timer component with start, pause, and reset functionality.
 
+    The timer is a fragment: while it runs it redraws itself every second
+    without rerunning the rest of the page.
+
     Args:
         timer_id (str): Unique identifier for the timer instance.
         activity_name (str): Name of the activity.
@@ -45,6 +48,12 @@ def timer_component(timer_id, activity_name='', category_id=None, notes='', auto
     if notes:
         timer_state['notes'] = notes
 
+    # Only a running timer ticks; starting or pausing reruns the page to switch
+    timer_panel = traced_fragment(_timer_panel, run_every=1 if timer_state['timer_running'] else None)
+    timer_panel(timer_id)
+
+def _timer_panel(timer_id):
+    timer_state = st.session_state['timers'][timer_id]
     st.subheader(f"Timer: {timer_state['activity_name'] or 'Unnamed Activity'}")
 
     # Timer Controls
@@ -54,15 +63,23 @@ def timer_component(timer_id, activity_name='', category_id=None, notes='', auto
             if st.button("Start", key=f"start_{timer_id}"):
                 timer_state['timer_running'] = True
                 timer_state['start_time'] = datetime.now()
+                set_rerun_cause('timer')
+                st.rerun()
         else:
             if st.button("Pause", key=f"pause_{timer_id}"):
                 timer_state['timer_running'] = False
                 timer_state['elapsed_time'] += datetime.now() - timer_state['start_time']
+                set_rerun_cause('timer')
+                st.rerun()
     with col2:
         if st.button("Reset", key=f"reset_{timer_id}"):
+            was_running = timer_state['timer_running']
             timer_state['timer_running'] = False
             timer_state['start_time'] = None
             timer_state['elapsed_time'] = timedelta(0)
+            if was_running:
+                set_rerun_cause('timer')
+                st.rerun()
     with col3:
         st.write("")  # Placeholder for alignment
 
@@ -84,11 +101,6 @@ def timer_component(timer_id, activity_name='', category_id=None, notes='', auto
     # Animated Timer Display
     animate_timer(elapsed, timer_display, timer_id)
 
-    # Auto-refresh to update timer display
-    if timer_state['timer_running']:
-        time.sleep(1)
-        st.rerun()
-
 def animate_timer(elapsed, timer_display, timer_id):
     """
     Render an animated circular timer.
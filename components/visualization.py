@@ -3,9 +3,229 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io
 from datetime import datetime
+from collections import OrderedDict
+import hashlib
+import threading
 import numpy as np
 
+from config import (
+    CHART_VIEWPORT_PX,
+    CHART_MIN_BAR_PX,
+    FIGURE_CACHE_MAX_ENTRIES,
+    FIGURE_CACHE_MAX_BYTES,
+)
+
+class FigureCache:
+    """
+    LRU cache of serialized plotly figures keyed by a hash of their aggregated inputs.
+
+    Figures only depend on the arrays and parameters they were built from, so
+    one cache is shared by every session in the process. Entries hold the
+    figure's JSON rather than the Figure object, so max_bytes bounds the
+    cache's real size; a hit still skips the binning and plotly express work
+    of building the figure.
+    """
+
+    def __init__(self, max_entries=FIGURE_CACHE_MAX_ENTRIES, max_bytes=FIGURE_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key: JSON spec
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get_or_build(self, name, arrays, params, build):
+        """
+        Returns the cached figure JSON for these inputs, building it on a miss.
+
+        Args:
+            name (str): Chart name, part of the key.
+            arrays (list): Aggregated input arrays the figure is drawn from.
+            params (dict): Any other values that change the figure (titles, granularity).
+            build (callable): Zero-argument function returning the figure.
+
+        Returns:
+            str: The figure serialized with fig.to_json(), for plotly_chart_spec.
+        """
+        key = figure_key(name, arrays, params)
+        with self._lock:
+            spec = self._entries.get(key)
+            if spec is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return spec
+            self.misses += 1
+
+        spec = build().to_json()
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = spec
+                self._size += len(spec)
+                self._evict()
+        return spec
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._size > self.max_bytes):
+            _, spec = self._entries.popitem(last=False)
+            self._size -= len(spec)
+
+def plotly_chart_spec(spec):
+    """
+    Draws a figure cached as JSON by FigureCache at the container's width.
+
+    Args:
+        spec (str): Figure JSON from fig.to_json().
+    """
+    st.plotly_chart(plotly.io.from_json(spec), use_container_width=True)
+
+def figure_key(name, arrays, params):
+    """Hashes a chart name, its input arrays and parameters into a cache key."""
+    digest = hashlib.blake2b(name.encode('utf-8'), digest_size=16)
+    for array in arrays:
+        array = np.asarray(array)
+        digest.update(f'{array.dtype.str}{array.shape}'.encode('utf-8'))
+        if array.dtype == object or array.dtype.kind == 'U':
+            digest.update('\x1f'.join(map(str, array.ravel())).encode('utf-8'))
+        else:
+            digest.update(np.ascontiguousarray(array).tobytes())
+    digest.update(repr(sorted(params.items())).encode('utf-8'))
+    return digest.hexdigest()
+
+# Shared figure cache for the server process
+figure_cache = FigureCache()
+
+# Plotly period, axis title and adjective for each bin size
+GRANULARITY_PERIODS = {
+    'day': (86400000, 'Date', 'Daily'),
+    'week': (7 * 86400000, 'Week Starting', 'Weekly'),
+    'month': ('M1', 'Month', 'Monthly'),
+    'quarter': ('M3', 'Quarter Starting', 'Quarterly'),
+    'year': ('M12', 'Year', 'Yearly'),
+}
+
+def choose_granularity(start_date, end_date, viewport_px=CHART_VIEWPORT_PX):
+    """
+    Picks the finest bin size whose bar count fits in the viewport.
+
+    Args:
+        start_date (datetime.date): First day of the range.
+        end_date (datetime.date): Last day of the range.
+        viewport_px (int): Width available for the chart in pixels.
+
+    Returns:
+        str: 'day', 'week', 'month', 'quarter' or 'year'.
+    """
+    max_bars = max(1, viewport_px // CHART_MIN_BAR_PX)
+    days = (end_date - start_date).days + 1
+    if days <= max_bars:
+        return 'day'
+    if days / 7 <= max_bars:
+        return 'week'
+    first_month = start_date.year * 12 + start_date.month - 1
+    last_month = end_date.year * 12 + end_date.month - 1
+    if last_month - first_month + 1 <= max_bars:
+        return 'month'
+    if last_month // 3 - first_month // 3 + 1 <= max_bars:
+        return 'quarter'
+    # Coarsest bin; only ranges of more than max_bars years still exceed the cap
+    return 'year'
+
+def bin_dates(dates, granularity):
+    """
+    Floors dates to the start of their day, ISO week, month, quarter or year.
+
+    Args:
+        dates (array-like): Dates or datetimes.
+        granularity (str): 'day', 'week', 'month', 'quarter' or 'year'.
+
+    Returns:
+        np.ndarray: datetime64[D] bin start for every input date.
+    """
+    days = np.asarray(dates, dtype='datetime64[D]')
+    if granularity == 'week':
+        # 1970-01-01 was a Thursday, so (days + 3) % 7 is the weekday with Monday = 0
+        weekday = (days.astype(np.int64) + 3) % 7
+        return days - weekday.astype('timedelta64[D]')
+    if granularity == 'month':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+    if granularity == 'quarter':
+        months = days.astype('datetime64[M]').astype(np.int64)
+        return (months - months % 3).astype('datetime64[M]').astype('datetime64[D]')
+    if granularity == 'year':
+        return days.astype('datetime64[Y]').astype('datetime64[D]')
+    return days
+
+def bin_durations(dates, durations, granularity, groups=None):
+    """
+    Pre-aggregates durations into date bins, optionally split by group.
+
+    Args:
+        dates (array-like): Date of each activity.
+        durations (array-like): Duration of each activity in minutes.
+        granularity (str): 'day', 'week', 'month', 'quarter' or 'year'.
+        groups (array-like): Optional group label (e.g. category) of each activity.
+
+    Returns:
+        tuple: (bin start dates, dict mapping group label to an int32 array of totals per bin).
+    """
+    bins = bin_dates(dates, granularity)
+    bin_starts, bin_index = np.unique(bins, return_inverse=True)
+    weights = np.nan_to_num(np.asarray(durations, dtype=np.float64))
+    if groups is None:
+        totals = np.bincount(bin_index, weights=weights, minlength=len(bin_starts))
+        return bin_starts, {None: totals.astype(np.int32)}
+
+    group_codes, group_labels = pd.factorize(pd.Series(groups).fillna('Uncategorized'))
+    flat_index = group_codes * len(bin_starts) + bin_index
+    totals = np.bincount(flat_index, weights=weights, minlength=len(group_labels) * len(bin_starts))
+    totals = totals.reshape(len(group_labels), len(bin_starts)).astype(np.int32)
+    return bin_starts, {label: totals[i] for i, label in enumerate(group_labels)}
+
+def binned_bar_figure(bin_starts, series, granularity, title):
+    """
+    Builds a compact bar figure from pre-aggregated bins.
+
+    Values are passed as NumPy arrays so plotly serializes them as typed
+    arrays, and the number of bars is bounded by the chosen granularity.
+
+    Args:
+        bin_starts (np.ndarray): datetime64[D] start of each bin.
+        series (dict): Mapping of trace name (None for a single unnamed trace) to totals per bin.
+        granularity (str): 'day', 'week', 'month', 'quarter' or 'year'.
+        title (str): Chart title.
+
+    Returns:
+        go.Figure: Stacked bar figure.
+    """
+    period, axis_title, _ = GRANULARITY_PERIODS[granularity]
+    x = np.datetime_as_string(bin_starts, unit='D').tolist()
+    fig = go.Figure()
+    for name, values in series.items():
+        fig.add_trace(go.Bar(
+            x=x,
+            y=values,
+            name=name,
+            showlegend=name is not None,
+            xperiod=period,
+            xperiodalignment='start',
+        ))
+    fig.update_layout(
+        title=title,
+        barmode='stack',
+        xaxis_title=axis_title,
+        yaxis_title='Total Duration (mins)',
+    )
+    return fig
+
 def plot_time_distribution_by_category(df, category_dict):
     """
     Creates a pie chart showing the distribution of time spent per category.
@@ -27,24 +247,30 @@ def plot_time_distribution_by_category(df, category_dict):
     fig.update_traces(textposition='inside', textinfo='percent+label')
     st.plotly_chart(fig, use_container_width=True)
 
-def plot_daily_activity_duration(df):
+def plot_daily_activity_duration(df, start_date=None, end_date=None):
     """
-    Creates a bar chart showing total time spent on activities each day.
+    Creates a bar chart showing total time spent on activities per day, week, month, quarter or year.
+
+    The bin size is chosen from the date range so long ranges stay readable.
 
     Args:
         df (pd.DataFrame): DataFrame containing activity data with 'duration' and 'date' columns.
+        start_date (datetime.date): First day of the range (defaults to the earliest date).
+        end_date (datetime.date): Last day of the range (defaults to the latest date).
     """
-    daily_totals = df.groupby('date')['duration'].sum().reset_index()
+    start_date = start_date or df['date'].min()
+    end_date = end_date or df['date'].max()
+    granularity = choose_granularity(start_date, end_date)
+    bin_starts, series = bin_durations(df['date'], df['duration'], granularity)
 
-    fig = px.bar(
-        daily_totals,
-        x='date',
-        y='duration',
-        title='Total Time Spent Each Day',
-        labels={'date': 'Date', 'duration': 'Duration (mins)'}
+    title = 'Total Time Spent Each Day' if granularity == 'day' else f'Total Time Spent Each {granularity.title()}'
+    spec = figure_cache.get_or_build(
+        'daily_activity_duration',
+        [bin_starts] + list(series.values()),
+        {'granularity': granularity, 'title': title},
+        lambda: binned_bar_figure(bin_starts, series, granularity, title)
     )
-    fig.update_layout(xaxis_title='Date', yaxis_title='Total Duration (mins)')
-    st.plotly_chart(fig, use_container_width=True)
+    plotly_chart_spec(spec)
 
 def plot_activity_heatmap(df):
     """
@@ -74,6 +300,49 @@ def plot_activity_heatmap(df):
     )
     st.plotly_chart(fig, use_container_width=True)
 
+def plot_heatmap_matrix(values, days_order, title='Activity Heatmap: Duration by Day and Hour'):
+    """
+    Draws a day-of-week by hour heatmap from an already aggregated 7 x 24 matrix.
+
+    Args:
+        values (np.ndarray): Total duration per day of week (rows) and hour (columns).
+        days_order (list): Row labels, Monday first.
+        title (str): Chart title.
+    """
+    values = np.asarray(values)
+    spec = figure_cache.get_or_build(
+        'activity_heatmap',
+        [values],
+        {'days_order': tuple(days_order), 'title': title},
+        lambda: px.imshow(
+            values,
+            labels=dict(x="Hour of Day", y="Day of Week", color="Total Duration (mins)"),
+            x=list(range(values.shape[1])),
+            y=list(days_order),
+            aspect="auto",
+            title=title
+        )
+    )
+    plotly_chart_spec(spec)
+
+def plot_recent_daily_totals(daily_totals, title):
+    """
+    Draws a simple bar chart of total duration per date.
+
+    Args:
+        daily_totals (pd.DataFrame): DataFrame with 'date' and 'duration' columns, one row per date.
+        title (str): Chart title.
+    """
+    dates = np.asarray(daily_totals['date'], dtype='datetime64[D]')
+    durations = np.asarray(daily_totals['duration'], dtype=np.int64)
+    spec = figure_cache.get_or_build(
+        'recent_daily_totals',
+        [dates, durations],
+        {'title': title},
+        lambda: px.bar(daily_totals, x='date', y='duration', title=title)
+    )
+    plotly_chart_spec(spec)
+
 def plot_goal_progress(goals_df, activities_df, category_dict, today):
     """
     Displays goal progress bars and details.
@@ -104,27 +373,30 @@ def plot_goal_progress(goals_df, activities_df, category_dict, today):
         st.progress(min(progress / 100, 1.0))
         st.write(f"Progress: {total_time} mins / {row['time_target']} mins ({progress:.2f}%)")
 
-def plot_activity_distribution(df, category_dict):
+def plot_activity_distribution(df, category_dict, start_date=None, end_date=None):
     """
-    Creates a stacked bar chart showing the distribution of time spent on activities per day.
+    Creates a stacked bar chart showing the distribution of time spent on activities per day, week, month, quarter or year.
 
     Args:
         df (pd.DataFrame): DataFrame containing activity data with 'duration', 'date', and 'category_id' columns.
         category_dict (dict): Dictionary mapping category_id to category_name.
+        start_date (datetime.date): First day of the range (defaults to the earliest date).
+        end_date (datetime.date): Last day of the range (defaults to the latest date).
     """
     df['category'] = df['category_id'].map(category_dict)
-    daily_category_totals = df.groupby(['date', 'category'])['duration'].sum().reset_index()
+    start_date = start_date or df['date'].min()
+    end_date = end_date or df['date'].max()
+    granularity = choose_granularity(start_date, end_date)
+    bin_starts, series = bin_durations(df['date'], df['duration'], granularity, groups=df['category'])
 
-    fig = px.bar(
-        daily_category_totals,
-        x='date',
-        y='duration',
-        color='category',
-        title='Daily Activity Distribution by Category',
-        labels={'date': 'Date', 'duration': 'Duration (mins)', 'category': 'Category'}
+    title = f'{GRANULARITY_PERIODS[granularity][2]} Activity Distribution by Category'
+    spec = figure_cache.get_or_build(
+        'activity_distribution',
+        [bin_starts, np.array(list(series.keys()), dtype=object)] + list(series.values()),
+        {'granularity': granularity, 'title': title},
+        lambda: binned_bar_figure(bin_starts, series, granularity, title)
     )
-    fig.update_layout(barmode='stack')
-    st.plotly_chart(fig, use_container_width=True)
+    plotly_chart_spec(spec)
 
 def plot_weekly_trends(df):
     """
@@ -15,4 +15,97 @@ DEFAULT_TIMEZONE = 'UTC'
 DEFAULT_DATE_FORMAT = '%Y-%m-%d'
 
 # Streamlit configuration
-APP_NAME = 'Personal Time Management Dashboard'
\ No newline at end of file
+APP_NAME = 'Personal Time Management Dashboard'
+
+# Usernames allowed to open the admin page (comma separated)
+ADMIN_USERNAMES = [name.strip() for name in os.getenv('ADMIN_USERNAMES', '').split(',') if name.strip()]
+
+# Query instrumentation settings
+QUERY_INSTRUMENTATION = os.getenv('QUERY_INSTRUMENTATION', '1') == '1'
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', '100'))
+QUERY_LATENCY_SAMPLES = 500  # Latency samples kept per statement for percentiles
+SLOW_QUERY_LOG_SIZE = 200  # Recent slow queries kept in memory for the admin page
+
+# Rerun tracing settings
+PERF_PANEL = os.getenv('PERF_PANEL', '0') == '1'  # Show the debug performance panel in the sidebar
+RERUN_LOG_PATH = os.getenv('RERUN_LOG_PATH')  # Optional JSON-lines file for rerun traces
+RERUN_TRACE_HISTORY = 100  # Recent rerun traces kept in memory
+
+# Chart binning settings
+CHART_VIEWPORT_PX = 1200  # Assumed plot width when choosing a bin size
+CHART_MIN_BAR_PX = 8  # Narrowest bar worth drawing; caps bars per chart at viewport / this
+
+# Figure cache settings
+FIGURE_CACHE_MAX_ENTRIES = 64
+FIGURE_CACHE_MAX_BYTES = 32 * 1024 * 1024  # Total length of the cached figure JSON
+
+# Rows copied per fetchmany() call when streaming activities into NumPy columns
+ACTIVITY_FETCH_CHUNK_SIZE = 4096
+# Team analytics settings
+TEAM_POOL_WORKERS = int(os.getenv('TEAM_POOL_WORKERS', str(min(os.cpu_count() or 1, 4))))
+TEAM_PARALLEL_MIN_MEMBERS = 50  # Smaller teams are summarized inline, without the process pool
+TEAM_POOL_CHUNK_SIZE = 25  # Members summarized per worker task
+TEAM_CACHE_MAX_ENTRIES = 32  # (team, date range) aggregates kept in memory
+ANALYTICS_AGGREGATES_PER_SESSION = 4  # (user, start date) aggregates each session keeps for the analytics page
+
+# Background job scheduler settings
+SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', '1') == '1'
+SCHEDULER_TICK_SECONDS = 30  # How often the scheduler thread checks for due jobs
+JOB_LOCK_TTL_SECONDS = 3600  # A crashed run's lock is released after this long
+JOB_HISTORY_LIMIT = 1000  # job_runs rows kept per job
+
+# Database maintenance settings
+OPTIMIZE_ON_CLOSE = os.getenv('OPTIMIZE_ON_CLOSE', '1') == '1'  # Run PRAGMA optimize as connections close
+OPTIMIZE_MIN_INTERVAL_SECONDS = 300  # ...but at most this often per process
+VACUUM_FREELIST_RATIO = 0.1  # Reclaim free pages once they exceed this share of the file
+VACUUM_MIN_FREE_PAGES = 256  # ...and this many pages
+SIZE_HISTORY_LIMIT = 5000  # db_size_history rows kept
+
+# Activity archiving settings
+ARCHIVE_HORIZON_DAYS = int(os.getenv('ARCHIVE_HORIZON_DAYS', '730'))  # Activities older than this move to yearly archives
+ARCHIVE_DIRECTORY = os.getenv('ARCHIVE_DIRECTORY', 'archive')  # Relative to the working directory, like DATABASE_NAME
+
+# Full-text search settings
+SEARCH_RESULT_LIMIT = 50  # Most results returned by one search
+
+# Activity name autocomplete settings
+AUTOCOMPLETE_SUGGESTIONS = 5  # Suggestions shown in the time tracker
+AUTOCOMPLETE_REFRESH_SECONDS = 60  # Re-read names added by other processes at most this often
+
+# Analytics backend settings
+ANALYTICS_BACKEND = os.getenv('ANALYTICS_BACKEND', 'sqlite')  # 'sqlite', or 'duckdb' (needs the duckdb package)
+ANALYTICS_DUCKDB_MODE = os.getenv('ANALYTICS_DUCKDB_MODE', 'sync')  # 'sync' copies activities; 'attach' needs DuckDB's sqlite extension
+ANALYTICS_SYNC_CHUNK_SIZE = 50000  # Rows copied into DuckDB per batch
+
+# Read replica settings
+REPLICA_ENABLED = os.getenv('REPLICA_ENABLED', '0') == '1'  # Route analytics and export reads to a snapshot copy, re-copied when a read finds it stale
+REPLICA_PATH = os.getenv('REPLICA_PATH', 'timemanagement_replica.db')  # Relative to the working directory, like DATABASE_NAME
+REPLICA_MAX_AGE_SECONDS = int(os.getenv('REPLICA_MAX_AGE_SECONDS', '60'))  # Older snapshots are not read; the primary is used instead
+REPLICA_PAGES_PER_STEP = 4096  # Pages copied per backup step; writers can commit between steps
+
+# Session token settings
+SESSION_TTL_SECONDS = int(os.getenv('SESSION_TTL_SECONDS', str(8 * 3600)))  # How long a login stays valid
+SESSION_STORE = os.getenv('SESSION_STORE', 'sqlite')  # 'sqlite' (sessions table) or 'file' (one file per session)
+SESSION_STORE_DIRECTORY = os.getenv('SESSION_STORE_DIRECTORY', 'sessions')  # Used by the file store
+SESSION_COOKIE_NAME = os.getenv('SESSION_COOKIE_NAME', 'tm_session')  # Browser cookie carrying the token
+SESSION_COOKIE_SECURE = os.getenv('SESSION_COOKIE_SECURE', '1') == '1'  # HTTPS only (browsers also accept it on http://localhost)
+SESSION_QUERY_PARAM = 'session'  # Accepted once from old links, then removed from the URL
+SESSION_REVALIDATE_SECONDS = int(os.getenv('SESSION_REVALIDATE_SECONDS', '60'))  # How long a browser session trusts its last store check
+
+# Sharding settings
+SHARDING_ENABLED = os.getenv('SHARDING_ENABLED', '0') == '1'  # Keep each user's rows in one of several shard databases
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', '4'))  # Shards created on start in sharding mode (existing shards are kept)
+SHARD_DIRECTORY = os.getenv('SHARD_DIRECTORY', 'shards')  # Relative to the working directory, like DATABASE_NAME
+SHARD_MAP_CACHE_SECONDS = 5  # How long a process trusts its cached user placements
+SHARD_MOVE_WAIT_SECONDS = 30  # How long routing waits for a user's move to finish before failing
+
+# Ingestion API settings
+POOL_SIZE = int(os.getenv('POOL_SIZE', '8'))  # Pooled connections per database file (API process only)
+POOL_TIMEOUT_SECONDS = 5  # Wait this long for a pooled connection before failing
+API_MAX_IN_FLIGHT = int(os.getenv('API_MAX_IN_FLIGHT', '64'))  # Requests handled at once per process; more get 503
+API_MAX_BATCH_SIZE = 1000  # Most items accepted in one request
+API_TOKEN_CACHE_SECONDS = 60  # How long a verified API token is trusted without a lookup
+
+# Change log settings
+CHANGE_LOG_READ_LIMIT = 1000  # Default number of changes returned per changes_since() call
+CHANGE_LOG_RETENTION_DAYS = 7  # Older change_log entries are pruned; consumers further behind re-snapshot
@@ -19,8 +19,26 @@ from .models import (
 
     # Activity functions
     add_activity,
+    add_activities_bulk,
     get_activities,
+    get_recent_activities,
+    get_activity_batch,
+    fetch_activity_columns,
+    get_activities_by_id_range,
     calculate_duration,
+    update_activity,
+    delete_activity,
+    delete_activities,
+    get_daily_rollups,
+    durations_by_day,
+    durations_by_category,
+    durations_by_weekday_hour,
+    durations_by_period,
+    get_activity_cells,
+    activity_name_counts,
+    get_activity_names,
+    search_activities,
+    search_totals,
 
     # Goal functions
     add_goal,
@@ -32,10 +50,35 @@ from .models import (
     add_setting,
     get_settings,
 
+    # Team functions
+    create_team,
+    delete_team,
+    add_team_member,
+    remove_team_member,
+    get_teams,
+    get_team_members,
+    get_activity_watermarks,
+
+    # API token functions
+    create_api_token,
+    get_api_token_user,
+    get_api_tokens,
+    revoke_api_token,
+
     # Data Management functions
     export_user_data,
     import_user_data,
 )
+from .records import User, Category, Activity, Goal, Setting, Team, TeamMember, SearchHit, Change, ActivityBatch, records_to_frame
+from .aggregates import IncrementalAggregate, notify_activities_changed
+from .intervals import find_overlaps, timeline_report
+from .teams import TeamAggregate, get_team_aggregate, refresh_team_aggregates
+from .maintenance import index_usage_report, get_size_history
+from .archive import archive_activities, upgrade_partitions
+from .autocomplete import suggest_activity_names
+from .changes import ChangeLogGap, changes_since
+from . import analytics
 
 # Initialize the database when the package is imported
-initialize_database()
\ No newline at end of file
+initialize_database()
+upgrade_partitions()
\ No newline at end of file
@@ -0,0 +1,224 @@
+# data/aggregates.py
+
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from config import CHANGE_LOG_READ_LIMIT
+from .changes import ChangeLogGap, latest_change_seq, read_changes
+from .database import database_path
+from .instrumentation import connect
+from .models import get_activity_cells, get_activity_names, register_activity_change_listener
+
+# Recorded (sequence, user_id, first_date, last_date) ranges whose activities were edited or deleted
+_invalidations = []
+_invalidation_seq = 0
+_invalidation_lock = threading.Lock()
+MAX_INVALIDATIONS = 1000
+
+
+def notify_activities_changed(user_id, start_date, end_date):
+    """Mark a date range of a user's activities as changed so aggregates recompute it."""
+    global _invalidation_seq
+    with _invalidation_lock:
+        _invalidation_seq += 1
+        _invalidations.append((_invalidation_seq, user_id, start_date, end_date))
+        del _invalidations[:-MAX_INVALIDATIONS]
+
+
+# Edits and deletes made through data.models invalidate the affected days
+register_activity_change_listener(notify_activities_changed)
+
+
+def _invalidations_since(user_id, seq):
+    with _invalidation_lock:
+        if _invalidations and _invalidations[0][0] > seq + 1 and seq < _invalidation_seq:
+            # Older entries were discarded, so the caller must rebuild everything
+            return _invalidation_seq, None
+        ranges = [(lo, hi) for s, uid, lo, hi in _invalidations if s > seq and uid == user_id]
+        return _invalidation_seq, ranges
+
+
+def _start_day(values):
+    """Day of a logged activity's start_time, or None if it is missing or malformed."""
+    try:
+        return datetime.fromisoformat(values['start_time']).date()
+    except (TypeError, KeyError, ValueError):
+        return None
+
+
+class DayCell:
+    """Running sums for one (day, category) pair; names are counted by interned name_id."""
+
+    __slots__ = ('hours', 'names')
+
+    def __init__(self):
+        self.hours = [0] * 24
+        self.names = Counter()
+
+    @property
+    def total(self):
+        return sum(self.hours)
+
+
+class IncrementalAggregate:
+    """
+    Running analytics sums for one user from a fixed start date.
+
+    Keeps per-day, per-category hour totals and name counts together with the
+    highest activity_id merged so far. Later refreshes only read activities
+    above that watermark, plus any days added to the range or touched by an
+    edit or delete. Those are found in the user's change_log, so writes from
+    other processes are seen too, and through notify_activities_changed,
+    which also covers archive partitions (they have no change log).
+    """
+
+    def __init__(self, user_id, start_date):
+        self.user_id = user_id
+        self.start_date = start_date
+        self.covered_end = None
+        self.watermark = 0
+        self.invalidation_seq = 0
+        self.change_seq = 0
+        self.database = None  # Where the sums were read from; ids change when a user moves shards
+        self.days = {}  # date: {category_id: DayCell}
+
+    def refresh(self, end_date):
+        """Bring the sums up to date for the range start_date..end_date."""
+        seq, ranges = _invalidations_since(self.user_id, self.invalidation_seq)
+        self.invalidation_seq = seq
+        database = database_path(self.user_id)
+        if self.covered_end is not None and ranges is not None and database == self.database:
+            logged = self._logged_changes()
+            ranges = None if logged is None else ranges + logged
+        if self.covered_end is None or ranges is None or database != self.database:
+            self.database = database
+            self.days = {}
+            self.watermark = 0
+            self.covered_end = end_date
+            # Changes committed while the sums are read are applied again next time, which is harmless
+            conn = connect(database)
+            try:
+                self.change_seq = latest_change_seq(conn)
+            finally:
+                conn.close()
+            self._merge(self._fetch(self.start_date, end_date))
+            return self
+
+        # Recompute only the days touched by edits and deletes
+        for lo, hi in ranges:
+            lo = max(lo, self.start_date)
+            hi = min(hi, self.covered_end)
+            if lo > hi:
+                continue
+            day = lo
+            while day <= hi:
+                self.days.pop(day, None)
+                day += timedelta(days=1)
+            self._merge(self._fetch(lo, hi, max_activity_id=self.watermark), advance=False)
+
+        # Extend the covered range if the end date moved forward
+        if end_date > self.covered_end:
+            self._merge(
+                self._fetch(self.covered_end + timedelta(days=1), end_date, max_activity_id=self.watermark),
+                advance=False
+            )
+            self.covered_end = end_date
+
+        # Merge activities added since the last refresh
+        self._merge(self._fetch(self.start_date, self.covered_end, min_activity_id=self.watermark))
+        return self
+
+    def _logged_changes(self):
+        """Day ranges of the user's activities edited or deleted since change_seq; None if the log was pruned."""
+        conn = connect(self.database)
+        try:
+            conn.execute('BEGIN')
+            ranges = []
+            while True:
+                changes = read_changes(conn, self.change_seq, tables=('activities',), user_id=self.user_id)
+                for change in changes:
+                    self.change_seq = change.seq
+                    # Inserts are found through the watermark; archived rows keep counting
+                    if change.operation not in ('update', 'delete'):
+                        continue
+                    for values in (change.old_values, change.new_values):
+                        day = _start_day(values)
+                        if day is not None:
+                            ranges.append((day, day))
+                if len(changes) < CHANGE_LOG_READ_LIMIT:
+                    break
+            # Skip past other users' entries so pruning them is not mistaken for a gap
+            self.change_seq = latest_change_seq(conn)
+            return ranges
+        except ChangeLogGap:
+            return None
+        finally:
+            conn.rollback()
+            conn.close()
+
+    def _fetch(self, first_day, last_day, min_activity_id=None, max_activity_id=None):
+        return get_activity_cells(
+            self.user_id,
+            start_date=datetime.combine(first_day, datetime.min.time()).isoformat(),
+            end_date=datetime.combine(last_day + timedelta(days=1), datetime.min.time()).isoformat(),
+            min_activity_id=min_activity_id,
+            max_activity_id=max_activity_id,
+        )
+
+    def _merge(self, cells, advance=True):
+        # SQLite has already grouped the activities by (day, category, hour, name_id)
+        for day, category_id, hour, name_id, minutes, count, max_activity_id in cells:
+            day = date.fromisoformat(day)
+            cell = self.days.setdefault(day, {}).get(category_id)
+            if cell is None:
+                cell = self.days[day][category_id] = DayCell()
+            cell.hours[hour] += minutes
+            cell.names[name_id] += count
+            if advance and max_activity_id > self.watermark:
+                self.watermark = max_activity_id
+
+    def _cells(self, end_date, first_day=None, last_day=None, category_ids=None):
+        first_day = max(first_day or self.start_date, self.start_date)
+        last_day = min(last_day or end_date, end_date)
+        for day, cells in self.days.items():
+            if first_day <= day <= last_day:
+                for category_id, cell in cells.items():
+                    if category_ids is None or category_id in category_ids:
+                        yield day, category_id, cell
+
+    def daily_totals(self, end_date, category_ids=None):
+        """Return a sorted list of (date, minutes) pairs."""
+        totals = Counter()
+        for day, _, cell in self._cells(end_date, category_ids=category_ids):
+            totals[day] += cell.total
+        return sorted(totals.items())
+
+    def category_totals(self, end_date, category_ids=None):
+        """Return a {category_id: minutes} dictionary."""
+        totals = Counter()
+        for _, category_id, cell in self._cells(end_date, category_ids=category_ids):
+            totals[category_id] += cell.total
+        return dict(totals)
+
+    def heatmap(self, end_date, category_ids=None):
+        """Return a 7 x 24 list of minutes by weekday (Monday first) and hour."""
+        matrix = [[0] * 24 for _ in range(7)]
+        for day, _, cell in self._cells(end_date, category_ids=category_ids):
+            row = matrix[day.weekday()]
+            for hour, minutes in enumerate(cell.hours):
+                row[hour] += minutes
+        return matrix
+
+    def name_counts(self, end_date, category_ids=None):
+        """Return a Counter of activity names."""
+        # Count integer name_ids, then look up the text of the distinct ones once
+        counts = Counter()
+        for _, _, cell in self._cells(end_date, category_ids=category_ids):
+            counts.update(cell.names)
+        names = get_activity_names(counts, self.user_id)
+        return Counter({names.get(name_id): count for name_id, count in counts.items()})
+
+    def total_minutes(self, end_date, first_day, last_day, category_ids=None):
+        """Return the minutes logged between two dates (inclusive)."""
+        return sum(cell.total for _, _, cell in self._cells(end_date, first_day, last_day, category_ids))
@@ -0,0 +1,260 @@
+# data/analytics.py
+
+import sqlite3
+import sys
+import threading
+import time
+
+import pandas as pd
+
+from config import ANALYTICS_BACKEND, ANALYTICS_DUCKDB_MODE, ANALYTICS_SYNC_CHUNK_SIZE, SHARDING_ENABLED
+from .database import DATABASE_NAME
+from .changes import ChangeLogGap, latest_change_seq, read_changes
+from .archive import iter_activity_tables
+from . import models
+
+try:
+    import duckdb
+except ImportError:  # Optional; the SQLite backend is used without it
+    duckdb = None
+
+# Column expressions for each aggregate; start_time is a TIMESTAMP on the DuckDB side
+_SELECTS = {
+    'day': ("strftime(start_time, '%Y-%m-%d') AS day, COALESCE(SUM(duration), 0)", 'day'),
+    'category': ('category_id, COALESCE(SUM(duration), 0), COUNT(*)', 'category_id'),
+    'weekday_hour': (
+        'isodow(start_time) - 1 AS weekday, hour(start_time) AS hour, COALESCE(SUM(duration), 0)',
+        'weekday, hour'
+    ),
+    'week': ("strftime(date_trunc('week', start_time), '%Y-%m-%d') AS period_start, COALESCE(SUM(duration), 0)", 'period_start'),
+    'month': ("strftime(date_trunc('month', start_time), '%Y-%m-%d') AS period_start, COALESCE(SUM(duration), 0)", 'period_start'),
+}
+
+
+class DuckDBMirror:
+    """
+    Columnar copy of the activities table in an in-memory DuckDB database.
+
+    In 'sync' mode only the columns the aggregates need are copied, from the
+    archive partitions as well as the hot table. After the first full copy
+    the mirror follows the change log: activities inserted, edited or
+    deleted since the last sync (by any process) are re-copied or dropped by
+    activity_id, and archived ones keep the values logged as they moved. The
+    whole copy is rebuilt if the log was pruned past the mirror's position
+    or more than ANALYTICS_SYNC_CHUNK_SIZE activities changed.
+
+    In 'attach' mode timemanagement.db is attached read-only through
+    DuckDB's sqlite extension and scanned on every query instead; that scan
+    covers the hot table only, so archived years are missing in this mode.
+    """
+
+    def __init__(self, database=DATABASE_NAME, mode=ANALYTICS_DUCKDB_MODE):
+        self.database = database
+        self.mode = mode
+        self.conn = duckdb.connect()
+        self.change_seq = None
+        self.synced_at = None
+        self._lock = threading.Lock()
+        if mode == 'attach':
+            self.conn.execute(f"ATTACH '{database}' AS source (TYPE sqlite, READ_ONLY)")
+            self.conn.execute('''
+                CREATE VIEW activities AS
+                SELECT activity_id, user_id, category_id, CAST(start_time AS TIMESTAMP) AS start_time, duration
+                FROM source.activities
+            ''')
+        elif mode == 'sync':
+            self.conn.execute('''
+                CREATE TABLE activities (
+                    activity_id BIGINT,
+                    user_id BIGINT,
+                    category_id BIGINT,
+                    start_time TIMESTAMP,
+                    duration BIGINT
+                )
+            ''')
+        else:
+            raise ValueError(f"Unknown DuckDB mode: {mode}")
+
+    def _copy(self, source, where, params, table='activities'):
+        """Append the matching SQLite rows, one chunk at a time; returns rows copied."""
+        cursor = source.execute(f'''
+            SELECT activity_id, user_id, category_id, start_time, duration FROM {table} WHERE {where}
+        ''', params)
+        copied = 0
+        while True:
+            rows = cursor.fetchmany(ANALYTICS_SYNC_CHUNK_SIZE)
+            if not rows:
+                break
+            self._insert(rows)
+            copied += len(rows)
+        return copied
+
+    def _insert(self, rows):
+        chunk = pd.DataFrame(rows, columns=['activity_id', 'user_id', 'category_id', 'start_time', 'duration'])
+        chunk['start_time'] = pd.to_datetime(chunk['start_time'], format='ISO8601')
+        self.conn.register('chunk', chunk)
+        self.conn.execute('INSERT INTO activities SELECT * FROM chunk')
+        self.conn.unregister('chunk')
+
+    def _apply(self, source, changes):
+        """Replace the changed activities with their current SQLite rows (none if deleted); returns rows copied."""
+        # Archived rows have left the hot table; the log holds their final values
+        archived = {change.row_id: change for change in changes if change.operation == 'archive'}
+        ids = pd.DataFrame({'activity_id': sorted({change.row_id for change in changes})})
+        self.conn.register('changed', ids)
+        self.conn.execute('DELETE FROM activities WHERE activity_id IN (SELECT activity_id FROM changed)')
+        self.conn.unregister('changed')
+        refetch = [activity_id for activity_id in ids['activity_id'].tolist() if activity_id not in archived]
+        copied = 0
+        # Stay well under SQLite's bound parameter limit
+        for i in range(0, len(refetch), 500):
+            chunk = refetch[i:i + 500]
+            copied += self._copy(source, f"activity_id IN ({', '.join('?' * len(chunk))})", chunk)
+        if archived:
+            self._insert([
+                (change.row_id, change.user_id, change.old_values['category_id'],
+                 change.old_values['start_time'], change.old_values['duration'])
+                for change in archived.values()
+            ])
+            copied += len(archived)
+        return copied
+
+    def _copy_all(self, source):
+        """Replace the whole copy with the archive partitions and the hot table; returns (rows copied, log position)."""
+        archive_version = 'SELECT COUNT(*), MAX(updated_at) FROM archive_partitions'
+        while True:
+            version = source.execute(archive_version).fetchone()
+            self.conn.execute('DELETE FROM activities')
+            copied = 0
+            # Partitions are attached one by one, outside any transaction
+            for table in iter_activity_tables(source):
+                if table != 'main.activities':
+                    copied += self._copy(source, '1', (), table)
+                    continue
+                source.execute('BEGIN')
+                try:
+                    # An archive run in between moved rows already missed here; start over
+                    if source.execute(archive_version).fetchone() != version:
+                        break
+                    latest = latest_change_seq(source)
+                    return copied + self._copy(source, '1', (), table), latest
+                finally:
+                    source.rollback()
+
+    def sync(self):
+        """Bring the copy up to date with SQLite; returns the number of rows copied."""
+        if self.mode != 'sync':
+            return 0
+        with self._lock:
+            source = sqlite3.connect(self.database)
+            try:
+                # One read transaction, so the log position and the copied rows agree
+                source.execute('BEGIN')
+                latest = latest_change_seq(source)
+                changes = None
+                if self.change_seq is not None:
+                    try:
+                        changes = read_changes(source, self.change_seq, ANALYTICS_SYNC_CHUNK_SIZE, tables=('activities',))
+                    except ChangeLogGap:
+                        pass
+                if changes is None or len(changes) == ANALYTICS_SYNC_CHUNK_SIZE:
+                    source.rollback()
+                    copied, latest = self._copy_all(source)
+                else:
+                    copied = self._apply(source, changes) if changes else 0
+                self.change_seq = latest
+                self.synced_at = time.time()
+            finally:
+                source.rollback()
+                source.close()
+        return copied
+
+    def aggregate(self, user_id, select, group_by, start_date=None, end_date=None, category_ids=None, order_by=None):
+        """DuckDB counterpart of models._aggregate_activities, with the same arguments and rows."""
+        self.sync()
+        query = f'SELECT {select} FROM activities WHERE user_id = ?'
+        params = [user_id]
+        if start_date:
+            query += ' AND start_time >= CAST(? AS TIMESTAMP)'
+            params.append(str(start_date)[:10])
+        if end_date:
+            query += " AND start_time < CAST(? AS TIMESTAMP) + INTERVAL 1 DAY"
+            params.append(str(end_date)[:10])
+        if category_ids is not None:
+            ids = [category_id for category_id in category_ids if category_id is not None]
+            conditions = []
+            if ids:
+                conditions.append(f"category_id IN ({', '.join('?' * len(ids))})")
+                params.extend(ids)
+            if None in category_ids:
+                conditions.append('category_id IS NULL')
+            query += f" AND ({' OR '.join(conditions) or 'false'})"
+        query += f' GROUP BY {group_by} ORDER BY {order_by or group_by}'
+        # DuckDB connections are not safe to share between threads; cursors are
+        cursor = self.conn.cursor()
+        try:
+            return [tuple(row) for row in cursor.execute(query, params).fetchall()]
+        finally:
+            cursor.close()
+
+
+_mirror = None
+_mirror_lock = threading.Lock()
+
+
+def get_duckdb_mirror():
+    """Return the process-wide DuckDB mirror, or None when DuckDB is not selected or not installed."""
+    global _mirror
+    if ANALYTICS_BACKEND != 'duckdb' or SHARDING_ENABLED:
+        # The mirror copies the main database only, so sharded deployments stay on SQLite
+        return None
+    if duckdb is None:
+        print("Error: ANALYTICS_BACKEND is 'duckdb' but the duckdb package is not installed; using SQLite")
+        return None
+    with _mirror_lock:
+        if _mirror is None:
+            _mirror = DuckDBMirror()
+        return _mirror
+
+
+def _run(kind, user_id, start_date, end_date, category_ids):
+    mirror = get_duckdb_mirror()
+    if mirror is None:
+        # Long range scans read the replica snapshot rather than locking the live database
+        if kind in ('week', 'month'):
+            return models.durations_by_period(user_id, kind, start_date, end_date, category_ids, replica=True)
+        return getattr(models, f'durations_by_{kind}')(user_id, start_date, end_date, category_ids, replica=True)
+    select, group_by = _SELECTS[kind]
+    return mirror.aggregate(user_id, select, group_by, start_date, end_date, category_ids)
+
+
+def durations_by_day(user_id, start_date=None, end_date=None, category_ids=None):
+    """Get (day, total_minutes) pairs from the configured analytics backend."""
+    return _run('day', user_id, start_date, end_date, category_ids)
+
+
+def durations_by_category(user_id, start_date=None, end_date=None, category_ids=None):
+    """Get (category_id, total_minutes, activity_count) rows from the configured analytics backend."""
+    return _run('category', user_id, start_date, end_date, category_ids)
+
+
+def durations_by_weekday_hour(user_id, start_date=None, end_date=None, category_ids=None):
+    """Get (weekday, hour, total_minutes) rows from the configured analytics backend."""
+    return _run('weekday_hour', user_id, start_date, end_date, category_ids)
+
+
+def durations_by_period(user_id, period, start_date=None, end_date=None, category_ids=None):
+    """Get (period_start, total_minutes) pairs for 'week' or 'month' from the configured analytics backend."""
+    if period not in ('week', 'month'):
+        raise ValueError(f"Unknown period: {period}")
+    return _run(period, user_id, start_date, end_date, category_ids)
+
+
+if __name__ == '__main__':
+    # Usage: python -m data.analytics sync
+    if duckdb is None:
+        sys.exit("The duckdb package is not installed")
+    mirror = DuckDBMirror()
+    start = time.perf_counter()
+    copied = mirror.sync()
+    print(f"{copied} activities copied in {(time.perf_counter() - start) * 1000:.0f} ms")
@@ -0,0 +1,225 @@
+# data/archive.py
+
+import os
+import sqlite3
+import sys
+from datetime import date, timedelta
+
+from config import ARCHIVE_HORIZON_DAYS, ARCHIVE_DIRECTORY
+from .database import create_connection
+from .changes import latest_change_seq
+
+# Columns copied verbatim into the archives; activity_id is kept so ids stay unique,
+# and name_id points into the main database's activity_names
+ARCHIVE_COLUMNS = 'activity_id, user_id, category_id, name, name_id, start_time, end_time, duration, notes, created_at'
+
+
+def partition_path(year):
+    return os.path.join(ARCHIVE_DIRECTORY, f'activities_{year}.db')
+
+
+def _create_partition_table(cursor, schema):
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {schema}.activities (
+            activity_id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            category_id INTEGER,
+            name TEXT NOT NULL,
+            start_time TEXT NOT NULL,
+            end_time TEXT NOT NULL,
+            duration INTEGER,
+            notes TEXT,
+            created_at TEXT,
+            name_id INTEGER
+        )
+    ''')
+    cursor.execute(f'''
+        CREATE INDEX IF NOT EXISTS {schema}.idx_activities_user_start
+        ON activities (user_id, start_time, category_id, duration)
+    ''')
+    # Partitions from before name_id was archived get it from the main dictionary
+    cursor.execute(f'PRAGMA {schema}.table_info(activities)')
+    if 'name_id' not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f'ALTER TABLE {schema}.activities ADD COLUMN name_id INTEGER')
+        cursor.execute(f'''
+            UPDATE {schema}.activities
+            SET name_id = (SELECT name_id FROM main.activity_names n WHERE n.name = {schema}.activities.name)
+        ''')
+    _create_partition_search_index(cursor, schema)
+
+
+def _create_partition_search_index(cursor, schema):
+    """Give a partition its own FTS5 index, like create_search_index does for the hot table."""
+    cursor.execute(f"SELECT 1 FROM {schema}.sqlite_master WHERE name = 'activities_fts'")
+    if cursor.fetchone():
+        return
+    try:
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE {schema}.activities_fts USING fts5(
+                name, notes,
+                content='activities', content_rowid='activity_id',
+                tokenize='porter unicode61'
+            )
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {schema}.activities_fts_insert AFTER INSERT ON activities BEGIN
+                INSERT INTO activities_fts (rowid, name, notes) VALUES (new.activity_id, new.name, new.notes);
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {schema}.activities_fts_delete AFTER DELETE ON activities BEGIN
+                INSERT INTO activities_fts (activities_fts, rowid, name, notes)
+                VALUES ('delete', old.activity_id, old.name, old.notes);
+            END
+        ''')
+        # Index the rows archived before the partition had an index
+        cursor.execute(f"INSERT INTO {schema}.activities_fts (activities_fts) VALUES ('rebuild')")
+    except sqlite3.Error as e:
+        # SQLite builds without FTS5 archive without search, as they run without it
+        print(f"Error creating search index in {schema}: {e}")
+
+
+def archive_activities(horizon_days=ARCHIVE_HORIZON_DAYS, today=None):
+    """
+    Move activities that started before the horizon into per-year archive databases.
+
+    Each year's rows are copied into archive/activities_<year>.db and deleted
+    from the hot table in one transaction. activity_daily_rollups is left
+    untouched (rebuild_rollups skips days before the archive cutoff), so goal
+    progress and SQL aggregates over rollups still cover archived years. The
+    change_log entries of the moved rows record operation 'archive' rather
+    than 'delete', so consumers following the log can keep them.
+
+    Returns {year: activities moved}.
+    """
+    cutoff = ((today or date.today()) - timedelta(days=horizon_days)).isoformat()
+    os.makedirs(ARCHIVE_DIRECTORY, exist_ok=True)
+    conn = create_connection()
+    cursor = conn.cursor()
+    moved = {}
+    try:
+        cursor.execute('''
+            SELECT DISTINCT CAST(substr(start_time, 1, 4) AS INTEGER) FROM activities WHERE start_time < ?
+        ''', (cutoff,))
+        years = [row[0] for row in cursor.fetchall()]
+        for year in years:
+            first = f'{year:04d}-01-01'
+            last = min(f'{year + 1:04d}-01-01', cutoff)
+            schema = f'archive_{year}'
+            cursor.execute('ATTACH DATABASE ? AS ' + schema, (partition_path(year),))
+            try:
+                _create_partition_table(cursor, schema)
+                conn.commit()
+                cursor.execute('BEGIN IMMEDIATE')
+                seq = latest_change_seq(conn)
+                cursor.execute(f'''
+                    INSERT OR REPLACE INTO {schema}.activities ({ARCHIVE_COLUMNS})
+                    SELECT {ARCHIVE_COLUMNS} FROM main.activities
+                    WHERE start_time >= ? AND start_time < ?
+                ''', (first, last))
+                cursor.execute('DELETE FROM main.activities WHERE start_time >= ? AND start_time < ?', (first, last))
+                moved[year] = cursor.rowcount
+                cursor.execute('''
+                    UPDATE change_log SET operation = 'archive'
+                    WHERE seq > ? AND table_name = 'activities' AND operation = 'delete'
+                ''', (seq,))
+                cursor.execute(f'SELECT COUNT(*) FROM {schema}.activities')
+                total = cursor.fetchone()[0]
+                cursor.execute('''
+                    INSERT INTO archive_partitions (year, path, activity_count, archived_before, updated_at)
+                    VALUES (?, ?, ?, ?, datetime('now'))
+                    ON CONFLICT(year) DO UPDATE SET
+                        path=excluded.path,
+                        activity_count=excluded.activity_count,
+                        archived_before=MAX(archived_before, excluded.archived_before),
+                        updated_at=excluded.updated_at
+                ''', (year, partition_path(year), total, last))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.execute('DETACH DATABASE ' + schema)
+    finally:
+        conn.close()
+    return moved
+
+
+def get_partitions(conn):
+    """Return (year, path, activity_count, archived_before) rows, oldest year first."""
+    return conn.execute('''
+        SELECT year, path, activity_count, archived_before FROM archive_partitions ORDER BY year
+    ''').fetchall()
+
+
+def _year(value):
+    """Year of a date, datetime or ISO string, or None if it has none (every partition is scanned then)."""
+    try:
+        return date.fromisoformat(str(value)[:10]).year
+    except ValueError:
+        return None
+
+
+def iter_activity_tables(conn, start_date=None, end_date=None):
+    """
+    Yield the activity tables that can hold rows in a start_time range, oldest first.
+
+    Archive partitions for the years in range are attached one at a time, so
+    any number of years stays under SQLite's attached-database limit; each is
+    detached again once the caller moves on, so callers must not hold a
+    transaction open across tables. main.activities always comes last, since
+    unarchived rows are the newest. Each table has the hot table's columns
+    and its own activities_fts index.
+    """
+    first_year = _year(start_date) if start_date else None
+    last_year = _year(end_date) if end_date else None
+    for year, path, _, _ in get_partitions(conn):
+        if (first_year and year < first_year) or (last_year and year > last_year):
+            continue
+        if not os.path.exists(path):
+            continue
+        schema = f'archive_{year}'
+        conn.execute('ATTACH DATABASE ? AS ' + schema, (path,))
+        try:
+            yield f'{schema}.activities'
+        finally:
+            conn.execute('DETACH DATABASE ' + schema)
+    yield 'main.activities'
+
+
+def upgrade_partitions():
+    """Bring existing partitions up to the current partition schema (safe to run on every start)."""
+    conn = create_connection()
+    cursor = conn.cursor()
+    try:
+        for year, path, _, _ in get_partitions(conn):
+            if not os.path.exists(path):
+                continue
+            schema = f'archive_{year}'
+            cursor.execute('ATTACH DATABASE ? AS ' + schema, (path,))
+            try:
+                _create_partition_table(cursor, schema)
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"Error upgrading archive partition {path}: {e}")
+                conn.rollback()
+            finally:
+                cursor.execute('DETACH DATABASE ' + schema)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    # Usage: python -m data.archive [list | run [horizon_days]]
+    command = sys.argv[1] if len(sys.argv) > 1 else 'list'
+    if command == 'run':
+        horizon = int(sys.argv[2]) if len(sys.argv) > 2 else ARCHIVE_HORIZON_DAYS
+        for year, count in archive_activities(horizon).items():
+            print(f"{year}: {count} activities archived")
+    elif command == 'list':
+        conn = create_connection()
+        for year, path, count, archived_before in get_partitions(conn):
+            print(f"{year}  {count:>8} activities  before {archived_before}  {path}")
+        conn.close()
+    else:
+        sys.exit("Usage: python -m data.archive [list | run [horizon_days]]")
@@ -0,0 +1,128 @@
+# data/autocomplete.py
+
+import heapq
+import sys
+import threading
+import time
+from bisect import bisect_left, insort
+
+from config import AUTOCOMPLETE_SUGGESTIONS, AUTOCOMPLETE_REFRESH_SECONDS
+from .models import create_connection, register_activity_change_listener, register_activity_insert_listener
+
+# Sorts after every character, so (prefix + PREFIX_END) bounds all keys starting with prefix
+PREFIX_END = '\U0010ffff'
+MAX_CACHED_PREFIXES = 1024
+
+
+class NameIndex:
+    """
+    Frequency-ranked prefix index over one user's activity names.
+
+    Names are kept in a list sorted by their case-folded form, so the names
+    starting with a prefix are one bisected slice. The top-k of each prefix
+    is memoized until the next insert.
+    """
+
+    def __init__(self, counts=None):
+        self.counts = dict(counts or {})
+        self.keys = sorted((name.casefold(), name) for name in self.counts)
+        self.refreshed_at = time.monotonic()
+        self._top = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, name, count=1):
+        if name not in self.counts:
+            insort(self.keys, (name.casefold(), name))
+            self.counts[name] = 0
+        self.counts[name] += count
+        self._top.clear()
+
+    def suggest(self, prefix, k=AUTOCOMPLETE_SUGGESTIONS):
+        """Return up to k names starting with prefix (case-insensitive), most used first."""
+        key = (prefix.casefold(), k)
+        top = self._top.get(key)
+        if top is None:
+            low = bisect_left(self.keys, (key[0],))
+            high = bisect_left(self.keys, (key[0] + PREFIX_END,))
+            names = [name for _, name in self.keys[low:high]]
+            top = heapq.nlargest(k, names, key=self.counts.__getitem__)
+            if len(self._top) >= MAX_CACHED_PREFIXES:
+                self._top.clear()
+            self._top[key] = top
+        return top
+
+
+def _load_counts(user_id):
+    conn = create_connection(user_id)
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT n.name, COUNT(*)
+        FROM activities a
+        JOIN activity_names n ON n.name_id = a.name_id
+        WHERE a.user_id = ?
+        GROUP BY a.name_id
+    ''', (user_id,))
+    counts = dict(cursor.fetchall())
+    conn.close()
+    return counts
+
+
+# Per-user indexes, built lazily and kept current by the insert listener
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _count_inserted_names(user_id, names):
+    with _indexes_lock:
+        index = _indexes.get(user_id)
+        if index is not None:
+            for name in names:
+                index.add(name)
+
+
+def _drop_index(user_id, start_date, end_date):
+    with _indexes_lock:
+        _indexes.pop(user_id, None)
+
+
+register_activity_insert_listener(_count_inserted_names)
+# Renames and deletes change counts in ways an insert listener cannot see
+register_activity_change_listener(_drop_index)
+
+
+def get_name_index(user_id):
+    """
+    Return the user's name index, building it on first use.
+
+    Inserts made by this process are counted as they happen. The index is
+    rebuilt from the database at most every AUTOCOMPLETE_REFRESH_SECONDS, to
+    pick up names written by other processes.
+    """
+    with _indexes_lock:
+        index = _indexes.get(user_id)
+        if index is not None and time.monotonic() - index.refreshed_at < AUTOCOMPLETE_REFRESH_SECONDS:
+            return index
+    index = NameIndex(_load_counts(user_id))
+    with _indexes_lock:
+        _indexes[user_id] = index
+    return index
+
+
+def suggest_activity_names(user_id, prefix='', k=AUTOCOMPLETE_SUGGESTIONS):
+    """Return up to k of the user's past activity names starting with prefix, most used first."""
+    return get_name_index(user_id).suggest(prefix.strip(), k)
+
+
+if __name__ == '__main__':
+    # Usage: python -m data.autocomplete <user_id> [prefix]
+    user_id = int(sys.argv[1])
+    prefix = sys.argv[2] if len(sys.argv) > 2 else ''
+    index = get_name_index(user_id)
+    start = time.perf_counter()
+    suggestions = index.suggest(prefix, AUTOCOMPLETE_SUGGESTIONS)
+    elapsed_us = (time.perf_counter() - start) * 1e6
+    print(f"{len(index)} names, lookup {elapsed_us:.1f} us")
+    for name in suggestions:
+        print(f"  {name} ({index.counts[name]})")
@@ -0,0 +1,105 @@
+# data/changes.py
+
+import json
+import sys
+
+from config import CHANGE_LOG_READ_LIMIT, CHANGE_LOG_RETENTION_DAYS
+from .database import get_shards
+from .instrumentation import connect
+from .records import Change
+
+
+class ChangeLogGap(LookupError):
+    """Entries after the requested sequence number were pruned; the consumer has to re-snapshot."""
+
+
+def latest_change_seq(conn):
+    """Sequence number of the newest change in conn's database (0 before the first one)."""
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+    return row[0] if row else 0
+
+
+def read_changes(conn, seq, limit=CHANGE_LOG_READ_LIMIT, tables=None, user_id=None):
+    """
+    Return up to limit Change records after seq from conn's database, oldest first.
+
+    tables and user_id optionally restrict the result to those tables and
+    to one user's rows.
+
+    operation is 'insert', 'update', 'delete' or 'archive'; an archived
+    activity left the hot table for an archive partition (see data.archive)
+    and is still readable there. old_values and new_values are decoded
+    into dicts (None where the operation has no such side). Raises
+    ChangeLogGap if entries directly after seq were already pruned. Run it
+    inside a transaction to read the changes and the rows they point at
+    from one snapshot.
+    """
+    first = conn.execute('SELECT MIN(seq) FROM change_log').fetchone()[0]
+    if (first is None and latest_change_seq(conn) > seq) or (first is not None and first > seq + 1):
+        raise ChangeLogGap(f"changes after {seq} have been pruned")
+    query = '''
+        SELECT seq, table_name, row_id, user_id, operation, changed_at, old_values, new_values
+        FROM change_log WHERE seq > ?
+    '''
+    params = [seq]
+    if tables is not None:
+        query += f" AND table_name IN ({', '.join('?' * len(tables))})"
+        params.extend(tables)
+    if user_id is not None:
+        query += ' AND user_id = ?'
+        params.append(user_id)
+    cursor = conn.execute(query + ' ORDER BY seq LIMIT ?', params + [limit])
+    return [
+        Change(seq, table_name, row_id, user_id, operation, changed_at,
+               json.loads(old_values) if old_values else None,
+               json.loads(new_values) if new_values else None)
+        for seq, table_name, row_id, user_id, operation, changed_at, old_values, new_values in cursor.fetchall()
+    ]
+
+
+def changes_since(seq, limit=CHANGE_LOG_READ_LIMIT, shard_id=0, tables=None):
+    """
+    Return up to limit changes committed after seq, oldest first.
+
+    A consumer keeps the seq of the last change it applied and calls this
+    until it returns fewer than limit changes. A new consumer (or one that
+    got ChangeLogGap) records latest_change_seq() first, then builds its
+    state from the base tables, then follows changes from that seq; changes
+    made during the snapshot are seen twice, so applying one must be
+    idempotent.
+
+    Sequence numbers are per database: with sharding, each shard has its own
+    change log and consumers keep one cursor per shard_id.
+    """
+    conn = connect(get_shards()[shard_id])
+    try:
+        conn.execute('BEGIN')
+        return read_changes(conn, seq, limit, tables)
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def prune_change_log(conn, retention_days=CHANGE_LOG_RETENTION_DAYS):
+    """Delete change_log entries older than retention_days; returns how many were removed."""
+    cursor = conn.execute("DELETE FROM change_log WHERE changed_at < datetime('now', ?)", (f'-{retention_days} days',))
+    conn.commit()
+    return cursor.rowcount
+
+
+if __name__ == '__main__':
+    # Usage: python -m data.changes [tail [seq] [shard_id] | prune]
+    command = sys.argv[1] if len(sys.argv) > 1 else 'tail'
+    if command == 'tail':
+        seq = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+        shard_id = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+        for change in changes_since(seq, shard_id=shard_id):
+            print(f"{change.seq:>8}  {change.changed_at}  {change.operation:<6} {change.table_name}:{change.row_id}  "
+                  f"user {change.user_id}  {json.dumps(change.new_values or change.old_values)}")
+    elif command == 'prune':
+        for shard_id, path in get_shards().items():
+            conn = connect(path)
+            print(f"{path}: {prune_change_log(conn)} changes pruned")
+            conn.close()
+    else:
+        sys.exit("Usage: python -m data.changes [tail [seq] [shard_id] | prune]")
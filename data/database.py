@@ -2,15 +2,27 @@
 
 import sqlite3
 import os
+import threading
+import time
+from .instrumentation import connect
+from config import SHARDING_ENABLED, SHARD_COUNT, SHARD_DIRECTORY, SHARD_MAP_CACHE_SECONDS, SHARD_MOVE_WAIT_SECONDS
 
 # Database file name
 DATABASE_NAME = 'timemanagement.db'
 
-def create_connection():
-    """Create a database connection to the SQLite database."""
+# Every AUTOINCREMENT id allocated in shard n starts at n << SHARD_ID_BITS, so ids
+# stay unique across shards and the top bits name the shard that allocated them.
+# Moving a user re-inserts their rows with ids from the target shard's range
+# (see data.sharding), so anything holding ids outside the database (API
+# clients, exports, cached aggregates) must look them up again after a move.
+SHARD_ID_BITS = 40
+SHARDED_SEQUENCES = ('categories', 'activities', 'goals', 'settings')
+
+def create_connection(user_id=None):
+    """Create a database connection to the SQLite database (the user's shard in sharding mode)."""
     conn = None
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
+        conn = connect(database_path(user_id))
         # Enable foreign key support
         conn.execute("PRAGMA foreign_keys = 1")
         return conn
@@ -57,10 +69,18 @@ def create_tables(conn):
                 duration INTEGER,
                 notes TEXT,
                 created_at TEXT DEFAULT (datetime('now')),
+                name_id INTEGER REFERENCES activity_names(name_id),
                 FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
                 FOREIGN KEY (category_id) REFERENCES categories(category_id) ON DELETE SET NULL
             )
         ''')
+        # Create the dictionary of distinct activity names
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS activity_names (
+                name_id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE
+            )
+        ''')
         # Create goals table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS goals (
@@ -87,12 +107,525 @@ def create_tables(conn):
                 UNIQUE (user_id, setting_name)
             )
         ''')
+        # Create daily activity rollups (derived from activities, maintained by the write functions)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS activity_daily_rollups (
+                user_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                category_id INTEGER,
+                total_minutes INTEGER NOT NULL DEFAULT 0,
+                activity_count INTEGER NOT NULL DEFAULT 0,
+                FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+            )
+        ''')
+        # Create teams and their members
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS teams (
+                team_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL UNIQUE,
+                owner_id INTEGER NOT NULL,
+                created_at TEXT DEFAULT (datetime('now')),
+                FOREIGN KEY (owner_id) REFERENCES users(user_id) ON DELETE CASCADE
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS team_members (
+                team_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                role TEXT NOT NULL DEFAULT 'member',
+                joined_at TEXT DEFAULT (datetime('now')),
+                PRIMARY KEY (team_id, user_id),
+                FOREIGN KEY (team_id) REFERENCES teams(team_id) ON DELETE CASCADE,
+                FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+            )
+        ''')
+        # Create background job run history and single-flight locks
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS job_runs (
+                run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_name TEXT NOT NULL,
+                trigger TEXT NOT NULL,
+                status TEXT NOT NULL,
+                started_at TEXT NOT NULL,
+                finished_at TEXT,
+                duration_ms REAL,
+                error TEXT
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS job_locks (
+                job_name TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        ''')
+        # Create the catalogue of per-year activity archives (see data.archive)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS archive_partitions (
+                year INTEGER PRIMARY KEY,
+                path TEXT NOT NULL,
+                activity_count INTEGER NOT NULL DEFAULT 0,
+                archived_before TEXT NOT NULL,
+                updated_at TEXT DEFAULT (datetime('now'))
+            )
+        ''')
+        # Create database size history, sampled by data.maintenance
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS db_size_history (
+                recorded_at TEXT NOT NULL,
+                page_size INTEGER NOT NULL,
+                page_count INTEGER NOT NULL,
+                freelist_count INTEGER NOT NULL,
+                file_bytes INTEGER NOT NULL,
+                wal_bytes INTEGER NOT NULL
+            )
+        ''')
+        # Create per-user API tokens (stored hashed) for the ingestion API
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS api_tokens (
+                token_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                token_hash TEXT UNIQUE NOT NULL,
+                user_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                created_at TEXT DEFAULT (datetime('now')),
+                FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+            )
+        ''')
+        # Create the shard catalogue and user placement (see "Sharding" below)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS shards (
+                shard_id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS shard_map (
+                user_id INTEGER PRIMARY KEY,
+                shard_id INTEGER NOT NULL,
+                moving INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        # Create the server-side session store used by utils.sessions
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                expires_at INTEGER NOT NULL
+            )
+        ''')
         conn.commit()
+        migrate_activity_names(conn)
+        create_indexes(conn)
+        create_search_index(conn)
+        create_change_log(conn)
         print("Tables created successfully.")
     except sqlite3.Error as e:
         print(f"Error creating tables: {e}")
         conn.rollback()
 
+def create_indexes(conn):
+    """Create the indexes used by range and aggregate queries (safe to run on every start)."""
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_rollups_user_day
+            ON activity_daily_rollups (user_id, day, category_id)
+        ''')
+        # Date-range filters and GROUP BY aggregates over one user's activities;
+        # category_id and duration are included so aggregates never touch the table
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_activities_user_start
+            ON activities (user_id, start_time, category_id, duration)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_job_runs_name
+            ON job_runs (job_name, run_id)
+        ''')
+        # Name frequency counts group on the interned name_id
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_activities_user_name
+            ON activities (user_id, name_id)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_team_members_user
+            ON team_members (user_id)
+        ''')
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Error creating indexes: {e}")
+        conn.rollback()
+
+def migrate_activity_names(conn):
+    """
+    Intern activity names into activity_names and point activities.name_id at them.
+
+    Adds the name_id column to databases created before it existed and fills
+    it for any rows still missing one. Triggers assign name_id to rows
+    inserted or renamed later, so every write path stays consistent. Safe to
+    run repeatedly.
+    """
+    try:
+        cursor = conn.cursor()
+        cursor.execute('PRAGMA table_info(activities)')
+        if 'name_id' not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE activities ADD COLUMN name_id INTEGER REFERENCES activity_names(name_id)')
+        cursor.execute('''
+            INSERT OR IGNORE INTO activity_names (name)
+            SELECT DISTINCT name FROM activities WHERE name_id IS NULL
+        ''')
+        cursor.execute('''
+            UPDATE activities
+            SET name_id = (SELECT name_id FROM activity_names WHERE activity_names.name = activities.name)
+            WHERE name_id IS NULL
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS activities_name_id_insert AFTER INSERT ON activities
+            WHEN new.name_id IS NULL BEGIN
+                INSERT OR IGNORE INTO activity_names (name) VALUES (new.name);
+                UPDATE activities SET name_id = (SELECT name_id FROM activity_names WHERE name = new.name)
+                WHERE activity_id = new.activity_id;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS activities_name_id_update AFTER UPDATE OF name ON activities BEGIN
+                INSERT OR IGNORE INTO activity_names (name) VALUES (new.name);
+                UPDATE activities SET name_id = (SELECT name_id FROM activity_names WHERE name = new.name)
+                WHERE activity_id = new.activity_id;
+            END
+        ''')
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Error migrating activity names: {e}")
+        conn.rollback()
+
+def create_search_index(conn):
+    """
+    Create the FTS5 index over activity names and notes, kept in sync by triggers.
+
+    The index stores no copy of the text (content='activities'), only the
+    tokens, and rows removed from activities leave it through the delete
+    trigger. Archived rows are indexed in their partition instead (see
+    data.archive).
+    """
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS activities_fts USING fts5(
+                name, notes,
+                content='activities', content_rowid='activity_id',
+                tokenize='porter unicode61'
+            )
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS activities_fts_insert AFTER INSERT ON activities BEGIN
+                INSERT INTO activities_fts (rowid, name, notes) VALUES (new.activity_id, new.name, new.notes);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS activities_fts_delete AFTER DELETE ON activities BEGIN
+                INSERT INTO activities_fts (activities_fts, rowid, name, notes)
+                VALUES ('delete', old.activity_id, old.name, old.notes);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS activities_fts_update AFTER UPDATE OF name, notes ON activities BEGIN
+                INSERT INTO activities_fts (activities_fts, rowid, name, notes)
+                VALUES ('delete', old.activity_id, old.name, old.notes);
+                INSERT INTO activities_fts (rowid, name, notes) VALUES (new.activity_id, new.name, new.notes);
+            END
+        ''')
+        conn.commit()
+    except sqlite3.Error as e:
+        # SQLite builds without FTS5 still run the app, just without search
+        print(f"Error creating search index: {e}")
+        conn.rollback()
+
+# Tables captured in change_log: {table: (id column, columns recorded as JSON)}
+CHANGE_LOG_TABLES = {
+    'categories': ('category_id', ('name', 'description')),
+    'activities': ('activity_id', ('category_id', 'name', 'start_time', 'end_time', 'duration', 'notes')),
+    'goals': ('goal_id', ('category_id', 'time_target', 'period', 'start_date', 'end_date')),
+}
+
+def create_change_log(conn):
+    """
+    Create the append-only change_log and the triggers writing it.
+
+    Every insert, update and delete of a captured table appends one row in
+    the same transaction, whichever code path made it (bulk imports,
+    archiving, shard moves). seq comes from AUTOINCREMENT and SQLite has a
+    single writer, so readers see sequence numbers in commit order without
+    gaps, except where old entries were pruned.
+    """
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                user_id INTEGER,
+                operation TEXT NOT NULL,
+                changed_at TEXT NOT NULL DEFAULT (datetime('now')),
+                old_values TEXT,
+                new_values TEXT
+            )
+        ''')
+        for table, (id_column, columns) in CHANGE_LOG_TABLES.items():
+            old = 'json_object(' + ', '.join(f"'{column}', old.{column}" for column in columns) + ')'
+            new = 'json_object(' + ', '.join(f"'{column}', new.{column}" for column in columns) + ')'
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_change_insert AFTER INSERT ON {table} BEGIN
+                    INSERT INTO change_log (table_name, row_id, user_id, operation, new_values)
+                    VALUES ('{table}', new.{id_column}, new.user_id, 'insert', {new});
+                END
+            ''')
+            # Only the captured columns, so internal updates (e.g. name_id) are not logged
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_change_update AFTER UPDATE OF {', '.join(columns)} ON {table} BEGIN
+                    INSERT INTO change_log (table_name, row_id, user_id, operation, old_values, new_values)
+                    VALUES ('{table}', new.{id_column}, new.user_id, 'update', {old}, {new});
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_change_delete AFTER DELETE ON {table} BEGIN
+                    INSERT INTO change_log (table_name, row_id, user_id, operation, old_values)
+                    VALUES ('{table}', old.{id_column}, old.user_id, 'delete', {old});
+                END
+            ''')
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Error creating change log: {e}")
+        conn.rollback()
+
+def rebuild_search_index(conn):
+    """Re-tokenize every activity into the full-text index."""
+    try:
+        conn.execute("INSERT INTO activities_fts (activities_fts) VALUES ('rebuild')")
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Error rebuilding search index: {e}")
+        conn.rollback()
+
+def rebuild_rollups(conn, user_id=None):
+    """
+    Recompute the daily activity rollups from the activities table.
+
+    Days before the archive cutoff are left alone: their activities have
+    moved to the archive partitions (see data.archive), and the rollups are
+    the only copy of those totals kept in this database.
+    """
+    try:
+        cursor = conn.cursor()
+        cutoff = cursor.execute('SELECT MAX(archived_before) FROM archive_partitions').fetchone()[0]
+        conditions = []
+        params = []
+        if user_id is not None:
+            conditions.append('user_id = ?')
+            params.append(user_id)
+        rollup_where = activity_where = ' AND '.join(conditions)
+        if cutoff:
+            rollup_where = ' AND '.join(conditions + ['day >= ?'])
+            activity_where = ' AND '.join(conditions + ['start_time >= ?'])
+            params.append(cutoff)
+        cursor.execute(f'DELETE FROM activity_daily_rollups {"WHERE " + rollup_where if rollup_where else ""}', params)
+        cursor.execute(f'''
+            INSERT INTO activity_daily_rollups (user_id, day, category_id, total_minutes, activity_count)
+            SELECT user_id, substr(start_time, 1, 10), category_id, COALESCE(SUM(duration), 0), COUNT(*)
+            FROM activities
+            {"WHERE " + activity_where if activity_where else ""}
+            GROUP BY user_id, substr(start_time, 1, 10), category_id
+        ''', params)
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Error rebuilding rollups: {e}")
+        conn.rollback()
+
+# Sharding: with SHARDING_ENABLED, each user's rows (categories, activities,
+# goals, settings, rollups, search index) live in one shard database. The main
+# database stays the directory: users, teams, sessions, jobs and the shard map.
+# Users without a shard_map row, e.g. everyone from before sharding was
+# enabled, stay in the main database, which counts as shard 0.
+
+_shard_cache = {}  # user_id: (shard_id, path, looked up at)
+_shard_cache_lock = threading.Lock()
+
+def get_shards():
+    """Return {shard_id: path} for every shard, with the main database as shard 0."""
+    conn = connect(DATABASE_NAME)
+    try:
+        rows = conn.execute('SELECT shard_id, path FROM shards ORDER BY shard_id').fetchall()
+    finally:
+        conn.close()
+    return {0: DATABASE_NAME, **dict(rows)}
+
+def shard_for_user(user_id):
+    """
+    Return (shard_id, path) of the shard holding a user's rows.
+
+    Lookups are cached for SHARD_MAP_CACHE_SECONDS. While the user is being
+    moved to another shard this waits for the move to finish, so no write can
+    land in the shard being emptied.
+    """
+    now = time.monotonic()
+    with _shard_cache_lock:
+        entry = _shard_cache.get(user_id)
+        if entry is not None and now - entry[2] < SHARD_MAP_CACHE_SECONDS:
+            return entry[0], entry[1]
+    deadline = now + SHARD_MOVE_WAIT_SECONDS
+    conn = connect(DATABASE_NAME)
+    try:
+        while True:
+            row = conn.execute('''
+                SELECT m.shard_id, s.path, m.moving FROM shard_map m
+                LEFT JOIN shards s ON s.shard_id = m.shard_id
+                WHERE m.user_id = ?
+            ''', (user_id,)).fetchone()
+            if row is None or not row[2]:
+                break
+            if time.monotonic() > deadline:
+                raise sqlite3.OperationalError(f"user {user_id} is being moved to another shard")
+            time.sleep(0.05)
+    finally:
+        conn.close()
+    shard_id, path = (row[0], row[1] or DATABASE_NAME) if row else (0, DATABASE_NAME)
+    with _shard_cache_lock:
+        _shard_cache[user_id] = (shard_id, path, time.monotonic())
+    return shard_id, path
+
+def forget_shard_placement(user_id=None):
+    """Drop cached shard lookups for one user, or for everyone."""
+    with _shard_cache_lock:
+        if user_id is None:
+            _shard_cache.clear()
+        else:
+            _shard_cache.pop(user_id, None)
+
+def database_path(user_id=None):
+    """Path of the database holding a user's rows; the main database when sharding is off or user_id is None."""
+    if SHARDING_ENABLED and user_id is not None:
+        return shard_for_user(user_id)[1]
+    return DATABASE_NAME
+
+def group_users_by_database(user_ids):
+    """Return {database path: [user_id, ...]} for a set of users."""
+    groups = {}
+    for user_id in user_ids:
+        groups.setdefault(database_path(user_id), []).append(user_id)
+    return groups
+
+def row_owners(table, key_column, keys):
+    """
+    Return {key: user_id} for rows of a user-owned table looked up by their id.
+
+    In sharding mode every shard is searched, starting with the one each id
+    was allocated in. Without sharding this returns {} and callers use the
+    main database.
+    """
+    keys = list(keys)
+    if not SHARDING_ENABLED or not keys:
+        return {}
+    owners = {}
+    shards = get_shards()
+    home_shards = {key >> SHARD_ID_BITS for key in keys}
+    for shard_id in sorted(shards, key=lambda shard_id: shard_id not in home_shards):
+        remaining = [key for key in keys if key not in owners]
+        if not remaining:
+            break
+        conn = connect(shards[shard_id])
+        try:
+            for i in range(0, len(remaining), 500):
+                chunk = remaining[i:i + 500]
+                owners.update(conn.execute(f'''
+                    SELECT {key_column}, user_id FROM {table} WHERE {key_column} IN ({', '.join('?' * len(chunk))})
+                ''', chunk).fetchall())
+        finally:
+            conn.close()
+    return owners
+
+def row_owner(table, key_column, key):
+    """The user_id owning one row (None without sharding or if there is no such row)."""
+    return row_owners(table, key_column, [key]).get(key)
+
+def create_shard(path=None):
+    """Create a new shard database with the full schema and its own id range; returns its shard id."""
+    directory = connect(DATABASE_NAME)
+    try:
+        shard_id = directory.execute('INSERT INTO shards (path) VALUES (?)', (path or '',)).lastrowid
+        path = path or os.path.join(SHARD_DIRECTORY, f'shard_{shard_id:03d}.db')
+        directory.execute('UPDATE shards SET path = ? WHERE shard_id = ?', (path, shard_id))
+        directory.commit()
+    finally:
+        directory.close()
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = connect(path)
+    conn.execute("PRAGMA foreign_keys = 1")
+    create_tables(conn)
+    for table in SHARDED_SEQUENCES:
+        conn.execute('''
+            INSERT INTO sqlite_sequence (name, seq)
+            SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = ?)
+        ''', (table, shard_id << SHARD_ID_BITS, table))
+    conn.commit()
+    conn.close()
+    return shard_id
+
+def copy_user_row(conn, user_id, schema, directory='main'):
+    """Copy a user's row (without the password) from the directory into an attached shard, which needs it for foreign keys."""
+    conn.execute(f'''
+        INSERT OR IGNORE INTO {schema}.users (user_id, username, email, password_hash)
+        SELECT user_id, username, email, X'' FROM {directory}.users WHERE user_id = ?
+    ''', (user_id,))
+
+def place_user(user_id):
+    """Assign a new user to the shard with the fewest users; returns the shard id (0 if there are no shards)."""
+    conn = connect(DATABASE_NAME)
+    try:
+        row = conn.execute('''
+            SELECT s.shard_id, s.path FROM shards s
+            LEFT JOIN shard_map m ON m.shard_id = s.shard_id
+            GROUP BY s.shard_id
+            ORDER BY COUNT(m.user_id), s.shard_id
+            LIMIT 1
+        ''').fetchone()
+        if row is None:
+            return 0
+        shard_id, path = row
+        conn.execute('ATTACH DATABASE ? AS shard', (path,))
+        # One transaction, so the map never points at a shard without the user's row
+        conn.execute('BEGIN IMMEDIATE')
+        copy_user_row(conn, user_id, 'shard')
+        conn.execute('INSERT OR REPLACE INTO main.shard_map (user_id, shard_id) VALUES (?, ?)', (user_id, shard_id))
+        conn.commit()
+    finally:
+        conn.close()
+    forget_shard_placement(user_id)
+    return shard_id
+
+def iter_shard_connections():
+    """Yield a connection to each shard database (none without sharding), closing each after use."""
+    if not SHARDING_ENABLED:
+        return
+    for shard_id, path in get_shards().items():
+        if shard_id:
+            conn = connect(path)
+            try:
+                yield conn
+            finally:
+                conn.close()
+
+def initialize_shards():
+    """Create shards up to SHARD_COUNT and bring existing shards' schema up to date."""
+    shards = get_shards()
+    for shard_id, path in shards.items():
+        if shard_id:
+            conn = connect(path)
+            create_tables(conn)
+            conn.close()
+    for _ in range(SHARD_COUNT - (len(shards) - 1)):
+        create_shard()
+
 def initialize_database():
     """Initialize the database and create tables if they don't exist."""
     if not os.path.exists(DATABASE_NAME):
@@ -109,7 +642,7 @@ def initialize_database():
         if conn is not None:
             # Check for missing tables and create them
             cursor = conn.cursor()
-            tables = ['users', 'categories', 'activities', 'goals', 'settings']
+            tables = ['users', 'categories', 'activities', 'goals', 'settings', 'activity_daily_rollups', 'teams', 'team_members', 'job_runs', 'job_locks', 'db_size_history', 'archive_partitions', 'activities_fts', 'activity_names', 'sessions', 'shards', 'shard_map', 'api_tokens', 'change_log']
             existing_tables = []
             cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
             rows = cursor.fetchall()
@@ -118,12 +651,19 @@ def initialize_database():
             missing_tables = set(tables) - set(existing_tables)
             if missing_tables:
                 create_tables(conn)
+                if 'activity_daily_rollups' in missing_tables:
+                    rebuild_rollups(conn)
+                if 'activities_fts' in missing_tables:
+                    rebuild_search_index(conn)
                 print(f"Created missing tables: {missing_tables}")
             else:
                 print("All tables already exist.")
+            create_indexes(conn)
             conn.close()
         else:
             print("Error! Cannot create the database connection.")
+    if SHARDING_ENABLED:
+        initialize_shards()
 
 # Initialize the database when this module is imported
 initialize_database()
\ No newline at end of file
@@ -0,0 +1,307 @@
+# data/instrumentation.py
+
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from collections import deque
+from datetime import datetime
+
+from config import (
+    QUERY_INSTRUMENTATION,
+    SLOW_QUERY_THRESHOLD_MS,
+    QUERY_LATENCY_SAMPLES,
+    SLOW_QUERY_LOG_SIZE,
+)
+
+# Slow statements are logged here as one JSON object per line
+slow_query_logger = logging.getLogger('timemanagement.slow_query')
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Normalize a SQL statement so calls that differ only in literals share stats."""
+    sql = _STRING_LITERAL_RE.sub('?', sql)
+    sql = _NUMBER_LITERAL_RE.sub('?', sql)
+    sql = _PLACEHOLDER_LIST_RE.sub('(?+)', sql)
+    return _WHITESPACE_RE.sub(' ', sql).strip()
+
+
+class QueryStats:
+    """Running statistics for one statement fingerprint."""
+
+    __slots__ = ('fingerprint', 'calls', 'total_ms', 'max_ms', 'rows', 'slow_calls', 'samples')
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.slow_calls = 0
+        self.samples = deque(maxlen=QUERY_LATENCY_SAMPLES)
+
+    def percentile(self, pct):
+        """Return the given latency percentile over the retained samples."""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def as_dict(self):
+        return {
+            'fingerprint': self.fingerprint,
+            'calls': self.calls,
+            'total_ms': round(self.total_ms, 3),
+            'mean_ms': round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            'p95_ms': round(self.percentile(95), 3),
+            'max_ms': round(self.max_ms, 3),
+            'rows': self.rows,
+            'slow_calls': self.slow_calls,
+        }
+
+
+class QueryRegistry:
+    """Process-wide collection of per-fingerprint query statistics."""
+
+    def __init__(self, slow_threshold_ms=SLOW_QUERY_THRESHOLD_MS):
+        self.slow_threshold_ms = slow_threshold_ms
+        self._stats = {}
+        self._slow_queries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+        self._lock = threading.Lock()
+
+    def record(self, sql, elapsed_ms, rows):
+        """Record one completed statement."""
+        key = fingerprint(sql)
+        slow = elapsed_ms >= self.slow_threshold_ms
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = QueryStats(key)
+            stats.calls += 1
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.rows += max(rows, 0)
+            stats.samples.append(elapsed_ms)
+            if slow:
+                stats.slow_calls += 1
+                entry = {
+                    'timestamp': datetime.now().isoformat(),
+                    'fingerprint': key,
+                    'elapsed_ms': round(elapsed_ms, 3),
+                    'rows': rows,
+                }
+                self._slow_queries.append(entry)
+        if slow:
+            slow_query_logger.warning(json.dumps(entry))
+
+    def snapshot(self):
+        """Return a list of stats dictionaries, most expensive first."""
+        with self._lock:
+            stats = [s.as_dict() for s in self._stats.values()]
+        return sorted(stats, key=lambda s: s['total_ms'], reverse=True)
+
+    def slow_queries(self):
+        """Return the most recent slow queries, newest first."""
+        with self._lock:
+            return list(reversed(self._slow_queries))
+
+    def reset(self):
+        """Forget all recorded statistics."""
+        with self._lock:
+            self._stats.clear()
+            self._slow_queries.clear()
+
+    def to_json(self):
+        """Export the statistics as a JSON document."""
+        return json.dumps({
+            'slow_threshold_ms': self.slow_threshold_ms,
+            'queries': self.snapshot(),
+            'slow_queries': self.slow_queries(),
+        }, indent=2)
+
+    def to_prometheus(self):
+        """Export the statistics in the Prometheus text exposition format."""
+        metrics = [
+            ('tm_query_calls_total', 'counter', 'Number of executions per statement.', 'calls'),
+            ('tm_query_duration_ms_total', 'counter', 'Total execution time per statement in milliseconds.', 'total_ms'),
+            ('tm_query_duration_ms_p95', 'gauge', '95th percentile execution time per statement in milliseconds.', 'p95_ms'),
+            ('tm_query_rows_total', 'counter', 'Rows returned or affected per statement.', 'rows'),
+            ('tm_query_slow_total', 'counter', 'Executions above the slow query threshold.', 'slow_calls'),
+        ]
+        snapshot = self.snapshot()
+        lines = []
+        for name, metric_type, help_text, field in metrics:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for stats in snapshot:
+                label = _escape_label(stats['fingerprint'])
+                lines.append(f'{name}{{fingerprint="{label}"}} {stats[field]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Shared registry used by every instrumented connection in this process
+registry = QueryRegistry()
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times statements and counts the rows they return."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pending = None
+
+    def execute(self, sql, parameters=()):
+        self._flush()
+        start = time.perf_counter()
+        result = super().execute(sql, parameters)
+        self._begin(sql, start)
+        return result
+
+    def executemany(self, sql, seq_of_parameters):
+        self._flush()
+        start = time.perf_counter()
+        result = super().executemany(sql, seq_of_parameters)
+        self._begin(sql, start)
+        return result
+
+    def executescript(self, sql_script):
+        self._flush()
+        start = time.perf_counter()
+        result = super().executescript(sql_script)
+        self._begin(sql_script, start)
+        return result
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._add_fetch(start, 1 if row is not None else 0, exhausted=row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._add_fetch(start, len(rows), exhausted=not rows)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._add_fetch(start, len(rows), exhausted=True)
+        return rows
+
+    def close(self):
+        self._flush()
+        super().close()
+
+    def __del__(self):
+        # Cursors from conn.execute(...).fetchone() are dropped without close()
+        try:
+            self._flush()
+        except Exception:
+            pass
+
+    def _begin(self, sql, start):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if self.description is None:
+            # Statements without a result set are complete once executed
+            registry.record(sql, elapsed_ms, self.rowcount)
+        else:
+            self._pending = [sql, elapsed_ms, 0]
+
+    def _add_fetch(self, start, rows, exhausted):
+        if self._pending is None:
+            return
+        self._pending[1] += (time.perf_counter() - start) * 1000
+        self._pending[2] += rows
+        if exhausted:
+            self._flush()
+
+    def _flush(self):
+        if self._pending is not None:
+            sql, elapsed_ms, rows = self._pending
+            self._pending = None
+            registry.record(sql, elapsed_ms, rows)
+
+
+# Callables run with each connection from connect() just before it closes
+_close_hooks = []
+
+
+def register_close_hook(hook):
+    """Register hook(conn) to run before every connection opened through connect() closes."""
+    if hook not in _close_hooks:
+        _close_hooks.append(hook)
+
+
+def run_close_hooks(conn):
+    """Run the registered close hooks for a connection that is about to close (or go back to a pool)."""
+    for hook in _close_hooks:
+        hook(conn)
+
+
+class HookedConnection(sqlite3.Connection):
+    """Plain connection that runs the close hooks; used when query instrumentation is off."""
+
+    def close(self):
+        run_close_hooks(self)
+        super().close()
+
+
+class InstrumentedConnection(HookedConnection):
+    """Connection whose cursors report to the shared query registry."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cursors = weakref.WeakSet()
+
+    def cursor(self, factory=InstrumentedCursor):
+        cursor = super().cursor(factory)
+        if isinstance(cursor, InstrumentedCursor):
+            self._cursors.add(cursor)
+        return cursor
+
+    # The connection shortcuts bypass Cursor.execute, so route them explicitly
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def close(self):
+        for cursor in list(self._cursors):
+            cursor._flush()
+        super().close()
+
+
+# Optional callable(database) handing out reusable connections (see data.pool)
+_connection_provider = None
+
+
+def set_connection_provider(provider):
+    """Route plain connect(database) calls through provider, or back to new connections with None."""
+    global _connection_provider
+    _connection_provider = provider
+
+
+def connect(database, **kwargs):
+    """Open a SQLite connection, instrumented unless disabled in config; close hooks run either way."""
+    if _connection_provider is not None and not kwargs:
+        return _connection_provider(database)
+    kwargs.setdefault('factory', InstrumentedConnection if QUERY_INSTRUMENTATION else HookedConnection)
+    return sqlite3.connect(database, **kwargs)
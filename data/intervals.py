@@ -0,0 +1,214 @@
+# data/intervals.py
+
+import sys
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta, timezone
+
+from config import CHANGE_LOG_READ_LIMIT
+from .changes import ChangeLogGap, latest_change_seq, read_changes
+from .database import database_path
+from .models import create_connection, register_activity_change_listener
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_seconds(timestamp):
+    """Convert an ISO timestamp (naive or with offset) to seconds since the epoch."""
+    dt = datetime.fromisoformat(timestamp) if isinstance(timestamp, str) else timestamp
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return (dt - EPOCH).total_seconds()
+
+
+def from_seconds(seconds):
+    """Convert seconds since the epoch back to a naive datetime."""
+    return EPOCH + timedelta(seconds=seconds)
+
+
+class IntervalIndex:
+    """
+    Sorted start and end arrays over one user's activity intervals.
+
+    Counting the intervals that overlap [start, end) takes two bisections:
+    every interval starting before `end` overlaps unless it also ended at or
+    before `start`. Listing them only scans starts within the longest
+    interval's length of the query.
+    """
+
+    def __init__(self):
+        self.by_start = []  # (start, end, activity_id), sorted
+        self.ends = []  # sorted end times
+        self.max_length = 0.0
+        self.watermark = 0
+        self.change_seq = 0  # change_log position the intervals are current with
+        self.database = None  # Database the intervals were read from
+
+    def __len__(self):
+        return len(self.by_start)
+
+    def add(self, start, end, activity_id):
+        insort(self.by_start, (start, end, activity_id))
+        insort(self.ends, end)
+        self.max_length = max(self.max_length, end - start)
+        self.watermark = max(self.watermark, activity_id)
+
+    def count_overlaps(self, start, end):
+        """Number of indexed intervals overlapping [start, end)."""
+        started_before_end = bisect_left(self.by_start, (end,))
+        ended_before_start = bisect_right(self.ends, start)
+        return max(started_before_end - ended_before_start, 0)
+
+    def overlapping(self, start, end):
+        """List the (start, end, activity_id) intervals overlapping [start, end)."""
+        if not self.count_overlaps(start, end):
+            return []
+        low = bisect_left(self.by_start, (start - self.max_length,))
+        high = bisect_left(self.by_start, (end,))
+        return [item for item in self.by_start[low:high] if item[1] > start]
+
+    def overlap_pairs(self):
+        """All overlapping (earlier, later, overlap_seconds) pairs, found in one sweep."""
+        pairs = []
+        active = []  # intervals whose end is after the current start
+        for item in self.by_start:
+            start, end, _ = item
+            active = [other for other in active if other[1] > start]
+            for other in active:
+                pairs.append((other, item, min(other[1], end) - start))
+            active.append(item)
+        return pairs
+
+    def gaps(self, min_gap_seconds=0):
+        """Untracked (gap_start, gap_end) periods between activities on the same day."""
+        gaps = []
+        block_end = None
+        for start, end, _ in self.by_start:
+            if block_end is not None and start > block_end:
+                same_day = from_seconds(start).date() == from_seconds(block_end).date()
+                if same_day and start - block_end >= min_gap_seconds:
+                    gaps.append((block_end, start))
+            block_end = end if block_end is None else max(block_end, end)
+        return gaps
+
+
+# Per-user indexes, built lazily and topped up with newer activities on access
+_indexes = {}
+_indexes_lock = threading.Lock()
+# One lock per user, so reading one user's activities never blocks another's lookup
+_user_locks = {}
+
+
+def _drop_index(user_id, start_date, end_date):
+    with _indexes_lock:
+        _indexes.pop(user_id, None)
+
+
+# Edits and deletes can move or remove intervals, so rebuild on next access
+register_activity_change_listener(_drop_index)
+
+
+def _user_lock(user_id):
+    with _indexes_lock:
+        return _user_locks.setdefault(user_id, threading.Lock())
+
+
+def _moved_since(conn, user_id, seq):
+    """Whether the user's activities were edited, deleted or archived after seq, by any process."""
+    try:
+        while True:
+            changes = read_changes(conn, seq, tables=('activities',), user_id=user_id)
+            if any(change.operation != 'insert' for change in changes):
+                return True
+            if len(changes) < CHANGE_LOG_READ_LIMIT:
+                return False
+            seq = changes[-1].seq
+    except ChangeLogGap:
+        return True
+
+
+def get_interval_index(user_id):
+    """
+    Return the user's interval index, reading only activities added since the last call.
+
+    The user's change_log is checked on every call, so edits and deletes made
+    by other processes (the API, other app nodes, shard moves) rebuild the
+    index just like edits made here.
+    """
+    database = database_path(user_id)
+    with _user_lock(user_id):
+        with _indexes_lock:
+            index = _indexes.get(user_id)
+        conn = create_connection(user_id)
+        try:
+            # Check the log and read the rows from one snapshot
+            conn.execute('BEGIN')
+            # Activity ids are reassigned when a user moves to another shard
+            if index is None or index.database != database or _moved_since(conn, user_id, index.change_seq):
+                index = IntervalIndex()
+                index.database = database
+            index.change_seq = latest_change_seq(conn)
+            rows = conn.execute('''
+                SELECT activity_id, start_time, end_time FROM activities
+                WHERE user_id = ? AND activity_id > ?
+            ''', (user_id, index.watermark)).fetchall()
+        finally:
+            conn.rollback()
+            conn.close()
+        for activity_id, start_time, end_time in rows:
+            try:
+                index.add(to_seconds(start_time), to_seconds(end_time), activity_id)
+            except ValueError:
+                index.watermark = max(index.watermark, activity_id)
+        with _indexes_lock:
+            _indexes[user_id] = index
+        return index
+
+
+def find_overlaps(user_id, start_time, end_time):
+    """
+    Find existing activities that overlap a proposed interval.
+
+    Returns a list of (activity_id, start, end) tuples with datetimes, so the
+    time tracker can warn before saving a double-logged entry.
+    """
+    index = get_interval_index(user_id)
+    return [
+        (activity_id, from_seconds(start), from_seconds(end))
+        for start, end, activity_id in index.overlapping(to_seconds(start_time), to_seconds(end_time))
+    ]
+
+
+def timeline_report(user_id, min_gap_minutes=15):
+    """
+    Build a cleanup report of a user's overlapping entries and same-day gaps.
+
+    Returns a dict with 'overlaps' as (activity_id, other_activity_id,
+    overlap_minutes) tuples, 'overlap_minutes' as the total double-counted
+    time, and 'gaps' as (gap_start, gap_end, minutes) tuples.
+    """
+    index = get_interval_index(user_id)
+    overlaps = [
+        (earlier[2], later[2], int(seconds // 60))
+        for earlier, later, seconds in index.overlap_pairs()
+    ]
+    gaps = [
+        (from_seconds(start), from_seconds(end), int((end - start) // 60))
+        for start, end in index.gaps(min_gap_minutes * 60)
+    ]
+    return {
+        'overlaps': overlaps,
+        'overlap_minutes': sum(minutes for _, _, minutes in overlaps),
+        'gaps': gaps,
+    }
+
+
+if __name__ == '__main__':
+    # Usage: python -m data.intervals <user_id>
+    report = timeline_report(int(sys.argv[1]))
+    print(f"{len(report['overlaps'])} overlapping pairs, {report['overlap_minutes']} minutes double-counted")
+    for activity_id, other_id, minutes in report['overlaps']:
+        print(f"  activity {activity_id} overlaps activity {other_id} by {minutes} mins")
+    print(f"{len(report['gaps'])} gaps")
+    for gap_start, gap_end, minutes in report['gaps']:
+        print(f"  {gap_start:%Y-%m-%d %H:%M} - {gap_end:%H:%M} ({minutes} mins)")
@@ -0,0 +1,199 @@
+# data/maintenance.py
+
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+from config import (
+    OPTIMIZE_ON_CLOSE,
+    OPTIMIZE_MIN_INTERVAL_SECONDS,
+    VACUUM_FREELIST_RATIO,
+    VACUUM_MIN_FREE_PAGES,
+    SIZE_HISTORY_LIMIT,
+)
+from .database import DATABASE_NAME, create_connection
+from .instrumentation import registry, register_close_hook
+
+# PRAGMA auto_vacuum values
+AUTO_VACUUM_NONE = 0
+AUTO_VACUUM_INCREMENTAL = 2
+
+_last_optimize = 0.0
+_optimize_lock = threading.Lock()
+
+
+def _optimize_on_close(conn):
+    """Close hook running PRAGMA optimize, rate limited per process."""
+    global _last_optimize
+    if not OPTIMIZE_ON_CLOSE:
+        return
+    with _optimize_lock:
+        now = time.monotonic()
+        if now - _last_optimize < OPTIMIZE_MIN_INTERVAL_SECONDS:
+            return
+        _last_optimize = now
+    try:
+        # Only analyzes tables whose statistics this connection's queries found lacking
+        conn.execute('PRAGMA optimize')
+    except sqlite3.Error as e:
+        print(f"Error optimizing database: {e}")
+
+
+register_close_hook(_optimize_on_close)
+
+
+def optimize(conn):
+    """Run PRAGMA optimize now."""
+    conn.execute('PRAGMA optimize')
+
+
+def page_stats(conn):
+    """Return (page_size, page_count, freelist_count) for the main database."""
+    return (
+        conn.execute('PRAGMA page_size').fetchone()[0],
+        conn.execute('PRAGMA page_count').fetchone()[0],
+        conn.execute('PRAGMA freelist_count').fetchone()[0],
+    )
+
+
+def vacuum_if_needed(conn, min_ratio=VACUUM_FREELIST_RATIO, min_free_pages=VACUUM_MIN_FREE_PAGES):
+    """
+    Reclaim free pages once they pass both thresholds.
+
+    Databases in incremental auto_vacuum mode release their free pages with
+    PRAGMA incremental_vacuum. Older files still in auto_vacuum=NONE are
+    switched to incremental mode, which needs one full VACUUM.
+
+    Returns the number of pages released (0 when below the thresholds).
+    """
+    _, page_count, freelist_count = page_stats(conn)
+    if freelist_count < min_free_pages or freelist_count < page_count * min_ratio:
+        return 0
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+        conn.execute(f'PRAGMA auto_vacuum = {AUTO_VACUUM_INCREMENTAL}')
+        conn.commit()
+        conn.execute('VACUUM')
+    else:
+        conn.execute('PRAGMA incremental_vacuum').fetchall()
+        conn.commit()
+    return freelist_count - page_stats(conn)[2]
+
+
+def record_size(conn):
+    """Append the current page counts and file sizes to db_size_history."""
+    page_size, page_count, freelist_count = page_stats(conn)
+    path = os.path.abspath(DATABASE_NAME)
+    file_bytes = os.path.getsize(path) if os.path.exists(path) else 0
+    wal_bytes = os.path.getsize(path + '-wal') if os.path.exists(path + '-wal') else 0
+    conn.execute('''
+        INSERT INTO db_size_history (recorded_at, page_size, page_count, freelist_count, file_bytes, wal_bytes)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (datetime.now().isoformat(), page_size, page_count, freelist_count, file_bytes, wal_bytes))
+    conn.execute('''
+        DELETE FROM db_size_history WHERE rowid <= (
+            SELECT rowid FROM db_size_history ORDER BY rowid DESC LIMIT 1 OFFSET ?
+        )
+    ''', (SIZE_HISTORY_LIMIT,))
+    conn.commit()
+
+
+def get_size_history(limit=500):
+    """Get (recorded_at, page_count, freelist_count, file_bytes, wal_bytes) rows, oldest first."""
+    conn = create_connection()
+    rows = conn.execute('''
+        SELECT recorded_at, page_count, freelist_count, file_bytes, wal_bytes
+        FROM (SELECT rowid, * FROM db_size_history ORDER BY rowid DESC LIMIT ?)
+        ORDER BY rowid
+    ''', (limit,)).fetchall()
+    conn.close()
+    return rows
+
+
+_INDEX_IN_PLAN_RE = re.compile(r'USING (?:COVERING )?INDEX (\w+)')
+# Captures the table name with any schema prefix (main.activities) and quotes dropped
+_WRITE_TABLE_RE = re.compile(
+    r'^(?:INSERT(?: OR \w+)? INTO|REPLACE INTO|UPDATE(?: OR \w+)?|DELETE FROM)\s+(?:"?\w+"?\.)?"?(\w+)"?',
+    re.IGNORECASE,
+)
+
+
+def _plan_indexes(conn, statement):
+    """Indexes SQLite would use for a fingerprinted statement, or None if it cannot be planned."""
+    sql = statement.replace('(?+)', '(?)')
+    try:
+        plan = conn.execute(f'EXPLAIN QUERY PLAN {sql}', [None] * sql.count('?')).fetchall()
+    except sqlite3.Error:
+        return None
+    return {match for row in plan for match in _INDEX_IN_PLAN_RE.findall(row[-1])}
+
+
+def index_usage_report(conn, stats=None):
+    """
+    Report which indexes the recorded workload actually uses.
+
+    Every statement fingerprint in the query registry (or `stats`, a list of
+    its snapshot dictionaries) that reads tables is re-planned with EXPLAIN
+    QUERY PLAN. Each index is credited with the calls of the statements that
+    would use it and charged with the writes to its table.
+
+    Returns a list of dictionaries, unused indexes with the most writes first.
+    """
+    stats = registry.snapshot() if stats is None else stats
+    indexes = conn.execute('''
+        SELECT name, tbl_name FROM sqlite_master
+        WHERE type = 'index' AND name NOT LIKE 'sqlite_autoindex%'
+    ''').fetchall()
+    report = {
+        name: {
+            'index': name,
+            'table': table,
+            'columns': ', '.join(row[2] for row in conn.execute(f'PRAGMA index_info({name})')),
+            'read_statements': 0,
+            'read_calls': 0,
+            'table_write_calls': 0,
+        }
+        for name, table in indexes
+    }
+    writes = {}
+    for stat in stats:
+        statement = stat['fingerprint']
+        verb = statement.split(' ', 1)[0].upper()
+        match = _WRITE_TABLE_RE.match(statement)
+        if match:
+            writes[match.group(1)] = writes.get(match.group(1), 0) + stat['calls']
+        if verb not in ('SELECT', 'WITH', 'UPDATE', 'DELETE'):
+            continue
+        for name in _plan_indexes(conn, statement) or ():
+            if name in report:
+                report[name]['read_statements'] += 1
+                report[name]['read_calls'] += stat['calls']
+    for entry in report.values():
+        entry['table_write_calls'] = writes.get(entry['table'], 0)
+        entry['verdict'] = 'used' if entry['read_calls'] else 'unused'
+    return sorted(report.values(), key=lambda e: (e['read_calls'] > 0, -e['table_write_calls'], e['read_calls']))
+
+
+if __name__ == '__main__':
+    # Usage: python -m data.maintenance [size | optimize | vacuum | indexes]
+    command = sys.argv[1] if len(sys.argv) > 1 else 'size'
+    conn = create_connection()
+    if command == 'size':
+        record_size(conn)
+        for recorded_at, page_count, freelist_count, file_bytes, wal_bytes in get_size_history(20):
+            print(f"{recorded_at}  {page_count:>8} pages  {freelist_count:>6} free  {file_bytes / 1024:>10.0f} KB  wal {wal_bytes / 1024:.0f} KB")
+    elif command == 'optimize':
+        optimize(conn)
+        print("PRAGMA optimize done")
+    elif command == 'vacuum':
+        print(f"{vacuum_if_needed(conn)} pages released")
+    elif command == 'indexes':
+        # A fresh process has no recorded workload, so this only lists the indexes
+        for entry in index_usage_report(conn):
+            print(f"{entry['index']:<32} {entry['table']:<24} {entry['verdict']:<7} reads {entry['read_calls']:>6}  writes {entry['table_write_calls']:>6}")
+    else:
+        sys.exit("Usage: python -m data.maintenance [size | optimize | vacuum | indexes]")
+    conn.close()
@@ -1,17 +1,28 @@
 # models.py
 
 import sqlite3
-from datetime import datetime, date
+from datetime import datetime, date, timedelta, timezone
 import hashlib
+import numbers
+import secrets
+import re
 import os
+import warnings
+import numpy as np
 import pandas as pd
+from .instrumentation import connect
+from .database import database_path, place_user, group_users_by_database, row_owner, row_owners
+from .archive import iter_activity_tables
+from .replica import create_read_connection
+from .records import User, Category, Activity, Goal, Setting, Team, TeamMember, SearchHit, ActivityBatch
+from config import ACTIVITY_FETCH_CHUNK_SIZE, SEARCH_RESULT_LIMIT, SHARDING_ENABLED
 
 # Database file name
 DATABASE_NAME = 'timemanagement.db'
 
-def create_connection():
-    """Create a database connection to the SQLite database."""
-    conn = sqlite3.connect(DATABASE_NAME)
+def create_connection(user_id=None):
+    """Create a database connection to the SQLite database (the user's shard in sharding mode)."""
+    conn = connect(database_path(user_id))
     # Enable foreign key support
     conn.execute("PRAGMA foreign_keys = 1")
     return conn
@@ -129,6 +140,8 @@ def add_user(username, email, password):
             VALUES (?, ?, ?)
         ''', (username, email, password_hash))
         conn.commit()
+        if SHARDING_ENABLED:
+            place_user(cursor.lastrowid)
     except sqlite3.IntegrityError as e:
         print(f'Error: {e}')
         conn.rollback()
@@ -139,6 +152,7 @@ def get_user_by_username(username):
     """Retrieve a user by username."""
     conn = create_connection()
     cursor = conn.cursor()
+    cursor.row_factory = User.row_factory
     cursor.execute('''
         SELECT user_id, username, email, password_hash FROM users WHERE username = ?
     ''', (username,))
@@ -156,8 +170,8 @@ def verify_user(username, password):
     return False
 
 def add_category(user_id, name, description=None):
-    """Add a new category."""
-    conn = create_connection()
+    """Add a new category; returns its category_id, or None if the name is taken."""
+    conn = create_connection(user_id)
     cursor = conn.cursor()
     try:
         cursor.execute('''
@@ -165,6 +179,7 @@ def add_category(user_id, name, description=None):
             VALUES (?, ?, ?)
         ''', (user_id, name, description))
         conn.commit()
+        return cursor.lastrowid
     except sqlite3.IntegrityError as e:
         print(f'Error: {e}')
         conn.rollback()
@@ -173,8 +188,9 @@ def add_category(user_id, name, description=None):
 
 def get_categories(user_id):
     """Get categories for a user."""
-    conn = create_connection()
+    conn = create_connection(user_id)
     cursor = conn.cursor()
+    cursor.row_factory = Category.row_factory
     cursor.execute('''
         SELECT category_id, name, description FROM categories WHERE user_id = ?
     ''', (user_id,))
@@ -185,38 +201,423 @@ def get_categories(user_id):
 def add_activity(user_id, category_id, name, start_time, end_time, notes=None):
     """Add a new activity."""
     duration = calculate_duration(start_time, end_time)
-    conn = create_connection()
+    conn = create_connection(user_id)
     cursor = conn.cursor()
     try:
         cursor.execute('''
             INSERT INTO activities (user_id, category_id, name, start_time, end_time, duration, notes)
             VALUES (?, ?, ?, ?, ?, ?, ?)
         ''', (user_id, category_id, name, start_time, end_time, duration, notes))
+        apply_rollup_delta(cursor, user_id, start_time, category_id, duration, 1)
         conn.commit()
+        _notify_activity_insert(user_id, [name])
     except sqlite3.IntegrityError as e:
         print(f'Error: {e}')
         conn.rollback()
     finally:
         conn.close()
 
+def intern_activity_names(cursor, names):
+    """Add any new names to activity_names and return {name: name_id} for all of them."""
+    names = list(names)
+    cursor.executemany('INSERT OR IGNORE INTO activity_names (name) VALUES (?)', [(name,) for name in names])
+    name_ids = {}
+    for i in range(0, len(names), 500):
+        chunk = names[i:i + 500]
+        cursor.execute(f'''
+            SELECT name, name_id FROM activity_names WHERE name IN ({', '.join('?' * len(chunk))})
+        ''', chunk)
+        name_ids.update(cursor.fetchall())
+    return name_ids
+
+# Marker for timestamps that could not be parsed (the int64 value of NaT)
+INVALID_TIME = np.iinfo(np.int64).min
+
+def _parse_times_us(values):
+    """Parse ISO timestamps into int64 microseconds since the epoch, INVALID_TIME where unparseable."""
+    try:
+        with warnings.catch_warnings():
+            # NumPy converts UTC offsets itself but warns that it does so
+            warnings.simplefilter('ignore', UserWarning)
+            return np.array(values, dtype='datetime64[us]').astype(np.int64)
+    except (ValueError, TypeError):
+        pass
+    # Fall back to per-value parsing (e.g. timestamps with UTC offsets)
+    parsed = np.full(len(values), INVALID_TIME, dtype=np.int64)
+    for i, value in enumerate(values):
+        try:
+            dt = datetime.fromisoformat(value)
+        except (ValueError, TypeError):
+            continue
+        if dt.tzinfo is not None:
+            dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+        parsed[i] = (dt - datetime(1970, 1, 1)) // timedelta(microseconds=1)
+    return parsed
+
+# YYYY-MM-DD, optionally followed by a time; NumPy alone would also take bare years
+ISO_TIMESTAMP = re.compile(r'\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}|$)')
+
+def _bulk_row(activity):
+    """Normalize one add_activities_bulk input to (category_id, name, start_time, end_time, notes, problem)."""
+    try:
+        if isinstance(activity, dict):
+            category_id, name, start_time, end_time, notes = (
+                activity.get('category_id'),
+                activity.get('name'),
+                activity.get('start_time'),
+                activity.get('end_time'),
+                activity.get('notes'),
+            )
+        else:
+            category_id, name, start_time, end_time, *rest = activity
+            if len(rest) > 1:
+                raise ValueError
+            notes = rest[0] if rest else None
+    except (TypeError, ValueError):
+        return None, None, None, None, None, 'expected an object or a (category_id, name, start_time, end_time[, notes]) row'
+    if not name or (isinstance(name, str) and not name.strip()):
+        problem = 'missing activity name'
+    elif not isinstance(name, str):
+        problem = 'name must be text'
+    elif notes is not None and not isinstance(notes, str):
+        problem = 'notes must be text'
+    elif category_id is not None and (not isinstance(category_id, numbers.Integral) or isinstance(category_id, bool)):
+        problem = 'category_id must be an integer'
+    elif not all(isinstance(value, str) and ISO_TIMESTAMP.match(value) for value in (start_time, end_time)):
+        problem = 'start_time and end_time must be ISO 8601 timestamps'
+    else:
+        problem = None
+        # NumPy integers (e.g. from a DataFrame) cannot be bound as parameters
+        category_id = int(category_id) if category_id is not None else None
+    return category_id, name, start_time, end_time, notes, problem
+
+def add_activities_bulk(user_id, activities, skip_overlaps=False):
+    """
+    Validate and insert many activities in one transaction.
+
+    Each activity is a dict with 'name', 'start_time', 'end_time' and optional
+    'category_id' and 'notes' keys (or a tuple in that order: category_id,
+    name, start_time, end_time, notes). Names and notes must be strings,
+    times ISO 8601 strings and category_id one of the user's categories;
+    rows failing these checks are reported as 'invalid' without affecting
+    the rest of the batch. Durations are computed for the whole
+    batch at once. Exact duplicates (same name, start and end as an existing
+    or earlier row) are skipped; rows overlapping another activity are
+    inserted and reported as 'overlap', or skipped if skip_overlaps is True.
+
+    Returns a list with one {'status', 'message'} dict per input row, where
+    status is 'inserted', 'overlap', 'duplicate', 'skipped' or 'invalid'.
+    """
+    rows = []
+    problems = []
+    for activity in activities:
+        *row, problem = _bulk_row(activity)
+        rows.append(tuple(row))
+        problems.append(problem)
+    if not rows:
+        return []
+
+    count = len(rows)
+    results = [{'status': 'inserted', 'message': ''} for _ in range(count)]
+    starts = _parse_times_us([row[2] if problem is None else None for row, problem in zip(rows, problems)])
+    ends = _parse_times_us([row[3] if problem is None else None for row, problem in zip(rows, problems)])
+    durations = (ends - starts) // 60_000_000
+
+    # Validation
+    valid = np.ones(count, dtype=bool)
+    for i, problem in enumerate(problems):
+        if problem is not None:
+            message = problem
+        elif starts[i] == INVALID_TIME or ends[i] == INVALID_TIME:
+            message = 'unparseable start_time or end_time'
+        elif ends[i] < starts[i]:
+            message = 'end_time is before start_time'
+        else:
+            continue
+        valid[i] = False
+        results[i] = {'status': 'invalid', 'message': message}
+
+    valid_index = np.flatnonzero(valid)
+    if len(valid_index) == 0:
+        return results
+
+    conn = create_connection(user_id)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('BEGIN IMMEDIATE')
+
+        # Categories must be the user's own, checked in the transaction that inserts
+        cursor.execute('SELECT category_id FROM categories WHERE user_id = ?', (user_id,))
+        category_ids = {row[0] for row in cursor.fetchall()}
+        for i in valid_index.tolist():
+            if rows[i][0] is not None and rows[i][0] not in category_ids:
+                valid[i] = False
+                results[i] = {'status': 'invalid', 'message': 'unknown category_id'}
+        valid_index = np.flatnonzero(valid)
+        if len(valid_index) == 0:
+            conn.rollback()
+            return results
+
+        # Existing activities that could collide with the batch
+        first = np.datetime_as_string(starts[valid_index].min().astype('datetime64[us]'), unit='D')
+        last = np.datetime_as_string(ends[valid_index].max().astype('datetime64[us]') + np.timedelta64(1, 'D'), unit='D')
+        cursor.execute('''
+            SELECT name, start_time, end_time FROM activities
+            WHERE user_id = ? AND start_time < ? AND end_time > ?
+        ''', (user_id, last, first))
+        existing = cursor.fetchall()
+        existing_starts = _parse_times_us([row[1] for row in existing]) if existing else np.empty(0, dtype=np.int64)
+        existing_ends = _parse_times_us([row[2] for row in existing]) if existing else np.empty(0, dtype=np.int64)
+        seen = {(row[0], s, e) for row, s, e in zip(existing, existing_starts.tolist(), existing_ends.tolist())}
+
+        # Duplicates against the table and earlier rows of the batch
+        keep = []
+        for i in valid_index.tolist():
+            key = (rows[i][1], int(starts[i]), int(ends[i]))
+            if key in seen:
+                results[i] = {'status': 'duplicate', 'message': 'identical activity already exists'}
+            else:
+                seen.add(key)
+                keep.append(i)
+        keep = np.array(keep, dtype=np.int64)
+
+        if len(keep):
+            # Overlaps with existing activities: #(start < new end) - #(end <= new start)
+            existing_starts.sort()
+            existing_ends.sort()
+            overlaps_existing = (
+                np.searchsorted(existing_starts, ends[keep], side='left')
+                - np.searchsorted(existing_ends, starts[keep], side='right')
+            ) > 0
+
+            # Overlaps within the batch, after sorting by start time
+            order = np.argsort(starts[keep], kind='stable')
+            batch_starts = starts[keep][order]
+            batch_ends = ends[keep][order]
+            previous_max_end = np.maximum.accumulate(np.concatenate(([np.iinfo(np.int64).min], batch_ends[:-1])))
+            next_start = np.concatenate((batch_starts[1:], [np.iinfo(np.int64).max]))
+            overlaps_batch = np.empty(len(keep), dtype=bool)
+            overlaps_batch[order] = (batch_starts < previous_max_end) | (batch_ends > next_start)
+
+            overlapping = overlaps_existing | overlaps_batch
+            for i, overlap in zip(keep.tolist(), overlapping.tolist()):
+                if overlap:
+                    if skip_overlaps:
+                        results[i] = {'status': 'skipped', 'message': 'overlaps another activity'}
+                    else:
+                        results[i] = {'status': 'overlap', 'message': 'overlaps another activity'}
+            if skip_overlaps:
+                keep = keep[~overlapping]
+
+        # Intern the batch's distinct names once, so the per-row name_id trigger is skipped
+        name_ids = intern_activity_names(cursor, {rows[i][1] for i in keep.tolist()})
+
+        # Insert the remaining rows and roll them up per (day, category)
+        insert_rows = []
+        rollups = {}
+        for i in keep.tolist():
+            category_id, name, start_time, end_time, notes = rows[i]
+            duration = int(durations[i])
+            insert_rows.append((user_id, category_id, name, name_ids[name], start_time, end_time, duration, notes))
+            rollup = rollups.setdefault((str(start_time)[:10], category_id), [0, 0])
+            rollup[0] += duration
+            rollup[1] += 1
+        cursor.executemany('''
+            INSERT INTO activities (user_id, category_id, name, name_id, start_time, end_time, duration, notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', insert_rows)
+        for (day, category_id), (minutes, activity_count) in rollups.items():
+            apply_rollup_delta(cursor, user_id, day, category_id, minutes, activity_count)
+        conn.commit()
+        _notify_activity_insert(user_id, [row[2] for row in insert_rows])
+    except sqlite3.Error as e:
+        print(f'Error adding activities: {e}')
+        conn.rollback()
+        for i in valid_index.tolist():
+            if results[i]['status'] in ('inserted', 'overlap'):
+                results[i] = {'status': 'invalid', 'message': f'database error: {e}'}
+    finally:
+        conn.close()
+    return results
+
 def get_activities(user_id, start_date=None, end_date=None):
     """Get activities for a user, optionally filtered by date range."""
-    conn = create_connection()
+    conn = create_connection(user_id)
     cursor = conn.cursor()
-    query = '''
+    cursor.row_factory = Activity.row_factory
+    where = 'WHERE user_id = ?'
+    params = [user_id]
+    if start_date:
+        where += ' AND start_time >= ?'
+        params.append(start_date)
+    if end_date:
+        where += ' AND end_time <= ?'
+        params.append(end_date)
+    # Older years may live in archive partitions; read the ones the range touches
+    activities = []
+    for table in iter_activity_tables(conn, start_date, end_date):
+        cursor.execute(f'''
+            SELECT activity_id, category_id, name, start_time, end_time, duration, notes
+            FROM {table}
+            {where}
+        ''', params)
+        activities.extend(cursor.fetchall())
+    conn.close()
+    return activities
+
+def get_recent_activities(user_id, limit=5):
+    """Get a user's latest activities by start_time, newest first (archived years are not read)."""
+    conn = create_connection(user_id)
+    cursor = conn.cursor()
+    cursor.row_factory = Activity.row_factory
+    cursor.execute('''
         SELECT activity_id, category_id, name, start_time, end_time, duration, notes
         FROM activities
         WHERE user_id = ?
-    '''
+        ORDER BY start_time DESC
+        LIMIT ?
+    ''', (user_id, limit))
+    activities = cursor.fetchall()
+    conn.close()
+    return activities
+
+def get_activity_batch(user_id, start_date=None, end_date=None):
+    """Get activities for a user as a columnar ActivityBatch, optionally filtered by date range."""
+    return fetch_activity_columns(user_id, start_date, end_date, include_text=True)
+
+def fetch_activity_columns(user_id, start_date=None, end_date=None, include_text=False, chunk_size=ACTIVITY_FETCH_CHUNK_SIZE):
+    """
+    Stream activities straight into preallocated NumPy columns.
+
+    SQLite converts the timestamps to epoch seconds, and rows are copied
+    chunk_size at a time into int64 ids, category ids and times and int32
+    durations, so no full list of tuples or DataFrame is ever materialized.
+    Names arrive as interned name_ids and become categorical codes, with each
+    distinct name read once from activity_names. Notes are only fetched when
+    include_text is True. Archive partitions in the range are read too.
+
+    This is a library entry point for scripts and callers that need
+    per-activity arrays (see benchmarks/bench_columnar_fetch.py). The app's
+    pages do not use it: analytics and team dashboards aggregate in SQL and
+    never hold per-activity rows.
+
+    Returns an ActivityBatch (name and notes are None unless include_text).
+    """
+    where = 'WHERE user_id = ?'
     params = [user_id]
     if start_date:
-        query += ' AND start_time >= ?'
+        where += ' AND start_time >= ?'
         params.append(start_date)
     if end_date:
-        query += ' AND end_time <= ?'
+        where += ' AND end_time <= ?'
         params.append(end_date)
-    cursor.execute(query, params)
-    activities = cursor.fetchall()
+
+    conn = create_connection(user_id)
+    cursor = conn.cursor()
+    try:
+        parts = [
+            _read_activity_columns(cursor, table, where, params, include_text, chunk_size)
+            for table in iter_activity_tables(conn, start_date, end_date)
+        ]
+        columns = parts[-1] if len(parts) == 1 else {
+            key: np.concatenate([part[key] for part in parts]) if parts[-1][key] is not None else None
+            for key in parts[-1]
+        }
+        if len(parts) > 1:
+            # Activities backdated into the hot table can start before archived ones
+            order = np.argsort(columns['start_time'], kind='stable')
+            columns = {key: column[order] if column is not None else None for key, column in columns.items()}
+
+        # Resolve each distinct name once and renumber the ids into dense codes
+        unique_ids, name_code = np.unique(columns['name_id'], return_inverse=True)
+        names_by_id = {}
+        ids = unique_ids.tolist()
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            cursor.execute(f'''
+                SELECT name_id, name FROM activity_names WHERE name_id IN ({', '.join('?' * len(chunk))})
+            ''', chunk)
+            names_by_id.update(cursor.fetchall())
+    finally:
+        conn.close()
+
+    name_categories = np.array([names_by_id.get(i) for i in ids], dtype=object)
+    name_code = name_code.astype(np.int32)
+
+    return ActivityBatch(
+        activity_id=columns['activity_id'],
+        category_id=columns['category_id'],
+        name=name_categories[name_code] if include_text else None,
+        start_time=columns['start_time'].view('datetime64[s]'),
+        end_time=columns['end_time'].view('datetime64[s]'),
+        duration=columns['duration'],
+        notes=columns['notes'],
+        name_code=name_code,
+        name_categories=name_categories,
+    )
+
+def _read_activity_columns(cursor, table, where, params, include_text, chunk_size):
+    """Read one activity table into a dict of NumPy columns (see fetch_activity_columns)."""
+    text_columns = ', notes' if include_text else ''
+    # Count and read inside one transaction so both see the same snapshot
+    cursor.execute('BEGIN')
+    try:
+        cursor.execute(f'SELECT COUNT(*) FROM {table} {where}', params)
+        count = cursor.fetchone()[0]
+        columns = {
+            'activity_id': np.empty(count, dtype=np.int64),
+            'category_id': np.empty(count, dtype=np.int64),
+            'start_time': np.empty(count, dtype=np.int64),
+            'end_time': np.empty(count, dtype=np.int64),
+            'duration': np.empty(count, dtype=np.int32),
+            'name_id': np.empty(count, dtype=np.int64),
+            'notes': np.empty(count, dtype=object) if include_text else None,
+        }
+        cursor.execute(f'''
+            SELECT activity_id,
+                   IFNULL(category_id, {ActivityBatch.NO_CATEGORY}),
+                   IFNULL(CAST(strftime('%s', start_time) AS INTEGER), 0),
+                   IFNULL(CAST(strftime('%s', end_time) AS INTEGER), 0),
+                   IFNULL(duration, 0),
+                   IFNULL(name_id, -1)
+                   {text_columns}
+            FROM {table} {where}
+            ORDER BY start_time
+        ''', params)
+        offset = 0
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            stop = offset + len(rows)
+            if include_text:
+                block = np.array([row[:6] for row in rows], dtype=np.int64)
+                columns['notes'][offset:stop] = [row[6] for row in rows]
+            else:
+                block = np.array(rows, dtype=np.int64)
+            for i, key in enumerate(('activity_id', 'category_id', 'start_time', 'end_time', 'duration', 'name_id')):
+                columns[key][offset:stop] = block[:, i]
+            offset = stop
+    finally:
+        cursor.execute('COMMIT')
+    return columns
+
+def get_activities_by_id_range(user_id, start_date, end_date, min_activity_id=None, max_activity_id=None):
+    """Get activities started in [start_date, end_date) with activity_id in (min_activity_id, max_activity_id]."""
+    conn = create_connection(user_id)
+    cursor = conn.cursor()
+    where = 'WHERE user_id = ? AND start_time >= ? AND start_time < ?'
+    params = [user_id, start_date, end_date]
+    if min_activity_id is not None:
+        where += ' AND activity_id > ?'
+        params.append(min_activity_id)
+    if max_activity_id is not None:
+        where += ' AND activity_id <= ?'
+        params.append(max_activity_id)
+    activities = []
+    for table in iter_activity_tables(conn, start_date, end_date):
+        cursor.execute(f'SELECT activity_id, category_id, name, start_time, duration FROM {table} {where}', params)
+        activities.extend(cursor.fetchall())
     conn.close()
     return activities
 
@@ -227,9 +628,439 @@ def calculate_duration(start_time_str, end_time_str):
     delta = end_time - start_time
     return int(delta.total_seconds() / 60)
 
+# Callbacks notified with (user_id, first_date, last_date) after activities are edited or deleted
+_activity_change_listeners = []
+
+def register_activity_change_listener(listener):
+    """Register a callback for committed activity edits and deletes."""
+    if listener not in _activity_change_listeners:
+        _activity_change_listeners.append(listener)
+
+def _notify_activity_change(user_id, first_date, last_date):
+    for listener in _activity_change_listeners:
+        listener(user_id, first_date, last_date)
+
+# Callbacks notified with (user_id, names) after activities are inserted
+_activity_insert_listeners = []
+
+def register_activity_insert_listener(listener):
+    """Register a callback for committed activity inserts."""
+    if listener not in _activity_insert_listeners:
+        _activity_insert_listeners.append(listener)
+
+def _notify_activity_insert(user_id, names):
+    for listener in _activity_insert_listeners:
+        listener(user_id, names)
+
+def apply_rollup_delta(cursor, user_id, start_time, category_id, minutes, count):
+    """Add minutes and an activity count to the daily rollup of the activity's start day."""
+    day = start_time[:10]
+    cursor.execute('''
+        UPDATE activity_daily_rollups
+        SET total_minutes = total_minutes + ?, activity_count = activity_count + ?
+        WHERE user_id = ? AND day = ? AND category_id IS ?
+    ''', (minutes or 0, count, user_id, day, category_id))
+    if cursor.rowcount == 0:
+        cursor.execute('''
+            INSERT INTO activity_daily_rollups (user_id, day, category_id, total_minutes, activity_count)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (user_id, day, category_id, minutes or 0, count))
+    else:
+        cursor.execute('''
+            DELETE FROM activity_daily_rollups
+            WHERE user_id = ? AND day = ? AND category_id IS ? AND activity_count <= 0
+        ''', (user_id, day, category_id))
+
+def _affected_range(user_id, start_times, count):
+    days = [date.fromisoformat(start_time[:10]) for start_time in start_times]
+    return {
+        'user_id': user_id,
+        'start_date': min(days),
+        'end_date': max(days),
+        'activity_count': count,
+    }
+
+def update_activity(activity_id, category_id, name, start_time, end_time, notes=None):
+    """
+    Update an activity, recomputing its duration and the rollups in one transaction.
+
+    Returns a dict with the user_id and the first and last dates whose
+    aggregates changed, or None if the activity does not exist or the update failed.
+    """
+    duration = calculate_duration(start_time, end_time)
+    conn = create_connection(row_owner('activities', 'activity_id', activity_id))
+    cursor = conn.cursor()
+    try:
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute('''
+            SELECT user_id, category_id, start_time, duration FROM activities WHERE activity_id = ?
+        ''', (activity_id,))
+        old = cursor.fetchone()
+        if old is None:
+            conn.rollback()
+            return None
+        user_id, old_category_id, old_start_time, old_duration = old
+        cursor.execute('''
+            UPDATE activities
+            SET category_id = ?, name = ?, start_time = ?, end_time = ?, duration = ?, notes = ?
+            WHERE activity_id = ?
+        ''', (category_id, name, start_time, end_time, duration, notes, activity_id))
+        apply_rollup_delta(cursor, user_id, old_start_time, old_category_id, -(old_duration or 0), -1)
+        apply_rollup_delta(cursor, user_id, start_time, category_id, duration, 1)
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f'Error updating activity: {e}')
+        conn.rollback()
+        return None
+    finally:
+        conn.close()
+    affected = _affected_range(user_id, [old_start_time, start_time], 1)
+    _notify_activity_change(user_id, affected['start_date'], affected['end_date'])
+    return affected
+
+def delete_activity(activity_id):
+    """Delete an activity and its share of the rollups; returns the affected range or None."""
+    results = delete_activities([activity_id])
+    return results[0] if results else None
+
+def delete_activities(activity_ids):
+    """
+    Delete several activities and their share of the rollups in one transaction.
+
+    Returns a list with one affected-range dict per user whose activities were
+    deleted (empty if nothing was deleted or the delete failed).
+    """
+    activity_ids = list(activity_ids)
+    if not activity_ids:
+        return []
+    if SHARDING_ENABLED:
+        # Each owner's activities are deleted in their own shard's transaction
+        by_user = {}
+        for activity_id, user_id in row_owners('activities', 'activity_id', activity_ids).items():
+            by_user.setdefault(user_id, []).append(activity_id)
+        return [result for user_id, ids in by_user.items() for result in _delete_activities(ids, user_id)]
+    return _delete_activities(activity_ids)
+
+def _delete_activities(activity_ids, user_id=None):
+    """Delete activities from the main database, or from user_id's shard."""
+    conn = create_connection(user_id)
+    cursor = conn.cursor()
+    deleted = {}  # user_id: list of start times
+    try:
+        cursor.execute('BEGIN IMMEDIATE')
+        for offset in range(0, len(activity_ids), 500):
+            chunk = activity_ids[offset:offset + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            cursor.execute(f'''
+                SELECT activity_id, user_id, category_id, start_time, duration
+                FROM activities WHERE activity_id IN ({placeholders})
+            ''', chunk)
+            rows = cursor.fetchall()
+            cursor.execute(f'DELETE FROM activities WHERE activity_id IN ({placeholders})', chunk)
+            for _, user_id, category_id, start_time, duration in rows:
+                apply_rollup_delta(cursor, user_id, start_time, category_id, -(duration or 0), -1)
+                deleted.setdefault(user_id, []).append(start_time)
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f'Error deleting activities: {e}')
+        conn.rollback()
+        return []
+    finally:
+        conn.close()
+    results = []
+    for user_id, start_times in deleted.items():
+        affected = _affected_range(user_id, start_times, len(start_times))
+        _notify_activity_change(user_id, affected['start_date'], affected['end_date'])
+        results.append(affected)
+    return results
+
+def get_daily_rollups(user_id, start_date=None, end_date=None):
+    """Get (day, category_id, total_minutes, activity_count) rollups, optionally filtered by day range."""
+    conn = create_connection(user_id)
+    cursor = conn.cursor()
+    query = '''
+        SELECT day, category_id, total_minutes, activity_count
+        FROM activity_daily_rollups
+        WHERE user_id = ?
+    '''
+    params = [user_id]
+    if start_date:
+        query += ' AND day >= ?'
+        params.append(start_date)
+    if end_date:
+        query += ' AND day <= ?'
+        params.append(end_date)
+    cursor.execute(query + ' ORDER BY day', params)
+    rollups = cursor.fetchall()
+    conn.close()
+    return rollups
+
+def _aggregate_activities(user_id, select, group_by, start_date=None, end_date=None, category_ids=None, order_by=None, replica=False):
+    """
+    Run a GROUP BY over a user's activities and return the grouped rows.
+
+    start_date and end_date are inclusive days (date objects or 'YYYY-MM-DD'
+    strings) compared against start_time, so the (user_id, start_time) index
+    serves the range. category_ids may contain None for uncategorized.
+    With replica=True the query may read the snapshot from data.replica.
+
+    Archive partitions in the range are grouped separately and their sums
+    and counts added to the hot table's, so the select must list the
+    group_by columns first and only SUM/COUNT aggregates after them, and an
+    order_by must name the first aggregate.
+    """
+    where = 'WHERE user_id = ?'
+    params = [user_id]
+    if start_date:
+        where += ' AND start_time >= ?'
+        params.append(str(start_date)[:10])
+    if end_date:
+        where += ' AND start_time < ?'
+        params.append((date.fromisoformat(str(end_date)[:10]) + timedelta(days=1)).isoformat())
+    if category_ids is not None:
+        ids = [category_id for category_id in category_ids if category_id is not None]
+        conditions = []
+        if ids:
+            conditions.append(f"category_id IN ({', '.join('?' * len(ids))})")
+            params.extend(ids)
+        if None in category_ids:
+            conditions.append('category_id IS NULL')
+        where += f" AND ({' OR '.join(conditions) or '0'})"
+    conn = create_read_connection(user_id) if replica else create_connection(user_id)
+    cursor = conn.cursor()
+    results = []
+    for table in iter_activity_tables(conn, start_date, end_date):
+        cursor.execute(f'SELECT {select} FROM {table} {where} GROUP BY {group_by} ORDER BY {order_by or group_by}', params)
+        results.append(cursor.fetchall())
+    conn.close()
+    if len(results) == 1:
+        return results[0]
+    return _merge_groups(results, len(group_by.split(',')), order_by)
+
+def _merge_groups(results, key_count, order_by=None):
+    """Add up grouped rows from several tables; rows are (keys..., sums/counts...)."""
+    merged = {}
+    for rows in results:
+        for row in rows:
+            key, totals = row[:key_count], row[key_count:]
+            if key in merged:
+                totals = tuple(a + b for a, b in zip(merged[key], totals))
+            merged[key] = totals
+    rows = [key + totals for key, totals in merged.items()]
+    # SQLite sorts NULL first, e.g. uncategorized before every category_id
+    rows.sort(key=lambda row: tuple((value is not None, value) for value in row[:key_count]))
+    if order_by:
+        rows.sort(key=lambda row: row[key_count], reverse=order_by.upper().endswith('DESC'))
+    return rows
+
+def durations_by_day(user_id, start_date=None, end_date=None, category_ids=None, replica=False):
+    """Get (day, total_minutes) pairs, one per day with activities."""
+    return _aggregate_activities(
+        user_id,
+        'substr(start_time, 1, 10) AS day, COALESCE(SUM(duration), 0)',
+        'day',
+        start_date, end_date, category_ids, replica=replica
+    )
+
+def durations_by_category(user_id, start_date=None, end_date=None, category_ids=None, replica=False):
+    """Get (category_id, total_minutes, activity_count) rows, one per category."""
+    return _aggregate_activities(
+        user_id,
+        'category_id, COALESCE(SUM(duration), 0), COUNT(*)',
+        'category_id',
+        start_date, end_date, category_ids, replica=replica
+    )
+
+def durations_by_weekday_hour(user_id, start_date=None, end_date=None, category_ids=None, replica=False):
+    """Get (weekday, hour, total_minutes) rows with Monday as weekday 0."""
+    return _aggregate_activities(
+        user_id,
+        "(CAST(strftime('%w', start_time) AS INTEGER) + 6) % 7 AS weekday, "
+        "CAST(substr(start_time, 12, 2) AS INTEGER) AS hour, COALESCE(SUM(duration), 0)",
+        'weekday, hour',
+        start_date, end_date, category_ids, replica=replica
+    )
+
+def durations_by_period(user_id, period, start_date=None, end_date=None, category_ids=None, replica=False):
+    """
+    Get (period_start, total_minutes) pairs for 'week' (starting Monday) or 'month' periods.
+    """
+    if period == 'week':
+        period_start = "date(start_time, '-6 days', 'weekday 1')"
+    elif period == 'month':
+        period_start = "strftime('%Y-%m-01', start_time)"
+    else:
+        raise ValueError(f"Unknown period: {period}")
+    return _aggregate_activities(
+        user_id,
+        f'{period_start} AS period_start, COALESCE(SUM(duration), 0)',
+        'period_start',
+        start_date, end_date, category_ids, replica=replica
+    )
+
+def activity_name_counts(user_id, start_date=None, end_date=None, category_ids=None):
+    """Get (name_id, activity_count) pairs, most frequent first."""
+    return _aggregate_activities(
+        user_id,
+        'name_id, COUNT(*) AS activity_count',
+        'name_id',
+        start_date, end_date, category_ids,
+        order_by='activity_count DESC'
+    )
+
+def get_activity_names(name_ids, user_id=None):
+    """Get {name_id: name} for interned activity names (name ids are per shard, so pass the owner in sharding mode)."""
+    name_ids = list(name_ids)
+    if not name_ids:
+        return {}
+    conn = create_connection(user_id)
+    cursor = conn.cursor()
+    names = {}
+    # Stay well under SQLite's bound-parameter limit
+    for i in range(0, len(name_ids), 500):
+        chunk = name_ids[i:i + 500]
+        cursor.execute(f'''
+            SELECT name_id, name FROM activity_names WHERE name_id IN ({', '.join('?' * len(chunk))})
+        ''', chunk)
+        names.update(cursor.fetchall())
+    conn.close()
+    return names
+
+def get_activity_cells(user_id, start_date, end_date, min_activity_id=None, max_activity_id=None):
+    """
+    Get activities started in [start_date, end_date) grouped by day, category, hour and name.
+
+    Takes the same bounds as get_activities_by_id_range and returns
+    (day, category_id, hour, name_id, total_minutes, activity_count,
+    max_activity_id) rows, so running aggregates merge groups rather than
+    individual activities. Names are interned ids; see get_activity_names.
+    Archived years contribute their own rows for the same groups, which
+    callers add up like any other cells.
+    """
+    conn = create_connection(user_id)
+    cursor = conn.cursor()
+    where = 'WHERE user_id = ? AND start_time >= ? AND start_time < ?'
+    params = [user_id, start_date, end_date]
+    if min_activity_id is not None:
+        where += ' AND activity_id > ?'
+        params.append(min_activity_id)
+    if max_activity_id is not None:
+        where += ' AND activity_id <= ?'
+        params.append(max_activity_id)
+    cells = []
+    for table in iter_activity_tables(conn, start_date, end_date):
+        cursor.execute(f'''
+            SELECT substr(start_time, 1, 10) AS day, category_id,
+                   CAST(substr(start_time, 12, 2) AS INTEGER) AS hour, name_id,
+                   COALESCE(SUM(duration), 0), COUNT(*), MAX(activity_id)
+            FROM {table}
+            {where}
+            GROUP BY day, category_id, hour, name_id
+        ''', params)
+        cells.extend(cursor.fetchall())
+    conn.close()
+    return cells
+
+def _fts_query(text):
+    """
+    Turn free text into an FTS5 query: every word must match, the last one as a prefix.
+
+    Words are quoted so FTS5 operators and punctuation typed by the user are
+    searched for literally instead of raising syntax errors.
+    """
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"' for word in words) + '*'
+
+def _search_filters(user_id, start_date, end_date, category_ids):
+    where = 'f.activities_fts MATCH ? AND a.user_id = ?'
+    params = [user_id]
+    if start_date:
+        where += ' AND a.start_time >= ?'
+        params.append(str(start_date)[:10])
+    if end_date:
+        where += ' AND a.start_time < ?'
+        params.append((date.fromisoformat(str(end_date)[:10]) + timedelta(days=1)).isoformat())
+    if category_ids is not None:
+        ids = [category_id for category_id in category_ids if category_id is not None]
+        conditions = []
+        if ids:
+            conditions.append(f"a.category_id IN ({', '.join('?' * len(ids))})")
+            params.extend(ids)
+        if None in category_ids:
+            conditions.append('a.category_id IS NULL')
+        where += f" AND ({' OR '.join(conditions) or '0'})"
+    return where, params
+
+def _search_tables(conn, start_date, end_date):
+    """Yield (FTS table, activity table) pairs: each archive partition in range has its own index."""
+    for table in iter_activity_tables(conn, start_date, end_date):
+        yield f"{table.split('.')[0]}.activities_fts", table
+
+def search_activities(user_id, text, start_date=None, end_date=None, category_ids=None, limit=SEARCH_RESULT_LIMIT):
+    """
+    Full-text search over a user's activity names and notes.
+
+    The CROSS JOIN keeps the FTS index as the outer loop whatever the table
+    statistics say; scanning a user's activities and probing the index per row
+    is orders of magnitude slower. Matches rank by BM25 with name hits
+    weighted above notes hits. Dates are
+    inclusive days and category_ids may contain None for uncategorized.
+    Archived years in the range are searched through their own indexes and
+    ranked together with the hot table's hits.
+    Returns at most `limit` SearchHit records, best first; snippet marks the
+    matched words with **.
+    """
+    query = _fts_query(text)
+    if query is None:
+        return []
+    where, params = _search_filters(user_id, start_date, end_date, category_ids)
+    conn = create_connection(user_id)
+    cursor = conn.cursor()
+    cursor.row_factory = SearchHit.row_factory
+    hits = []
+    for fts_table, table in _search_tables(conn, start_date, end_date):
+        cursor.execute(f'''
+            SELECT a.activity_id, a.category_id, a.name, a.start_time, a.end_time, a.duration, a.notes,
+                   snippet(f.activities_fts, -1, '**', '**', '...', 12),
+                   bm25(f.activities_fts, 10.0, 1.0) AS score
+            FROM {fts_table} AS f
+            CROSS JOIN {table} a ON a.activity_id = f.rowid
+            WHERE {where}
+            ORDER BY score
+            LIMIT ?
+        ''', [query, *params, limit])
+        hits.extend(cursor.fetchall())
+    conn.close()
+    hits.sort(key=lambda hit: hit.score)
+    return hits[:limit]
+
+def search_totals(user_id, text, start_date=None, end_date=None, category_ids=None):
+    """Return (matching activities, total minutes) for a search, without the result cap."""
+    query = _fts_query(text)
+    if query is None:
+        return 0, 0
+    where, params = _search_filters(user_id, start_date, end_date, category_ids)
+    conn = create_connection(user_id)
+    cursor = conn.cursor()
+    matches, minutes = 0, 0
+    for fts_table, table in _search_tables(conn, start_date, end_date):
+        cursor.execute(f'''
+            SELECT COUNT(*), COALESCE(SUM(a.duration), 0)
+            FROM {fts_table} AS f
+            CROSS JOIN {table} a ON a.activity_id = f.rowid
+            WHERE {where}
+        ''', [query, *params])
+        table_matches, table_minutes = cursor.fetchone()
+        matches += table_matches
+        minutes += table_minutes
+    conn.close()
+    return matches, minutes
+
 def add_goal(user_id, category_id, time_target, period, start_date_str, end_date_str=None):
-    """Add a new goal."""
-    conn = create_connection()
+    """Add a new goal; returns its goal_id, or None if the insert failed."""
+    conn = create_connection(user_id)
     cursor = conn.cursor()
     try:
         cursor.execute('''
@@ -237,6 +1068,7 @@ def add_goal(user_id, category_id, time_target, period, start_date_str, end_date
             VALUES (?, ?, ?, ?, ?, ?)
         ''', (user_id, category_id, time_target, period, start_date_str, end_date_str))
         conn.commit()
+        return cursor.lastrowid
     except sqlite3.Error as e:
         print(f'Error: {e}')
         conn.rollback()
@@ -245,8 +1077,9 @@ def add_goal(user_id, category_id, time_target, period, start_date_str, end_date
 
 def get_goals(user_id):
     """Get goals for a user."""
-    conn = create_connection()
+    conn = create_connection(user_id)
     cursor = conn.cursor()
+    cursor.row_factory = Goal.row_factory
     cursor.execute('''
         SELECT goal_id, category_id, time_target, period, start_date, end_date
         FROM goals
@@ -258,7 +1091,7 @@ def get_goals(user_id):
 
 def add_setting(user_id, setting_name, setting_value):
     """Add or update a user setting."""
-    conn = create_connection()
+    conn = create_connection(user_id)
     cursor = conn.cursor()
     try:
         cursor.execute('''
@@ -275,8 +1108,9 @@ def add_setting(user_id, setting_name, setting_value):
 
 def get_settings(user_id):
     """Get settings for a user."""
-    conn = create_connection()
+    conn = create_connection(user_id)
     cursor = conn.cursor()
+    cursor.row_factory = Setting.row_factory
     cursor.execute('''
         SELECT setting_name, setting_value FROM settings WHERE user_id = ?
     ''', (user_id,))
@@ -299,7 +1133,7 @@ def initialize_database():
 
 def update_goal(goal_id, category_id, time_target, period, start_date, end_date=None):
     """Update an existing goal."""
-    conn = create_connection()
+    conn = create_connection(row_owner('goals', 'goal_id', goal_id))
     cursor = conn.cursor()
     try:
         cursor.execute('''
@@ -316,7 +1150,7 @@ def update_goal(goal_id, category_id, time_target, period, start_date, end_date=
 
 def delete_goal(goal_id):
     """Delete a goal."""
-    conn = create_connection()
+    conn = create_connection(row_owner('goals', 'goal_id', goal_id))
     cursor = conn.cursor()
     try:
         cursor.execute('DELETE FROM goals WHERE goal_id = ?', (goal_id,))
@@ -330,7 +1164,7 @@ def delete_goal(goal_id):
 
 def update_category(category_id, name, description):
     """Update an existing category."""
-    conn = create_connection()
+    conn = create_connection(row_owner('categories', 'category_id', category_id))
     cursor = conn.cursor()
     try:
         cursor.execute('''
@@ -346,22 +1180,53 @@ def update_category(category_id, name, description):
         conn.close()
 
 def delete_category(category_id):
-    """Delete a category."""
-    conn = create_connection()
+    """
+    Delete a category; its activities become uncategorized.
+
+    The foreign key sets activities.category_id to NULL, and in the same
+    transaction the category's daily rollups are merged into the
+    uncategorized ones. Archived activities are re-keyed afterwards, one
+    partition at a time (the DuckDB mirror sees those on its next full
+    copy), and change listeners are told which days changed.
+    """
+    conn = create_connection(row_owner('categories', 'category_id', category_id))
     cursor = conn.cursor()
     try:
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute('SELECT user_id FROM categories WHERE category_id = ?', (category_id,))
+        row = cursor.fetchone()
+        if row is None:
+            conn.rollback()
+            return
+        user_id = row[0]
+        cursor.execute('''
+            SELECT day, total_minutes, activity_count FROM activity_daily_rollups
+            WHERE user_id = ? AND category_id = ?
+        ''', (user_id, category_id))
+        rollups = cursor.fetchall()
+        cursor.execute('DELETE FROM activity_daily_rollups WHERE user_id = ? AND category_id = ?', (user_id, category_id))
+        for day, minutes, count in rollups:
+            apply_rollup_delta(cursor, user_id, day, None, minutes, count)
         cursor.execute('DELETE FROM categories WHERE category_id = ?', (category_id,))
         conn.commit()
+        for table in iter_activity_tables(conn):
+            if table != 'main.activities':
+                cursor.execute(f'UPDATE {table} SET category_id = NULL WHERE category_id = ?', (category_id,))
+                conn.commit()
     except sqlite3.Error as e:
         print(f'Error deleting category: {e}')
         conn.rollback()
+        return
     finally:
         conn.close()
+    if rollups:
+        days = [rollup[0] for rollup in rollups]
+        _notify_activity_change(user_id, date.fromisoformat(min(days)), date.fromisoformat(max(days)))
 
 # Setting-related functions
 def add_setting(user_id, setting_name, setting_value):
     """Add or update a user setting."""
-    conn = create_connection()
+    conn = create_connection(user_id)
     cursor = conn.cursor()
     try:
         cursor.execute('''
@@ -378,8 +1243,9 @@ def add_setting(user_id, setting_name, setting_value):
 
 def get_settings(user_id):
     """Get all settings for a user."""
-    conn = create_connection()
+    conn = create_connection(user_id)
     cursor = conn.cursor()
+    cursor.row_factory = Setting.row_factory
     cursor.execute('''
         SELECT setting_name, setting_value FROM settings WHERE user_id = ?
     ''', (user_id,))
@@ -389,15 +1255,18 @@ def get_settings(user_id):
 # data/models.py
 
 def export_user_data(user_id):
-    """Export all user data."""
-    conn = create_connection()
+    """Export all user data, read from the replica when it is fresh enough."""
+    conn = create_read_connection(user_id)
     cursor = conn.cursor()
 
-    # Export activities
-    cursor.execute('''
-        SELECT * FROM activities WHERE user_id = ?
-    ''', (user_id,))
-    activities = cursor.fetchall()
+    # Export activities, including archived years
+    activities = []
+    for table in iter_activity_tables(conn):
+        cursor.execute(f'''
+            SELECT activity_id, user_id, category_id, name, start_time, end_time, duration, notes, created_at
+            FROM {table} WHERE user_id = ?
+        ''', (user_id,))
+        activities.extend(cursor.fetchall())
     activities_df = pd.DataFrame(activities, columns=['activity_id', 'user_id', 'category_id', 'name', 'start_time', 'end_time', 'duration', 'notes', 'created_at'])
 
     # Export categories
@@ -421,7 +1290,7 @@ def import_user_data(user_id, uploaded_file):
     # Read the CSV file into a DataFrame
     data_df = pd.read_csv(uploaded_file)
 
-    conn = create_connection()
+    conn = create_connection(user_id)
     cursor = conn.cursor()
     try:
         # Insert data into activities or categories tables accordingly
@@ -439,13 +1308,179 @@ def import_user_data(user_id, uploaded_file):
                 row['duration'],
                 row['notes']
             ))
+            apply_rollup_delta(cursor, user_id, str(row['start_time']), row['category_id'], row['duration'], 1)
         conn.commit()
+        _notify_activity_insert(user_id, list(data_df['name']))
     except sqlite3.Error as e:
         print(f'Error importing data: {e}')
         conn.rollback()
     finally:
         conn.close()
 
+TEAM_ROLES = ('owner', 'manager', 'member')
+
+def create_team(name, owner_id):
+    """Create a team owned by owner_id, who becomes its first member; returns the team_id or None."""
+    conn = create_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('INSERT INTO teams (name, owner_id) VALUES (?, ?)', (name, owner_id))
+        team_id = cursor.lastrowid
+        cursor.execute('''
+            INSERT INTO team_members (team_id, user_id, role) VALUES (?, ?, 'owner')
+        ''', (team_id, owner_id))
+        conn.commit()
+        return team_id
+    except sqlite3.IntegrityError as e:
+        print(f'Error: {e}')
+        conn.rollback()
+        return None
+    finally:
+        conn.close()
+
+def delete_team(team_id):
+    """Delete a team and its memberships."""
+    conn = create_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('DELETE FROM teams WHERE team_id = ?', (team_id,))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f'Error: {e}')
+        conn.rollback()
+    finally:
+        conn.close()
+
+def add_team_member(team_id, user_id, role='member'):
+    """Add a user to a team, or change their role; returns True on success."""
+    if role not in TEAM_ROLES:
+        raise ValueError(f"Unknown team role: {role}")
+    conn = create_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            INSERT INTO team_members (team_id, user_id, role)
+            VALUES (?, ?, ?)
+            ON CONFLICT(team_id, user_id) DO UPDATE SET role=excluded.role
+        ''', (team_id, user_id, role))
+        conn.commit()
+        return True
+    except sqlite3.IntegrityError as e:
+        print(f'Error: {e}')
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+def remove_team_member(team_id, user_id):
+    """Remove a user from a team."""
+    conn = create_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('DELETE FROM team_members WHERE team_id = ? AND user_id = ?', (team_id, user_id))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f'Error: {e}')
+        conn.rollback()
+    finally:
+        conn.close()
+
+def get_teams(user_id):
+    """Get the teams a user belongs to, with the user's role in each."""
+    conn = create_connection()
+    cursor = conn.cursor()
+    cursor.row_factory = Team.row_factory
+    cursor.execute('''
+        SELECT t.team_id, t.name, t.owner_id, m.role
+        FROM teams t
+        JOIN team_members m ON m.team_id = t.team_id
+        WHERE m.user_id = ?
+        ORDER BY t.name
+    ''', (user_id,))
+    teams = cursor.fetchall()
+    conn.close()
+    return teams
+
+def get_team_members(team_id):
+    """Get the members of a team."""
+    conn = create_connection()
+    cursor = conn.cursor()
+    cursor.row_factory = TeamMember.row_factory
+    cursor.execute('''
+        SELECT u.user_id, u.username, m.role
+        FROM team_members m
+        JOIN users u ON u.user_id = m.user_id
+        WHERE m.team_id = ?
+        ORDER BY u.username
+    ''', (team_id,))
+    members = cursor.fetchall()
+    conn.close()
+    return members
+
+# API token functions
+def _hash_api_token(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def create_api_token(user_id, name):
+    """Create an API token for a user; returns the token, which is only stored hashed."""
+    token = secrets.token_urlsafe(32)
+    conn = create_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            INSERT INTO api_tokens (token_hash, user_id, name) VALUES (?, ?, ?)
+        ''', (_hash_api_token(token), user_id, name))
+        conn.commit()
+    finally:
+        conn.close()
+    return token
+
+def get_api_token_user(token):
+    """Get the user_id an API token belongs to, or None."""
+    conn = create_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT user_id FROM api_tokens WHERE token_hash = ?', (_hash_api_token(token),))
+    row = cursor.fetchone()
+    conn.close()
+    return row[0] if row else None
+
+def get_api_tokens(user_id):
+    """Get (token_id, name, created_at) for a user's API tokens."""
+    conn = create_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT token_id, name, created_at FROM api_tokens WHERE user_id = ? ORDER BY token_id', (user_id,))
+    tokens = cursor.fetchall()
+    conn.close()
+    return tokens
+
+def revoke_api_token(user_id, token_id):
+    """Delete one of a user's API tokens."""
+    conn = create_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('DELETE FROM api_tokens WHERE token_id = ? AND user_id = ?', (token_id, user_id))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f'Error revoking API token: {e}')
+        conn.rollback()
+    finally:
+        conn.close()
+
+def get_activity_watermarks(user_ids):
+    """Get {user_id: highest activity_id} for the given users (users without activities are omitted)."""
+    watermarks = {}
+    for user_ids in group_users_by_database(user_ids).values():
+        conn = create_connection(user_ids[0])
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT user_id, MAX(activity_id) FROM activities
+            WHERE user_id IN ({', '.join('?' * len(user_ids))})
+            GROUP BY user_id
+        ''', user_ids)
+        watermarks.update(cursor.fetchall())
+        conn.close()
+    return watermarks
+
 if __name__ == '__main__':
     # This block will run if the script is executed directly
     initialize_database()
\ No newline at end of file
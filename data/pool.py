@@ -0,0 +1,115 @@
+# data/pool.py
+
+import os
+import sqlite3
+import threading
+
+from config import QUERY_INSTRUMENTATION, POOL_SIZE, POOL_TIMEOUT_SECONDS
+from .instrumentation import HookedConnection, InstrumentedConnection, run_close_hooks, set_connection_provider
+
+_Base = InstrumentedConnection if QUERY_INSTRUMENTATION else HookedConnection
+
+
+class PooledConnection(_Base):
+    """Connection whose close() hands it back to its pool instead of closing the file."""
+
+    def close(self):
+        pool = getattr(self, 'pool', None)
+        if pool is None:
+            return super().close()
+        # The borrower is done with it, so run the close hooks and record pending query stats now
+        run_close_hooks(self)
+        for cursor in list(getattr(self, '_cursors', ())):
+            cursor._flush()
+        if not pool.release(self):
+            sqlite3.Connection.close(self)
+
+
+class ConnectionPool:
+    """
+    Bounded set of reusable connections to one database file.
+
+    At most `size` connections are open; acquire() waits for one to be
+    returned, so a burst of requests queues here instead of opening ever more
+    files and lock waiters. Connections are shared across threads, one
+    borrower at a time.
+    """
+
+    def __init__(self, database, size=POOL_SIZE, timeout=POOL_TIMEOUT_SECONDS):
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self._idle = []
+        self._open = 0
+        self._available = threading.Condition()
+
+    def acquire(self):
+        with self._available:
+            if not self._idle and self._open >= self.size:
+                if not self._available.wait_for(lambda: self._idle or self._open < self.size, self.timeout):
+                    raise sqlite3.OperationalError(f"connection pool for {self.database} exhausted")
+            if self._idle:
+                return self._idle.pop()
+            self._open += 1
+        try:
+            conn = sqlite3.connect(self.database, factory=PooledConnection, check_same_thread=False)
+        except sqlite3.Error:
+            with self._available:
+                self._open -= 1
+                self._available.notify()
+            raise
+        conn.pool = self
+        return conn
+
+    def release(self, conn):
+        """Take a connection back; returns False if it should be closed for real instead."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = None
+            # Attachments left behind (e.g. an abandoned archive scan) would leak into the next borrower
+            reusable = len(sqlite3.Connection.execute(conn, 'PRAGMA database_list').fetchall()) <= 2
+        except sqlite3.Error:
+            reusable = False
+        with self._available:
+            if reusable:
+                self._idle.append(conn)
+            else:
+                self._open -= 1
+            self._available.notify()
+        return reusable
+
+    def close(self):
+        with self._available:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for conn in idle:
+            conn.pool = None
+            conn.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _pooled_connection(database):
+    path = os.path.abspath(database)
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = _pools[path] = ConnectionPool(path)
+    return pool.acquire()
+
+
+def enable_connection_pool():
+    """Serve every data layer connection in this process from per-file pools."""
+    set_connection_provider(_pooled_connection)
+
+
+def disable_connection_pool():
+    set_connection_provider(None)
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
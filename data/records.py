@@ -0,0 +1,182 @@
+# data/records.py
+
+import numpy as np
+import pandas as pd
+
+
+class Record:
+    """
+    Base class for slotted row records.
+
+    Records expose their columns as attributes (activity.duration) but still
+    iterate, unpack and index like the tuples the data layer used to return.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for field, value in zip(self.__slots__, values):
+            setattr(self, field, value)
+
+    @classmethod
+    def row_factory(cls, cursor, row):
+        """sqlite3 row factory building this record type."""
+        return cls(*row)
+
+    def __iter__(self):
+        return (getattr(self, field) for field in self.__slots__)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self)[index]
+        return getattr(self, self.__slots__[index])
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, tuple)):
+            return tuple(self) == tuple(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        values = ', '.join(f'{field}={getattr(self, field)!r}' for field in self.__slots__)
+        return f'{type(self).__name__}({values})'
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+class User(Record):
+    __slots__ = ('user_id', 'username', 'email', 'password_hash')
+
+
+class Category(Record):
+    __slots__ = ('category_id', 'name', 'description')
+
+
+class Activity(Record):
+    __slots__ = ('activity_id', 'category_id', 'name', 'start_time', 'end_time', 'duration', 'notes')
+
+
+class Goal(Record):
+    __slots__ = ('goal_id', 'category_id', 'time_target', 'period', 'start_date', 'end_date')
+
+
+class Setting(Record):
+    __slots__ = ('setting_name', 'setting_value')
+
+
+class Team(Record):
+    __slots__ = ('team_id', 'name', 'owner_id', 'role')
+
+
+class TeamMember(Record):
+    __slots__ = ('user_id', 'username', 'role')
+
+
+class SearchHit(Record):
+    __slots__ = ('activity_id', 'category_id', 'name', 'start_time', 'end_time', 'duration', 'notes', 'snippet', 'score')
+
+
+class Change(Record):
+    __slots__ = ('seq', 'table_name', 'row_id', 'user_id', 'operation', 'changed_at', 'old_values', 'new_values')
+
+
+def records_to_frame(records, record_type):
+    """Build a DataFrame with the record type's columns from a list of records."""
+    return pd.DataFrame([tuple(record) for record in records], columns=list(record_type.__slots__))
+
+
+class ActivityBatch:
+    """
+    Column-oriented activities backed by NumPy arrays.
+
+    Times are datetime64[s], category_id is int64 with -1 for uncategorized
+    (ids carry the shard number in their high bits, see data.database), and
+    duration is int32 minutes (0 when missing). Names may come as
+    categorical codes: name_code is int32 indexing name_categories, so
+    grouping and counting by name are integer operations. name and notes are
+    object arrays, or None when the batch was fetched without text columns.
+    """
+
+    __slots__ = ('activity_id', 'category_id', 'name', 'start_time', 'end_time', 'duration', 'notes',
+                 'name_code', 'name_categories')
+
+    NO_CATEGORY = -1
+
+    def __init__(self, activity_id, category_id, name, start_time, end_time, duration, notes,
+                 name_code=None, name_categories=None):
+        self.activity_id = activity_id
+        self.category_id = category_id
+        self.name = name
+        self.start_time = start_time
+        self.end_time = end_time
+        self.duration = duration
+        self.notes = notes
+        self.name_code = name_code
+        self.name_categories = name_categories
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a batch from Activity records or tuples in Activity column order."""
+        count = len(rows)
+        columns = list(zip(*rows)) if count else [()] * 7
+        name_categories, name_code = np.unique(np.array(columns[2], dtype=object), return_inverse=True)
+        return cls(
+            activity_id=np.fromiter(columns[0], dtype=np.int64, count=count),
+            category_id=np.fromiter(
+                (cls.NO_CATEGORY if value is None else value for value in columns[1]),
+                dtype=np.int64,
+                count=count
+            ),
+            name=np.array(columns[2], dtype=object),
+            start_time=np.array(columns[3], dtype='datetime64[s]'),
+            end_time=np.array(columns[4], dtype='datetime64[s]'),
+            duration=np.fromiter((value or 0 for value in columns[5]), dtype=np.int32, count=count),
+            notes=np.array(columns[6], dtype=object),
+            name_code=name_code.astype(np.int32),
+            name_categories=name_categories,
+        )
+
+    def __len__(self):
+        return len(self.activity_id)
+
+    @property
+    def date(self):
+        """Start date of every activity as datetime64[D]."""
+        return self.start_time.astype('datetime64[D]')
+
+    def daily_totals(self):
+        """Return (dates, total minutes) arrays, one entry per active day."""
+        dates, index = np.unique(self.date, return_inverse=True)
+        totals = np.bincount(index, weights=self.duration, minlength=len(dates)).astype(np.int64)
+        return dates, totals
+
+    def name_counts(self):
+        """Return (names, counts) arrays, most frequent name first."""
+        counts = np.bincount(self.name_code, minlength=len(self.name_categories))
+        order = np.argsort(counts, kind='stable')[::-1]
+        return self.name_categories[order], counts[order]
+
+    def to_frame(self):
+        """Convert to a DataFrame with the same columns as get_activities rows."""
+        category_id = self.category_id.astype(object)
+        category_id[self.category_id == self.NO_CATEGORY] = None
+        frame = pd.DataFrame({
+            'activity_id': self.activity_id,
+            'category_id': category_id,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'duration': self.duration,
+        })
+        if self.name_code is not None:
+            frame.insert(2, 'name', pd.Categorical.from_codes(self.name_code, self.name_categories))
+        elif self.name is not None:
+            frame.insert(2, 'name', self.name)
+        if self.notes is not None:
+            frame['notes'] = self.notes
+        return frame
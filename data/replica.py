@@ -0,0 +1,110 @@
+# data/replica.py
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from config import REPLICA_ENABLED, REPLICA_PATH, REPLICA_MAX_AGE_SECONDS, REPLICA_PAGES_PER_STEP, SHARDING_ENABLED
+from .database import DATABASE_NAME, create_connection
+from .instrumentation import connect
+
+_refresh_lock = threading.Lock()
+
+
+def replica_age(path=REPLICA_PATH):
+    """Seconds since the replica's snapshot was taken, or None if there is no replica."""
+    try:
+        return time.time() - os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def refresh_replica(path=REPLICA_PATH, pages=REPLICA_PAGES_PER_STEP):
+    """
+    Copy the database into the replica file with SQLite's online backup API.
+
+    The copy is written to a temporary file and renamed over the replica, so
+    readers that already have the old snapshot open keep reading it. Between
+    backup steps the source is unlocked and writers can commit. The replica's
+    mtime is set to when the copy started, which is the age readers check.
+
+    Returns the seconds the copy took.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Unique per process and thread, so concurrent refreshes never share a file
+    temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    started_at = time.time()
+    source = sqlite3.connect(DATABASE_NAME)
+    target = sqlite3.connect(temp_path)
+    try:
+        source.backup(target, pages=pages)
+        # The copy keeps the source's journal mode; a read-only replica needs no WAL
+        target.execute('PRAGMA journal_mode = DELETE')
+    except sqlite3.Error:
+        target.close()
+        os.remove(temp_path)
+        raise
+    finally:
+        source.close()
+    target.close()
+    os.utime(temp_path, (started_at, started_at))
+    os.replace(temp_path, path)
+    return time.time() - started_at
+
+
+def _refresh_in_background():
+    """Start a replica refresh on a daemon thread unless one is already running."""
+    if not _refresh_lock.acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            refresh_replica()
+        except (sqlite3.Error, OSError) as e:
+            print(f"Error refreshing replica: {e}")
+        finally:
+            _refresh_lock.release()
+
+    threading.Thread(target=run, name='replica-refresh', daemon=True).start()
+
+
+def create_read_connection(user_id=None, max_age=REPLICA_MAX_AGE_SECONDS):
+    """
+    Open a connection for long analytics and export reads.
+
+    Returns a read-only connection to the replica when its snapshot is at
+    most max_age seconds old, so the scan holds no lock on the live database.
+    Otherwise a refresh is started in the background and a primary connection
+    is returned, so reads are never staler than the bound.
+
+    In sharding mode a user's reads go to their shard instead; the replica
+    only copies the main database.
+    """
+    if SHARDING_ENABLED and user_id is not None:
+        return create_connection(user_id)
+    if REPLICA_ENABLED:
+        age = replica_age()
+        if age is not None and age <= max_age:
+            try:
+                return connect(f'file:{os.path.abspath(REPLICA_PATH)}?mode=ro', uri=True)
+            except sqlite3.Error as e:
+                print(f"Error connecting to replica: {e}")
+        else:
+            _refresh_in_background()
+    return create_connection()
+
+
+if __name__ == '__main__':
+    # Usage: python -m data.replica [status | refresh]
+    command = sys.argv[1] if len(sys.argv) > 1 else 'status'
+    if command == 'refresh':
+        print(f"Replica refreshed in {refresh_replica() * 1000:.0f} ms")
+    elif command == 'status':
+        age = replica_age()
+        print(f"{REPLICA_PATH}: " + ("missing" if age is None else f"{age:.0f} s old, {os.path.getsize(REPLICA_PATH) / 1024:.0f} KB"))
+    else:
+        sys.exit("Usage: python -m data.replica [status | refresh]")
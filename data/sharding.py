@@ -0,0 +1,199 @@
+# data/sharding.py
+
+import sys
+import time
+
+from config import SHARDING_ENABLED, SHARD_MAP_CACHE_SECONDS
+from .database import (
+    DATABASE_NAME,
+    get_shards,
+    create_shard,
+    copy_user_row,
+    forget_shard_placement,
+)
+from .instrumentation import connect
+
+# User-owned tables in insert order (parents first), with their own id column
+USER_TABLES = (
+    ('categories', 'category_id'),
+    ('activities', 'activity_id'),
+    ('goals', 'goal_id'),
+    ('settings', 'setting_id'),
+    ('activity_daily_rollups', None),
+)
+# Users moved per batch; routing for a batch's users waits until its moves commit
+MOVE_BATCH_SIZE = 20
+
+
+def get_placements():
+    """Return {user_id: shard_id} for every user; users without a shard_map row are on shard 0."""
+    conn = connect(DATABASE_NAME)
+    try:
+        rows = conn.execute('''
+            SELECT u.user_id, COALESCE(m.shard_id, 0) FROM users u
+            LEFT JOIN shard_map m ON m.user_id = u.user_id
+        ''').fetchall()
+    finally:
+        conn.close()
+    return dict(rows)
+
+
+def _copy_columns(conn, table, id_column):
+    """Column list of a table without its id (re-allocated in the target) or interned name_id."""
+    return [row[1] for row in conn.execute(f'PRAGMA main.table_info({table})') if row[1] not in (id_column, 'name_id')]
+
+
+def _move(user_id, source_path, shard_id, target_path):
+    """
+    Copy one user's rows into the target shard and delete them from the source.
+
+    Rows get new ids from the target's own range (AUTOINCREMENT would
+    otherwise continue from the copied ids, which belong to another shard's
+    range), with category references remapped. The copy, the delete and
+    the shard_map update commit together: with rollback journals, SQLite
+    commits a transaction over attached databases atomically.
+
+    Returns the number of activities moved.
+    """
+    conn = connect(source_path)
+    conn.execute('PRAGMA foreign_keys = 1')
+    try:
+        conn.execute('ATTACH DATABASE ? AS target', (target_path,))
+        if source_path == DATABASE_NAME:
+            directory = 'main'
+        elif target_path == DATABASE_NAME:
+            directory = 'target'
+        else:
+            directory = 'directory'
+            conn.execute('ATTACH DATABASE ? AS directory', (DATABASE_NAME,))
+        conn.execute('CREATE TEMP TABLE IF NOT EXISTS category_map (old_id INTEGER PRIMARY KEY, new_id INTEGER)')
+        conn.execute('BEGIN IMMEDIATE')
+        if target_path != DATABASE_NAME:
+            copy_user_row(conn, user_id, 'target', directory)
+        moved = 0
+        for table, id_column in USER_TABLES:
+            columns = _copy_columns(conn, table, id_column)
+            select = [
+                '(SELECT new_id FROM temp.category_map WHERE old_id = category_id)' if column == 'category_id' and table != 'categories' else column
+                for column in columns
+            ]
+            cursor = conn.execute(f'''
+                INSERT INTO target.{table} ({', '.join(columns)})
+                SELECT {', '.join(select)} FROM main.{table} WHERE user_id = ? ORDER BY rowid
+            ''', (user_id,))
+            if table == 'categories':
+                conn.execute('DELETE FROM temp.category_map')
+                conn.execute('''
+                    INSERT INTO temp.category_map (old_id, new_id)
+                    SELECT s.category_id, t.category_id FROM main.categories s
+                    JOIN target.categories t ON t.user_id = s.user_id AND t.name = s.name
+                    WHERE s.user_id = ?
+                ''', (user_id,))
+            elif table == 'activities':
+                moved = cursor.rowcount
+        for table, _ in reversed(USER_TABLES):
+            conn.execute(f'DELETE FROM main.{table} WHERE user_id = ?', (user_id,))
+        if source_path != DATABASE_NAME:
+            conn.execute('DELETE FROM main.users WHERE user_id = ?', (user_id,))
+        conn.execute(f'UPDATE {directory}.shard_map SET shard_id = ?, moving = 0 WHERE user_id = ?', (shard_id, user_id))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return moved
+
+
+def move_users(plan):
+    """
+    Move users between shards; plan is a list of (user_id, target shard_id).
+
+    Each batch of users is first flagged as moving in shard_map, then the
+    mover waits out SHARD_MAP_CACHE_SECONDS so every process's cached
+    placement has expired and their reads and writes wait for the move.
+
+    Returns {user_id: activities moved}.
+    """
+    shards = get_shards()
+    placements = get_placements()
+    plan = [(user_id, shard_id) for user_id, shard_id in plan if placements.get(user_id, shard_id) != shard_id]
+    results = {}
+    for i in range(0, len(plan), MOVE_BATCH_SIZE):
+        batch = plan[i:i + MOVE_BATCH_SIZE]
+        directory = connect(DATABASE_NAME)
+        try:
+            directory.executemany('''
+                INSERT INTO shard_map (user_id, shard_id, moving) VALUES (?, ?, 1)
+                ON CONFLICT(user_id) DO UPDATE SET moving = 1
+            ''', [(user_id, placements[user_id]) for user_id, _ in batch])
+            directory.commit()
+        finally:
+            directory.close()
+        time.sleep(SHARD_MAP_CACHE_SECONDS)
+        for user_id, shard_id in batch:
+            try:
+                results[user_id] = _move(user_id, shards[placements[user_id]], shard_id, shards[shard_id])
+            except Exception:
+                # Unflag the rest of the batch so their routing stops waiting
+                directory = connect(DATABASE_NAME)
+                directory.execute('UPDATE shard_map SET moving = 0 WHERE moving = 1')
+                directory.commit()
+                directory.close()
+                raise
+            forget_shard_placement(user_id)
+    return results
+
+
+def plan_rebalance(placements=None, shard_ids=None):
+    """
+    Plan moves that leave every shard within one user of the others.
+
+    Users still on shard 0 (the main database) are moved onto shards first.
+    """
+    placements = get_placements() if placements is None else placements
+    shard_ids = sorted(shard_id for shard_id in (shard_ids or get_shards()) if shard_id)
+    if not shard_ids:
+        return []
+    members = {shard_id: [] for shard_id in shard_ids}
+    unplaced = []
+    for user_id, shard_id in sorted(placements.items()):
+        (members[shard_id] if shard_id in members else unplaced).append(user_id)
+    plan = []
+    for user_id in unplaced:
+        target = min(shard_ids, key=lambda shard_id: len(members[shard_id]))
+        members[target].append(user_id)
+        plan.append((user_id, target))
+    while True:
+        fullest = max(shard_ids, key=lambda shard_id: len(members[shard_id]))
+        emptiest = min(shard_ids, key=lambda shard_id: len(members[shard_id]))
+        if len(members[fullest]) - len(members[emptiest]) <= 1:
+            return plan
+        user_id = members[fullest].pop()
+        members[emptiest].append(user_id)
+        plan.append((user_id, emptiest))
+
+
+if __name__ == '__main__':
+    # Usage: python -m data.sharding [list | add [count] | move <user_id> <shard_id> | rebalance]
+    command = sys.argv[1] if len(sys.argv) > 1 else 'list'
+    if not SHARDING_ENABLED and command != 'list':
+        sys.exit("Set SHARDING_ENABLED=1 (for the app too) before creating or filling shards")
+    if command == 'list':
+        placements = get_placements()
+        for shard_id, path in get_shards().items():
+            users = sum(1 for placed in placements.values() if placed == shard_id)
+            print(f"{shard_id:>4}  {users:>6} users  {path}")
+    elif command == 'add':
+        for _ in range(int(sys.argv[2]) if len(sys.argv) > 2 else 1):
+            print(f"Created shard {create_shard()}")
+    elif command == 'move' and len(sys.argv) == 4:
+        for user_id, moved in move_users([(int(sys.argv[2]), int(sys.argv[3]))]).items():
+            print(f"User {user_id}: {moved} activities moved")
+    elif command == 'rebalance':
+        plan = plan_rebalance()
+        print(f"{len(plan)} users to move")
+        for user_id, moved in move_users(plan).items():
+            print(f"User {user_id}: {moved} activities moved")
+    else:
+        sys.exit("Usage: python -m data.sharding [list | add [count] | move <user_id> <shard_id> | rebalance]")
@@ -0,0 +1,204 @@
+# data/teams.py
+
+import os
+import sqlite3
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from config import (
+    TEAM_POOL_WORKERS,
+    TEAM_PARALLEL_MIN_MEMBERS,
+    TEAM_POOL_CHUNK_SIZE,
+    TEAM_CACHE_MAX_ENTRIES,
+)
+from .database import group_users_by_database
+from .models import get_team_members, get_activity_watermarks, register_activity_change_listener
+
+
+class MemberSummary:
+    """One member's totals over a date range."""
+
+    __slots__ = ('user_id', 'total_minutes', 'activity_count', 'daily', 'categories')
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.total_minutes = 0
+        self.activity_count = 0
+        self.daily = Counter()  # 'YYYY-MM-DD': minutes
+        self.categories = Counter()  # category name: minutes
+
+
+def summarize_members(database, user_ids, start_day, end_day):
+    """
+    Summarize several members from the daily rollups.
+
+    Runs in a worker process, so it opens its own plain connection and
+    returns picklable MemberSummary objects.
+    """
+    summaries = {user_id: MemberSummary(user_id) for user_id in user_ids}
+    conn = sqlite3.connect(database)
+    try:
+        rows = conn.execute(f'''
+            SELECT r.user_id, r.day, COALESCE(c.name, 'Uncategorized'),
+                   SUM(r.total_minutes), SUM(r.activity_count)
+            FROM activity_daily_rollups r
+            LEFT JOIN categories c ON c.category_id = r.category_id
+            WHERE r.user_id IN ({', '.join('?' * len(user_ids))}) AND r.day >= ? AND r.day <= ?
+            GROUP BY r.user_id, r.day, c.name
+        ''', [*user_ids, start_day, end_day]).fetchall()
+    finally:
+        conn.close()
+    for user_id, day, category, minutes, count in rows:
+        summary = summaries[user_id]
+        summary.total_minutes += minutes
+        summary.activity_count += count
+        summary.daily[day] += minutes
+        summary.categories[category] += minutes
+    return summaries
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned workers do not inherit the server's threads or open connections
+            _pool = ProcessPoolExecutor(max_workers=TEAM_POOL_WORKERS, mp_context=get_context('spawn'))
+        return _pool
+
+
+def _summarize(user_ids, start_day, end_day):
+    """Summarize members inline for small sets, otherwise in chunks across the process pool."""
+    # Members on different shards are summarized from their own databases
+    groups = {os.path.abspath(path): ids for path, ids in group_users_by_database(user_ids).items()}
+    summaries = {}
+    if len(user_ids) < TEAM_PARALLEL_MIN_MEMBERS or TEAM_POOL_WORKERS < 2:
+        for database, ids in groups.items():
+            summaries.update(summarize_members(database, ids, start_day, end_day))
+        return summaries
+    chunks = [
+        (database, ids[i:i + TEAM_POOL_CHUNK_SIZE])
+        for database, ids in groups.items()
+        for i in range(0, len(ids), TEAM_POOL_CHUNK_SIZE)
+    ]
+    pool = _get_pool()
+    futures = [pool.submit(summarize_members, database, chunk, start_day, end_day) for database, chunk in chunks]
+    for future in futures:
+        summaries.update(future.result())
+    return summaries
+
+
+class TeamAggregate:
+    """
+    Per-member and team totals for one team over a fixed date range.
+
+    Each member's summary is kept with the highest activity_id seen for them.
+    A refresh re-reads the membership and the members' watermarks, then only
+    recomputes members who joined, logged new activities, or had activities
+    edited or deleted since the last refresh.
+    """
+
+    def __init__(self, team_id, start_date, end_date):
+        self.team_id = team_id
+        self.start_day = str(start_date)
+        self.end_day = str(end_date)
+        self.members = {}  # user_id: TeamMember
+        self.summaries = {}  # user_id: MemberSummary
+        self.watermarks = {}  # user_id: highest activity_id summarized
+        self.dirty = set()  # user_ids reported as changed by the data layer
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Bring the member summaries up to date; returns self."""
+        with self._lock:
+            self.members = {member.user_id: member for member in get_team_members(self.team_id)}
+            for user_id in list(self.summaries):
+                if user_id not in self.members:
+                    del self.summaries[user_id]
+                    self.watermarks.pop(user_id, None)
+
+            watermarks = get_activity_watermarks(self.members)
+            dirty, self.dirty = self.dirty, set()
+            stale = [
+                user_id for user_id in self.members
+                if user_id not in self.summaries
+                or user_id in dirty
+                or watermarks.get(user_id, 0) != self.watermarks.get(user_id, 0)
+            ]
+            if stale:
+                self.summaries.update(_summarize(stale, self.start_day, self.end_day))
+                for user_id in stale:
+                    self.watermarks[user_id] = watermarks.get(user_id, 0)
+            return self
+
+    def member_rows(self):
+        """Return (username, role, total_minutes, activity_count) rows, busiest first."""
+        rows = [
+            (member.username, member.role, self.summaries[user_id].total_minutes, self.summaries[user_id].activity_count)
+            for user_id, member in self.members.items()
+            if user_id in self.summaries
+        ]
+        return sorted(rows, key=lambda row: row[2], reverse=True)
+
+    def total_minutes(self):
+        return sum(summary.total_minutes for summary in self.summaries.values())
+
+    def activity_count(self):
+        return sum(summary.activity_count for summary in self.summaries.values())
+
+    def daily_totals(self):
+        """Return a sorted list of ('YYYY-MM-DD', minutes) pairs for the whole team."""
+        totals = Counter()
+        for summary in self.summaries.values():
+            totals.update(summary.daily)
+        return sorted(totals.items())
+
+    def category_totals(self):
+        """Return {category name: minutes} for the whole team; categories are matched by name."""
+        totals = Counter()
+        for summary in self.summaries.values():
+            totals.update(summary.categories)
+        return dict(totals)
+
+
+# Shared (team_id, start, end) aggregates, least recently used first
+_team_aggregates = OrderedDict()
+_team_aggregates_lock = threading.Lock()
+
+
+def _mark_member_changed(user_id, start_date, end_date):
+    with _team_aggregates_lock:
+        for aggregate in _team_aggregates.values():
+            if user_id in aggregate.members:
+                aggregate.dirty.add(user_id)
+
+
+# Edits and deletes do not raise a member's watermark, so flag them explicitly
+register_activity_change_listener(_mark_member_changed)
+
+
+def get_team_aggregate(team_id, start_date, end_date):
+    """Return the team's cached aggregate for the date range, refreshed incrementally."""
+    key = (team_id, str(start_date), str(end_date))
+    with _team_aggregates_lock:
+        aggregate = _team_aggregates.get(key)
+        if aggregate is None:
+            aggregate = _team_aggregates[key] = TeamAggregate(team_id, start_date, end_date)
+        _team_aggregates.move_to_end(key)
+        while len(_team_aggregates) > TEAM_CACHE_MAX_ENTRIES:
+            _team_aggregates.popitem(last=False)
+    return aggregate.refresh()
+
+
+def refresh_team_aggregates():
+    """Refresh every cached team aggregate; returns how many were refreshed."""
+    with _team_aggregates_lock:
+        aggregates = list(_team_aggregates.values())
+    for aggregate in aggregates:
+        aggregate.refresh()
+    return len(aggregates)
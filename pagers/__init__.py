@@ -5,6 +5,9 @@ from .time_tracking import time_tracking_page
 from .analytics import analytics_page
 from .goals import goals_page
 from .settings import settings_page
+from .admin import admin_page
+from .team import team_page
+from .search import search_page
 
 __all__ = [
     'dashboard_page',
@@ -12,4 +15,7 @@ __all__ = [
     'analytics_page',
     'goals_page',
     'settings_page',
+    'admin_page',
+    'team_page',
+    'search_page',
 ]
\ No newline at end of file
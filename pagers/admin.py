@@ -0,0 +1,102 @@
+# pages/admin.py
+
+import streamlit as st
+import pandas as pd
+
+from data import create_connection, index_usage_report, get_size_history
+from data.instrumentation import registry
+from utils.authentication import is_authenticated, is_admin
+from utils.scheduler import get_jobs, get_job_history, run_job
+
+def admin_page():
+    st.title("Admin: Query Performance")
+
+    if not is_authenticated() or not is_admin():
+        st.error("You do not have permission to view this page.")
+        return
+
+    st.caption(f"Statements slower than {registry.slow_threshold_ms:.0f} ms are written to the slow query log.")
+
+    # Per-statement statistics
+    st.subheader("Query Statistics")
+    stats = registry.snapshot()
+    if stats:
+        df_stats = pd.DataFrame(stats, columns=['fingerprint', 'calls', 'total_ms', 'mean_ms', 'p95_ms', 'max_ms', 'rows', 'slow_calls'])
+        st.dataframe(df_stats, use_container_width=True, hide_index=True)
+    else:
+        st.info("No queries recorded yet.")
+
+    # Recent slow queries
+    st.subheader("Slow Queries")
+    slow_queries = registry.slow_queries()
+    if slow_queries:
+        st.dataframe(pd.DataFrame(slow_queries, columns=['timestamp', 'fingerprint', 'elapsed_ms', 'rows']), use_container_width=True, hide_index=True)
+    else:
+        st.info("No slow queries recorded.")
+
+    # Export and reset
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button(
+            label="Download JSON",
+            data=registry.to_json(),
+            file_name='query_stats.json',
+            mime='application/json'
+        )
+    with col2:
+        st.download_button(
+            label="Download Prometheus",
+            data=registry.to_prometheus(),
+            file_name='query_stats.prom',
+            mime='text/plain'
+        )
+    with col3:
+        if st.button("Reset Statistics"):
+            registry.reset()
+            st.rerun()
+
+    # Database size and index usefulness
+    st.subheader("Database Size")
+    size_history = get_size_history()
+    if size_history:
+        df_size = pd.DataFrame(size_history, columns=['recorded_at', 'page_count', 'freelist_count', 'file_bytes', 'wal_bytes'])
+        df_size['recorded_at'] = pd.to_datetime(df_size['recorded_at'])
+        df_size['file_mb'] = df_size['file_bytes'] / (1024 * 1024)
+        st.line_chart(df_size, x='recorded_at', y='file_mb')
+        latest = size_history[-1]
+        st.write(f"**Pages:** {latest[1]} ({latest[2]} free)")
+    else:
+        st.info("No size samples yet; the record_db_size job collects them.")
+
+    st.subheader("Index Usage")
+    st.caption("Recorded statements are re-planned with EXPLAIN QUERY PLAN. Unused indexes on busy tables only cost write throughput.")
+    conn = create_connection()
+    try:
+        df_indexes = pd.DataFrame(index_usage_report(conn))
+    finally:
+        conn.close()
+    st.dataframe(df_indexes, use_container_width=True, hide_index=True)
+
+    # Background jobs
+    st.subheader("Background Jobs")
+    jobs = get_jobs()
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        job_name = st.selectbox("Job", list(jobs), format_func=lambda name: f"{name} - {jobs[name].description}")
+    with col2:
+        st.write("")
+        if st.button("Run Now"):
+            status = run_job(job_name)
+            st.info(f"{job_name}: {status}")
+    history = get_job_history()
+    if history:
+        st.dataframe(
+            pd.DataFrame(history, columns=['run_id', 'job', 'trigger', 'status', 'started_at', 'duration_ms', 'error']),
+            use_container_width=True,
+            hide_index=True
+        )
+    else:
+        st.info("No job runs recorded yet.")
+
+if __name__ == "__main__":
+    admin_page()
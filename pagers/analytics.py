@@ -1,16 +1,27 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+import numpy as np
+from collections import OrderedDict
 from datetime import datetime, date, timedelta
 
 # Import functions from the data package
 from data import (
-    get_user_by_username,
-    get_activities,
     get_categories,
     get_goals,
+    IncrementalAggregate,
+    Goal,
+    records_to_frame,
+    analytics,
 )
 from utils.authentication import is_authenticated, get_current_user
+from components.visualization import (
+    plot_daily_activity_duration,
+    plot_heatmap_matrix,
+    plot_weekly_trends,
+    plot_monthly_activity,
+)
+from utils.profiling import traced_fragment
+from config import ANALYTICS_AGGREGATES_PER_SESSION
 
 def analytics_page():
     st.title("Productivity Analytics")
@@ -24,7 +35,7 @@ def analytics_page():
         st.error("User not found.")
         return
 
-    user_id = user[0]  # Extract user_id from the tuple
+    user_id = user.user_id
 
     # Sidebar filters
     st.sidebar.header("Filter Data")
@@ -41,107 +52,54 @@ def analytics_page():
 
     # Category selection
     categories = get_categories(user_id)
-    category_options = ["All Categories"] + [cat[1] for cat in categories]
+    category_options = ["All Categories"] + [cat.name for cat in categories]
     selected_category = st.sidebar.selectbox("Select Category", category_options)
 
-    # Fetch activities
-    start_date_str = datetime.combine(start_date, datetime.min.time()).isoformat()
-    end_date_str = datetime.combine(end_date, datetime.max.time()).isoformat()
-    activities = get_activities(user_id, start_date=start_date_str, end_date=end_date_str)
-
-    if not activities:
-        st.info("No activities found for the selected date range.")
-        return
-
-    # Create DataFrame
-    df = pd.DataFrame(activities, columns=['activity_id', 'category_id', 'name', 'start_time', 'end_time', 'duration', 'notes'])
-    df['start_time'] = pd.to_datetime(df['start_time'])
-    df['end_time'] = pd.to_datetime(df['end_time'])
-    df['date'] = df['start_time'].dt.date
-
     # Map category IDs to names
     cat_dict = {None: 'Uncategorized'}
     for cat in categories:
-        cat_dict[cat[0]] = cat[1]  # category_id: name
-
-    df['category'] = df['category_id'].map(cat_dict)
+        cat_dict[cat.category_id] = cat.name
 
-    # Filter by category if selected
+    # Restrict every aggregate to the selected category, if any
+    category_ids = None
     if selected_category != "All Categories":
-        df = df[df['category'] == selected_category]
-        if df.empty:
+        category_ids = {cat_id for cat_id, name in cat_dict.items() if name == selected_category}
+
+    # Refresh the running aggregates; only new or changed activities are read
+    aggregates = st.session_state.setdefault('analytics_aggregates', OrderedDict())
+    key = (user_id, start_date)
+    if key not in aggregates:
+        aggregates[key] = IncrementalAggregate(user_id, start_date)
+    aggregates.move_to_end(key)
+    while len(aggregates) > ANALYTICS_AGGREGATES_PER_SESSION:
+        aggregates.popitem(last=False)
+    aggregate = aggregates[key].refresh(end_date)
+
+    daily_totals = pd.DataFrame(aggregate.daily_totals(end_date, category_ids), columns=['date', 'duration'])
+    if daily_totals.empty:
+        if category_ids is None:
+            st.info("No activities found for the selected date range.")
+        else:
             st.info(f"No activities found for the selected category '{selected_category}' and date range.")
-            return
-
-    # Total duration per category
-    duration_per_category = df.groupby('category')['duration'].sum().reset_index()
-
-    # Line chart of daily total durations
-    daily_totals = df.groupby('date')['duration'].sum().reset_index()
-
-    # Ensure 'start_time' is in datetime format
-    df['start_time'] = pd.to_datetime(df['start_time'])
-
-    # Create 'day_of_week' and 'hour' columns
-    df['day_of_week'] = df['start_time'].dt.day_name()
-    df['hour'] = df['start_time'].dt.hour
-
-    # Prepare data for heatmap
-    heatmap_data = df.groupby(['day_of_week', 'hour'])['duration'].sum().reset_index()
+        return
 
-    # Reorder days of the week and ensure all days are included
+    # Heatmap by day of week and hour
     days_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    heatmap_data['day_of_week'] = pd.Categorical(heatmap_data['day_of_week'], categories=days_order, ordered=True)
-
-    # Pivot data for heatmap
-    heatmap_pivot = heatmap_data.pivot(index="day_of_week", columns="hour", values="duration")
-
-    # Reindex to include all days and hours
-    all_hours = range(0, 24)
-    heatmap_pivot = heatmap_pivot.reindex(index=days_order, columns=all_hours, fill_value=0)
+    heatmap_values = np.array(aggregate.heatmap(end_date, category_ids))
 
     # Visualization
     st.header("Activity Heatmap")
-    if not heatmap_pivot.empty:
-        fig3 = px.imshow(
-            heatmap_pivot.values,  # Use .values to get NumPy array
-            labels=dict(x="Hour of Day", y="Day of Week", color="Total Duration (mins)"),
-            x=list(all_hours),  # Convert range to list here
-            y=days_order,
-            aspect="auto",
-            title='Activity Heatmap: Duration by Day and Hour'
-        )
-        st.plotly_chart(fig3, use_container_width=True)
-    else:
-        st.info("No data available to display the Activity Heatmap.")
+    plot_heatmap_matrix(heatmap_values, days_order)
     st.header("Daily Activity Duration")
-    if not daily_totals.empty:
-        fig2 = px.bar(daily_totals, x='date', y='duration', title='Total Time Spent Each Day')
-        fig2.update_layout(xaxis_title='Date', yaxis_title='Total Duration (mins)')
-        st.plotly_chart(fig2, use_container_width=True)
-    else:
-        st.info("No data available to display the Daily Activity Duration chart.")
+    plot_daily_activity_duration(daily_totals, start_date, end_date)
 
-    # Visualization: Activity Heatmap
-    st.header("Activity Heatmap")
-    if not heatmap_pivot.empty:
-        fig3 = px.imshow(
-            heatmap_pivot,
-            labels=dict(x="Hour of Day", y="Day of Week", color="Total Duration (mins)"),
-            x=all_hours,
-            y=days_order,
-            aspect="auto",
-            title='Activity Heatmap: Duration by Day and Hour'
-        )
-        st.plotly_chart(fig3, use_container_width=True)
-    else:
-        st.info("No data available to display the Activity Heatmap.")
+    _trends_panel(user_id, start_date, end_date, category_ids)
 
     # Goals Progress
     st.header("Goals Progress")
     goals = get_goals(user_id)
     if goals:
-        goal_df = pd.DataFrame(goals, columns=['goal_id', 'category_id', 'time_target', 'period', 'start_date', 'end_date'])
+        goal_df = records_to_frame(goals, Goal)
         # Map category IDs to names
         goal_df['category'] = goal_df['category_id'].map(cat_dict)
         # Calculate progress
@@ -162,11 +120,13 @@ def analytics_page():
             else:
                 period_start = goal_start
                 period_end = goal_end
-            # Filter activities within the goal period
-            goal_activities = df[(df['date'] >= period_start) & (df['date'] <= period_end)]
+            # Sum the aggregated minutes within the goal period
+            goal_category_ids = category_ids
             if row['category'] != 'Uncategorized':
-                goal_activities = goal_activities[goal_activities['category'] == row['category']]
-            total_time = goal_activities['duration'].sum()
+                goal_category_ids = {cat_id for cat_id, name in cat_dict.items() if name == row['category']}
+                if category_ids is not None:
+                    goal_category_ids &= category_ids
+            total_time = aggregate.total_minutes(end_date, period_start, period_end, goal_category_ids)
             progress = (total_time / row['time_target']) * 100 if row['time_target'] > 0 else 0
             st.subheader(f"Goal: {row['category']} ({row['period']})")
             st.progress(min(progress / 100, 1.0))
@@ -184,12 +144,27 @@ def analytics_page():
         st.write("No activity data to determine the most active day.")
 
     # Most Frequent Activity
-    activity_counts = df['name'].value_counts()
-    if not activity_counts.empty:
-        most_common_activity = activity_counts.idxmax()
+    activity_counts = aggregate.name_counts(end_date, category_ids)
+    if activity_counts:
+        most_common_activity = activity_counts.most_common(1)[0][0]
         st.write(f"**Most Frequent Activity:** {most_common_activity}")
     else:
         st.write("No activities to analyze.")
 
+# The sidebar filters feed every panel, so changing one reruns the page;
+# switching the trend granularity reruns only this panel and its one query.
+@traced_fragment
+def _trends_panel(user_id, start_date, end_date, category_ids):
+    # Long-range trends, grouped by the configured analytics backend (SQLite or DuckDB)
+    granularity = st.radio("Trends by", ["Week", "Month"], horizontal=True, key='analytics_trend_granularity')
+    if granularity == "Week":
+        st.header("Weekly Trends")
+        weekly = analytics.durations_by_period(user_id, 'week', start_date, end_date, category_ids)
+        plot_weekly_trends(pd.DataFrame(weekly, columns=['week', 'duration']))
+    else:
+        st.header("Monthly Activity")
+        monthly = analytics.durations_by_period(user_id, 'month', start_date, end_date, category_ids)
+        plot_monthly_activity(pd.DataFrame(monthly, columns=['month', 'duration']))
+
 if __name__ == "__main__":
     analytics_page()
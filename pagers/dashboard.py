@@ -3,15 +3,20 @@
 import streamlit as st
 from datetime import date, datetime, timedelta
 import pandas as pd
-import plotly.express as px
 
 # Import functions from the data package
 from data import (
     get_user_by_username,
-    get_activities,
+    get_recent_activities,
     get_categories,
     get_goals,
+    get_daily_rollups,
+    durations_by_day,
+    durations_by_category,
+    Activity,
+    records_to_frame,
 )
+from components.visualization import plot_recent_daily_totals
 
 # Authentication check (assuming you have an authentication system)
 def is_authenticated():
@@ -35,25 +40,22 @@ def dashboard_page():
         st.error("User not found.")
         return
 
-    user_id = user[0]  # Extract user_id from the tuple
+    user_id = user.user_id
 
     # Fetch data
     today = date.today()
-    start_of_today = datetime.combine(today, datetime.min.time())
-    end_of_today = datetime.combine(today, datetime.max.time())
 
-    # Today's Activities
-    activities_today = get_activities(
-        user_id,
-        start_date=start_of_today.isoformat(),
-        end_date=end_of_today.isoformat()
-    )
+    # Today's totals per category, aggregated by SQLite
+    minutes_today = {}
+    total_activities_today = 0
+    for category_id, minutes, activity_count in durations_by_category(user_id, today, today):
+        minutes_today[category_id] = minutes
+        total_activities_today += activity_count
 
-    total_time_today = sum(activity[5] for activity in activities_today)  # Assuming duration is at index 5
+    total_time_today = sum(minutes_today.values())
 
     # Recent Activities (last 5 entries)
-    recent_activities = get_activities(user_id)
-    recent_activities = recent_activities[-5:] if recent_activities else []
+    recent_activities = get_recent_activities(user_id, 5)
 
     # Goals
     goals = get_goals(user_id)
@@ -62,7 +64,7 @@ def dashboard_page():
     categories = get_categories(user_id)
     category_dict = {None: 'Uncategorized'}
     for cat in categories:
-        category_dict[cat[0]] = cat[1]  # category_id: name
+        category_dict[cat.category_id] = cat.name
 
     # Display Summary Widgets
     st.subheader("Today's Summary")
@@ -71,17 +73,13 @@ def dashboard_page():
     with col1:
         st.metric("Total Time Tracked Today (mins)", total_time_today)
     with col2:
-        total_activities_today = len(activities_today)
         st.metric("Activities Tracked Today", total_activities_today)
     with col3:
         # Compute time remaining towards daily goals (if any)
-        daily_goals = [goal for goal in goals if goal[3] == 'Daily']
+        daily_goals = [goal for goal in goals if goal.period == 'Daily']
         if daily_goals:
-            time_target = sum(goal[2] for goal in daily_goals)  # time_target is at index 2
-            time_spent = 0
-            for goal in daily_goals:
-                goal_activities = [activity for activity in activities_today if activity[1] == goal[1]]  # category_id matches
-                time_spent += sum(activity[5] for activity in goal_activities)
+            time_target = sum(goal.time_target for goal in daily_goals)
+            time_spent = sum(minutes_today.get(goal.category_id, 0) for goal in daily_goals)
             time_remaining = max(time_target - time_spent, 0)
             st.metric("Time Remaining Toward Daily Goals (mins)", time_remaining)
         else:
@@ -90,7 +88,7 @@ def dashboard_page():
     # Display Recent Activities
     st.subheader("Recent Activities")
     if recent_activities:
-        df_recent = pd.DataFrame(recent_activities, columns=['activity_id', 'category_id', 'name', 'start_time', 'end_time', 'duration', 'notes'])
+        df_recent = records_to_frame(recent_activities, Activity)
         df_recent['start_time'] = pd.to_datetime(df_recent['start_time'])
         df_recent['end_time'] = pd.to_datetime(df_recent['end_time'])
         df_recent['Category'] = df_recent['category_id'].map(category_dict)
@@ -104,19 +102,19 @@ def dashboard_page():
     st.subheader("Goals Progress")
     if goals:
         for goal in goals:
-            goal_id, category_id, time_target, period, start_date_str, end_date_str = goal[:6]
-            goal_start = datetime.strptime(start_date_str, '%Y-%m-%d')
-            goal_end = datetime.strptime(end_date_str, '%Y-%m-%d') if end_date_str else today
-            # Fetch activities within the goal period
-            activities_in_goal = get_activities(
+            goal_id, category_id, time_target, period, start_date_str, end_date_str = goal
+            goal_start = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+            goal_end = datetime.strptime(end_date_str, '%Y-%m-%d').date() if end_date_str else today
+            # Sum the daily rollups within the goal period
+            rollups_in_goal = get_daily_rollups(
                 user_id,
                 start_date=goal_start.isoformat(),
-                end_date=(goal_end + timedelta(days=1)).isoformat()
+                end_date=goal_end.isoformat()
             )
             # Filter by category if applicable
             if category_id:
-                activities_in_goal = [act for act in activities_in_goal if act[1] == category_id]
-            total_time = sum(act[5] for act in activities_in_goal)
+                rollups_in_goal = [rollup for rollup in rollups_in_goal if rollup[1] == category_id]
+            total_time = sum(rollup[2] for rollup in rollups_in_goal)
             progress = (total_time / time_target) * 100 if time_target > 0 else 0
             category_name = category_dict.get(category_id, 'Uncategorized')
             st.subheader(f"Goal: {category_name} ({period})")
@@ -145,17 +143,11 @@ def dashboard_page():
     st.subheader("Activity Distribution")
     # Fetch activities for the past 7 days
     start_date = today - timedelta(days=6)
-    activities_week = get_activities(
-        user_id,
-        start_date=start_date.isoformat(),
-        end_date=(today + timedelta(days=1)).isoformat()
-    )
-    if activities_week:
-        df_week = pd.DataFrame(activities_week, columns=['activity_id', 'category_id', 'name', 'start_time', 'end_time', 'duration', 'notes'])
-        df_week['date'] = pd.to_datetime(df_week['start_time']).dt.date
-        daily_totals = df_week.groupby('date')['duration'].sum().reset_index()
-        fig = px.bar(daily_totals, x='date', y='duration', title='Daily Total Time Spent (Last 7 Days)')
-        st.plotly_chart(fig, use_container_width=True)
+    totals_week = durations_by_day(user_id, start_date, today)
+    if totals_week:
+        daily_totals = pd.DataFrame(totals_week, columns=['date', 'duration'])
+        daily_totals['date'] = pd.to_datetime(daily_totals['date'])
+        plot_recent_daily_totals(daily_totals, 'Daily Total Time Spent (Last 7 Days)')
     else:
         st.info("No activities found for the past week.")
 
@@ -0,0 +1,77 @@
+# pages/search.py
+
+import streamlit as st
+import pandas as pd
+
+# Import functions from the data package
+from data import (
+    get_categories,
+    search_activities,
+    search_totals,
+    SearchHit,
+    records_to_frame,
+)
+from utils.authentication import is_authenticated, get_current_user
+from config import SEARCH_RESULT_LIMIT
+
+def search_page():
+    st.title("Search Activities")
+
+    if not is_authenticated():
+        st.warning("Please log in to search your activities.")
+        return
+
+    user = get_current_user()
+    if not user:
+        st.error("User not found.")
+        return
+
+    user_id = user.user_id
+
+    text = st.text_input("Search names and notes", placeholder="e.g. Q3 migration")
+
+    # Filters
+    categories = get_categories(user_id)
+    cat_dict = {None: 'Uncategorized'}
+    for cat in categories:
+        cat_dict[cat.category_id] = cat.name
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        selected_categories = st.multiselect("Categories", list(cat_dict.values()))
+    with col2:
+        start_date = st.date_input("From", value=None, key="search_start_date")
+    with col3:
+        end_date = st.date_input("To", value=None, key="search_end_date")
+
+    if not text.strip():
+        st.info("Enter a word or phrase to search your history.")
+        return
+
+    category_ids = None
+    if selected_categories:
+        category_ids = {cat_id for cat_id, name in cat_dict.items() if name in selected_categories}
+
+    matches, total_minutes = search_totals(user_id, text, start_date, end_date, category_ids)
+    if not matches:
+        st.info("No matching activities found.")
+        return
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Matching Activities", matches)
+    with col2:
+        st.metric("Total Time (hrs)", round(total_minutes / 60, 1))
+
+    hits = search_activities(user_id, text, start_date, end_date, category_ids)
+    if matches > len(hits):
+        st.caption(f"Showing the {SEARCH_RESULT_LIMIT} best matches.")
+
+    df_hits = records_to_frame(hits, SearchHit)
+    df_hits['Category'] = df_hits['category_id'].map(cat_dict)
+    df_hits['Start'] = pd.to_datetime(df_hits['start_time'], format='ISO8601').dt.strftime('%Y-%m-%d %H:%M')
+    for row in df_hits.itertuples():
+        st.markdown(f"**{row.name}** · {row.Category} · {row.Start} · {row.duration} mins  \n{row.snippet}")
+
+if __name__ == "__main__":
+    search_page()
@@ -17,7 +17,11 @@ from data import (
     # Data management functions
     export_user_data,
     import_user_data,
+    # Timeline cleanup functions
+    timeline_report,
+    delete_activities,
 )
+from utils.profiling import traced_fragment
 
 # Authentication check
 def is_authenticated():
@@ -41,13 +45,11 @@ def settings_page():
         st.error("User not found.")
         return
 
-    user_id = user[0]  # Extract user_id from the tuple
+    user_id = user.user_id
 
     # Fetch user settings
     settings = get_settings(user_id)
-    settings_dict = {setting[0]: setting[1] for setting in settings}  # setting_name: setting_value
-    if 'edit_category_states' not in st.session_state:
-        st.session_state['edit_category_states'] = {}
+    settings_dict = {setting.setting_name: setting.setting_value for setting in settings}
     # Tabs for different settings sections
     tab1, tab2, tab3 = st.tabs(["Personal Settings", "Category Management", "Data Management"])
 
@@ -55,37 +57,7 @@ def settings_page():
     # Personal Settings Tab
     # -------------------------
     with tab1:
-        st.subheader("Personal Settings")
-
-        # Time Zone Setting
-        timezones = pytz.all_timezones
-        current_timezone = settings_dict.get('timezone', 'UTC')
-        timezone_selection = st.selectbox("Time Zone", timezones, index=timezones.index(current_timezone))
-
-        # Date Format Setting
-        date_formats = [
-            ('%Y-%m-%d', 'YYYY-MM-DD'),
-            ('%d/%m/%Y', 'DD/MM/YYYY'),
-            ('%m/%d/%Y', 'MM/DD/YYYY'),
-        ]
-        date_format_dict = {fmt: desc for fmt, desc in date_formats}
-        current_date_format = settings_dict.get('date_format', '%Y-%m-%d')
-        date_format_selection = st.selectbox("Date Format", [desc for fmt, desc in date_formats],
-                                             index=[desc for fmt, desc in date_formats].index(date_format_dict[current_date_format]))
-
-        # Map selected description back to format
-        selected_date_format = [fmt for fmt, desc in date_formats if desc == date_format_selection][0]
-
-        # Notification Preferences
-        notifications_enabled = settings_dict.get('notifications_enabled', 'True') == 'True'
-        notifications_selection = st.checkbox("Enable Notifications", value=notifications_enabled)
-
-        # Save Settings
-        if st.button("Save Settings"):
-            add_setting(user_id, 'timezone', timezone_selection)
-            add_setting(user_id, 'date_format', selected_date_format)
-            add_setting(user_id, 'notifications_enabled', str(notifications_selection))
-            st.success("Settings saved successfully.")
+        _personal_settings(user_id, settings_dict)
 
     # -------------------------
     # Category Management Tab
@@ -95,85 +67,157 @@ def settings_page():
 
         # Fetch categories
         categories = get_categories(user_id)
-        category_dict = {cat[0]: cat[1] for cat in categories}  # category_id: name
 
         # Display existing categories with edit and delete options
         for category in categories:
-            category_id = category[0]
-            category_name = category[1]
-            category_description = category[2]
-            st.write(f"### {category_name}")
-            st.write(f"{category_description or ''}")
-            col1, col2 = st.columns([1, 1])
-            with col1:
-                if st.button("Edit", key=f"edit_category_{category_id}"):
-                    st.session_state[f"edit_category_state_{category_id}"] = True
-            with col2:
-                if st.button("Delete", key=f"delete_category_{category_id}"):
-                    delete_category(category_id)
-                    st.success("Category deleted successfully.")
-                    st.rerun()
+            _category_card(category)
 
-            # Edit Category Form
-            if st.session_state.get(f"edit_category_{category_id}", False):
-                st.subheader("Edit Category")
-                with st.form(key=f"edit_category_form_{category_id}"):
-                    new_name = st.text_input("Category Name", value=category_name,key=f"edit_name_{category_id}")
-                    new_description = st.text_area("Description", value=category_description or '',key=f"edit_desc_{category_id}")
-                    submitted = st.form_submit_button("Update Category")
-                    if submitted:
-                        if not new_name:
-                            st.error("Please enter a category name.")
-                        else:
-                            update_category(category_id, new_name, new_description)
-                            st.success("Category updated successfully.")
-                            st.session_state[f"edit_category_{category_id}"] = False
-                            st.rerun()
-            else:
-                st.session_state[f"edit_category_state{category_id}"]=False
-
-        # Add New Category
-        st.subheader("Add New Category")
-        with st.form(key="add_category_form"):
-            category_name = st.text_input("Category Name")
-            category_description = st.text_area("Description")
-            submitted = st.form_submit_button("Add Category")
-            if submitted:
-                if not category_name:
-                    st.error("Please enter a category name.")
-                else:
-                    add_category(user_id, category_name, category_description)
-                    st.success("Category added successfully.")
-                    st.rerun()
+        _add_category_form(user_id)
 
     # -------------------------
     # Data Management Tab
     # -------------------------
     with tab3:
-        st.subheader("Data Management")
-
-        # Export Data
-        st.write("### Export Data")
-        st.write("Download your data for backup or analysis.")
-        if st.button("Export Data"):
-            data = export_user_data(user_id)
-            csv_data = data.to_csv(index=False)
-            st.download_button(
-                label="Download CSV",
-                data=csv_data,
-                file_name='user_data_export.csv',
-                mime='text/csv'
-            )
-
-        # Import Data
-        st.write("### Import Data")
-        st.write("Upload data to import activities and settings.")
-        uploaded_file = st.file_uploader("Choose a CSV file", type=['csv'])
-        if uploaded_file is not None:
-            if st.button("Import Data"):
-                import_user_data(user_id, uploaded_file)
-                st.success("Data imported successfully.")
+        _data_management(user_id)
+
+# Each section below is a fragment, so its widgets rerun only that section;
+# writes that other sections display (categories) rerun the whole page.
+@traced_fragment
+def _personal_settings(user_id, settings_dict):
+    st.subheader("Personal Settings")
+
+    # Time Zone Setting
+    timezones = pytz.all_timezones
+    current_timezone = settings_dict.get('timezone', 'UTC')
+    timezone_selection = st.selectbox("Time Zone", timezones, index=timezones.index(current_timezone))
+
+    # Date Format Setting
+    date_formats = [
+        ('%Y-%m-%d', 'YYYY-MM-DD'),
+        ('%d/%m/%Y', 'DD/MM/YYYY'),
+        ('%m/%d/%Y', 'MM/DD/YYYY'),
+    ]
+    date_format_dict = {fmt: desc for fmt, desc in date_formats}
+    current_date_format = settings_dict.get('date_format', '%Y-%m-%d')
+    date_format_selection = st.selectbox("Date Format", [desc for fmt, desc in date_formats],
+                                         index=[desc for fmt, desc in date_formats].index(date_format_dict[current_date_format]))
+
+    # Map selected description back to format
+    selected_date_format = [fmt for fmt, desc in date_formats if desc == date_format_selection][0]
+
+    # Notification Preferences
+    notifications_enabled = settings_dict.get('notifications_enabled', 'True') == 'True'
+    notifications_selection = st.checkbox("Enable Notifications", value=notifications_enabled)
+
+    # Save Settings
+    if st.button("Save Settings"):
+        add_setting(user_id, 'timezone', timezone_selection)
+        add_setting(user_id, 'date_format', selected_date_format)
+        add_setting(user_id, 'notifications_enabled', str(notifications_selection))
+        st.success("Settings saved successfully.")
+
+@traced_fragment
+def _category_card(category):
+    category_id = category.category_id
+    category_name = category.name
+    category_description = category.description
+    st.write(f"### {category_name}")
+    st.write(f"{category_description or ''}")
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        if st.button("Edit", key=f"edit_category_{category_id}"):
+            st.session_state[f"edit_category_state_{category_id}"] = True
+    with col2:
+        if st.button("Delete", key=f"delete_category_{category_id}"):
+            delete_category(category_id)
+            st.success("Category deleted successfully.")
+            st.rerun()
+
+    # Edit Category Form
+    if st.session_state.get(f"edit_category_state_{category_id}", False):
+        st.subheader("Edit Category")
+        with st.form(key=f"edit_category_form_{category_id}"):
+            new_name = st.text_input("Category Name", value=category_name,key=f"edit_name_{category_id}")
+            new_description = st.text_area("Description", value=category_description or '',key=f"edit_desc_{category_id}")
+            submitted = st.form_submit_button("Update Category")
+            if submitted:
+                if not new_name:
+                    st.error("Please enter a category name.")
+                else:
+                    update_category(category_id, new_name, new_description)
+                    st.success("Category updated successfully.")
+                    st.session_state[f"edit_category_state_{category_id}"] = False
+                    st.rerun()
+
+@traced_fragment
+def _add_category_form(user_id):
+    # Add New Category
+    st.subheader("Add New Category")
+    with st.form(key="add_category_form"):
+        category_name = st.text_input("Category Name")
+        category_description = st.text_area("Description")
+        submitted = st.form_submit_button("Add Category")
+        if submitted:
+            if not category_name:
+                st.error("Please enter a category name.")
+            else:
+                add_category(user_id, category_name, category_description)
+                st.success("Category added successfully.")
+                st.rerun()
+
+@traced_fragment
+def _data_management(user_id):
+    st.subheader("Data Management")
+
+    # Export Data
+    st.write("### Export Data")
+    st.write("Download your data for backup or analysis.")
+    if st.button("Export Data"):
+        data = export_user_data(user_id)
+        csv_data = data.to_csv(index=False)
+        st.download_button(
+            label="Download CSV",
+            data=csv_data,
+            file_name='user_data_export.csv',
+            mime='text/csv'
+        )
+
+    # Import Data
+    st.write("### Import Data")
+    st.write("Upload data to import activities and settings.")
+    uploaded_file = st.file_uploader("Choose a CSV file", type=['csv'])
+    if uploaded_file is not None:
+        if st.button("Import Data"):
+            import_user_data(user_id, uploaded_file)
+            st.success("Data imported successfully.")
+            st.rerun()
+
+    # Timeline Check
+    st.write("### Timeline Check")
+    st.write("Find activities that overlap (double-logged time) and untracked gaps.")
+    if st.button("Check Timeline"):
+        st.session_state['timeline_report'] = timeline_report(user_id)
+    report = st.session_state.get('timeline_report')
+    if report:
+        st.write(f"{len(report['overlaps'])} overlapping pairs, {report['overlap_minutes']} minutes counted twice.")
+        if report['overlaps']:
+            st.table([
+                {'Activity': first, 'Overlaps Activity': second, 'Overlap (mins)': minutes}
+                for first, second, minutes in report['overlaps']
+            ])
+            overlapping_ids = sorted({activity_id for pair in report['overlaps'] for activity_id in pair[:2]})
+            to_delete = st.multiselect("Activities to delete", overlapping_ids)
+            if to_delete and st.button("Delete Selected Activities"):
+                delete_activities(to_delete)
+                st.session_state.pop('timeline_report', None)
+                st.success("Activities deleted successfully.")
                 st.rerun()
+        if report['gaps']:
+            st.write(f"{len(report['gaps'])} untracked gaps of 15 minutes or more.")
+            st.table([
+                {'From': gap_start.strftime('%Y-%m-%d %H:%M'), 'To': gap_end.strftime('%H:%M'), 'Minutes': minutes}
+                for gap_start, gap_end, minutes in report['gaps']
+            ])
 
 if __name__ == "__main__":
     settings_page()
\ No newline at end of file
@@ -0,0 +1,126 @@
+# pages/team.py
+
+import streamlit as st
+from datetime import date, timedelta
+import pandas as pd
+import plotly.express as px
+
+# Import functions from the data package
+from data import (
+    get_user_by_username,
+    create_team,
+    add_team_member,
+    remove_team_member,
+    get_teams,
+    get_team_members,
+    get_team_aggregate,
+)
+from utils.authentication import is_authenticated, get_current_user
+from components.visualization import plot_daily_activity_duration
+
+def team_page():
+    st.title("Team Analytics")
+
+    if not is_authenticated():
+        st.warning("Please log in to view team analytics.")
+        return
+
+    user = get_current_user()
+    if not user:
+        st.error("User not found.")
+        return
+
+    user_id = user.user_id
+
+    teams = get_teams(user_id)
+
+    with st.expander("Create a Team", expanded=not teams):
+        with st.form("create_team_form"):
+            team_name = st.text_input("Team Name")
+            submitted = st.form_submit_button("Create Team")
+            if submitted:
+                if not team_name:
+                    st.error("Team name is required.")
+                elif create_team(team_name, user_id):
+                    st.success(f"Team '{team_name}' created.")
+                    st.rerun()
+                else:
+                    st.error("A team with that name already exists.")
+
+    if not teams:
+        st.info("You are not a member of any team yet.")
+        return
+
+    team_names = {team.name: team for team in teams}
+    team = team_names[st.selectbox("Team", list(team_names))]
+    can_manage = team.role in ('owner', 'manager')
+
+    # Date range selection
+    today = date.today()
+    col1, col2 = st.columns(2)
+    with col1:
+        start_date = st.date_input("Start Date", today - timedelta(days=30), key="team_start_date")
+    with col2:
+        end_date = st.date_input("End Date", today, key="team_end_date")
+    if start_date > end_date:
+        st.error("Error: End date must fall after start date.")
+        return
+
+    # Cached per team and range; only members with new or changed activities are recomputed
+    aggregate = get_team_aggregate(team.team_id, start_date, end_date)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Members", len(aggregate.members))
+    with col2:
+        st.metric("Team Time Tracked (hrs)", round(aggregate.total_minutes() / 60, 1))
+    with col3:
+        st.metric("Activities Tracked", aggregate.activity_count())
+
+    daily_totals = pd.DataFrame(aggregate.daily_totals(), columns=['date', 'duration'])
+    if daily_totals.empty:
+        st.info("No activities found for the selected date range.")
+    else:
+        daily_totals['date'] = pd.to_datetime(daily_totals['date'])
+        st.header("Team Daily Activity Duration")
+        plot_daily_activity_duration(daily_totals, start_date, end_date)
+
+        st.header("Time by Category")
+        category_totals = pd.DataFrame(
+            sorted(aggregate.category_totals().items(), key=lambda item: item[1], reverse=True),
+            columns=['category', 'duration']
+        )
+        fig = px.bar(category_totals, x='category', y='duration', title='Team Time by Category')
+        st.plotly_chart(fig, use_container_width=True)
+
+    if can_manage:
+        st.header("Members")
+        members_df = pd.DataFrame(aggregate.member_rows(), columns=['Member', 'Role', 'Minutes', 'Activities'])
+        st.dataframe(members_df, use_container_width=True, hide_index=True)
+
+        with st.expander("Manage Members"):
+            with st.form("add_member_form"):
+                username = st.text_input("Username")
+                role = st.selectbox("Role", ['member', 'manager'])
+                submitted = st.form_submit_button("Add Member")
+                if submitted:
+                    member = get_user_by_username(username)
+                    if not member:
+                        st.error(f"User '{username}' not found.")
+                    elif add_team_member(team.team_id, member.user_id, role):
+                        st.success(f"{username} added to {team.name}.")
+                        st.rerun()
+                    else:
+                        st.error("Could not add member.")
+
+            removable = [member for member in get_team_members(team.team_id) if member.role != 'owner']
+            if removable:
+                to_remove = st.selectbox("Remove Member", [member.username for member in removable])
+                if st.button("Remove"):
+                    member = next(member for member in removable if member.username == to_remove)
+                    remove_team_member(team.team_id, member.user_id)
+                    st.success(f"{to_remove} removed from {team.name}.")
+                    st.rerun()
+
+if __name__ == "__main__":
+    team_page()
@@ -6,8 +6,11 @@ from data import (
     get_user_by_username,
     add_activity,
     get_categories,
+    find_overlaps,
+    suggest_activity_names,
 )
 from components.timers import timer_component, stop_timer, reset_timer
+from utils.profiling import traced_fragment
 
 def is_authenticated():
     return 'authenticated' in st.session_state and st.session_state['authenticated']
@@ -18,6 +21,26 @@ def get_current_user():
     else:
         return None
 
+def _use_suggestion(name):
+    # Runs before the rerun, so the form's text input can still be set
+    st.session_state['activity_name'] = name
+    st.session_state['activity_name_input'] = name
+    st.session_state['_suggestion_used'] = True
+
+@traced_fragment
+def _suggestions(user_id):
+    # Typing a prefix reruns only this section
+    prefix = st.text_input("Find a past activity", key='activity_name_prefix', placeholder="Start typing a name")
+    suggestions = suggest_activity_names(user_id, prefix)
+    if suggestions:
+        columns = st.columns(len(suggestions))
+        for column, name in zip(columns, suggestions):
+            with column:
+                st.button(name, key=f'suggestion_{name}', on_click=_use_suggestion, args=(name,), use_container_width=True)
+    # A picked name fills the form and the timer outside this fragment
+    if st.session_state.pop('_suggestion_used', False):
+        st.rerun()
+
 def time_tracking_page():
     st.title("Real-Time Time Tracking")
 
@@ -30,7 +53,7 @@ def time_tracking_page():
         st.error("User not found.")
         return
 
-    user_id = user[0]  # Extract user_id from the tuple
+    user_id = user.user_id
 
     # Initialize activity details in session state
     if 'activity_name' not in st.session_state:
@@ -42,14 +65,18 @@ def time_tracking_page():
 
     st.subheader("Activity Details")
 
+    # Suggest past activity names so entries are reused instead of retyped
+    _suggestions(user_id)
+
     # Activity Details Form
+    st.session_state.setdefault('activity_name_input', st.session_state['activity_name'])
     with st.form(key='activity_form'):
-        activity_name_input = st.text_input("Activity Name", value=st.session_state['activity_name'], key='activity_name_input')
+        activity_name_input = st.text_input("Activity Name", key='activity_name_input')
         categories = get_categories(user_id)
         if not categories:
             st.warning("No categories found. Please add categories in the Settings page.")
             return
-        category_options = ["Select Category"] + [cat[1] for cat in categories]
+        category_options = ["Select Category"] + [cat.name for cat in categories]
         category_selection_input = st.selectbox("Category", category_options, index=category_options.index(st.session_state['category_selection']), key='category_selection_input')
         notes_input = st.text_area("Notes", value=st.session_state['notes'], key='notes_input')
         submitted = st.form_submit_button("Update Activity Details")
@@ -66,7 +93,7 @@ def time_tracking_page():
                 st.success("Activity details updated.")
 
     # Retrieve category_id from the selection
-    category_dict = {cat[1]: cat[0] for cat in categories}
+    category_dict = {cat.name: cat.category_id for cat in categories}
     category_id = category_dict.get(st.session_state['category_selection'])
 
     # Render the timer component
@@ -77,14 +104,26 @@ def time_tracking_page():
         notes=st.session_state['notes']
     )
 
+    # Let the user knowingly save an entry that overlaps an existing one
+    allow_overlap = st.checkbox("Save even if it overlaps an existing activity", key='allow_overlap')
+
     # Stop and Save Activity Button
     if st.button("Stop and Save Activity"):
+        timer_state = st.session_state['timers']['main_timer']
+        overlaps = []
+        if timer_state['start_time'] is not None and not allow_overlap:
+            overlaps = find_overlaps(user_id, timer_state['start_time'], datetime.now())
         if st.session_state['activity_name'] == '' or category_id is None:
             st.error("Please provide activity name and category before saving.")
+        elif overlaps:
+            st.warning(
+                f"This entry overlaps {len(overlaps)} existing activit{'y' if len(overlaps) == 1 else 'ies'} "
+                f"({', '.join(f'{start:%H:%M}-{end:%H:%M}' for _, start, end in overlaps)}). "
+                "Tick the checkbox above to save it anyway."
+            )
         else:
             # Stop the timer and get elapsed time
             elapsed_time = stop_timer('main_timer')
-            timer_state = st.session_state['timers']['main_timer']
             start_time = timer_state['start_time']
             end_time = datetime.now()
 
@@ -105,6 +144,7 @@ def time_tracking_page():
             st.session_state['activity_name'] = ''
             st.session_state['category_selection'] = 'Select Category'
             st.session_state['notes'] = ''
+            st.session_state.pop('activity_name_input', None)
             # Rerun the script to update widgets
             st.rerun()
 
@@ -114,6 +154,7 @@ def time_tracking_page():
         st.session_state['activity_name'] = ''
         st.session_state['category_selection'] = 'Select Category'
         st.session_state['notes'] = ''
+        st.session_state.pop('activity_name_input', None)
         # Rerun the script to update widgets
         st.rerun()
 
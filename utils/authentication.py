@@ -1,8 +1,21 @@
 # utils/authentication.py
 
+import json
+import time
+
 import streamlit as st
+import streamlit.components.v1 as components
 from data import get_user_by_username, add_user
 from data.models import verify_user
+from config import (
+    ADMIN_USERNAMES,
+    SESSION_TTL_SECONDS,
+    SESSION_COOKIE_NAME,
+    SESSION_COOKIE_SECURE,
+    SESSION_QUERY_PARAM,
+    SESSION_REVALIDATE_SECONDS,
+)
+from utils.sessions import issue_token, verify_token, revoke_token, get_session_store
 
 def login():
     """Handle user login."""
@@ -14,6 +27,11 @@ def login():
             st.success("Logged in successfully!")
             st.session_state['authenticated'] = True
             st.session_state['username'] = username
+            # A signed token in a cookie lets any app node restore the login
+            token = issue_token(get_user_by_username(username).user_id, username)
+            st.session_state['session_token'] = token
+            st.session_state['session_checked_at'] = time.time()
+            st.session_state['session_cookie'] = token
             # Redirect to the dashboard or another page
             st.rerun()
         else:
@@ -24,6 +42,11 @@ def logout():
     if 'authenticated' in st.session_state and st.session_state['authenticated']:
         st.session_state['authenticated'] = False
         st.session_state.pop('username', None)
+        token = st.session_state.pop('session_token', None)
+        st.session_state.pop('session_checked_at', None)
+        if token:
+            revoke_token(token)
+        st.session_state['session_cookie'] = ''
         st.success("Logged out successfully.")
         # Redirect to the login page or home
         st.rerun()
@@ -47,6 +70,76 @@ def signup():
             st.session_state['navigation'] = 'Login'
             st.rerun()
 
+def _write_session_cookie(token):
+    """
+    Set the session cookie in the browser, or clear it when token is empty.
+
+    Streamlit cannot send Set-Cookie headers, so a zero-height component sets
+    it on the app's own document from JavaScript. SameSite=Strict keeps it off
+    cross-site requests. A deployment whose reverse proxy runs its own login
+    can set the same cookie there, HttpOnly; restore_session only reads it.
+    """
+    attributes = f'Path=/; SameSite=Strict; Max-Age={SESSION_TTL_SECONDS if token else 0}'
+    if SESSION_COOKIE_SECURE:
+        attributes += '; Secure'
+    cookie = f'{SESSION_COOKIE_NAME}={token}; {attributes}'
+    components.html(f'<script>window.parent.document.cookie = {json.dumps(cookie)};</script>', height=0)
+
+def restore_session():
+    """
+    Sync the login state with the session token.
+
+    The token comes from this browser session's state, then from the session
+    cookie (set at login, see _write_session_cookie), so a reload or a new
+    tab on any app node stays logged in. A token in the URL from an old link
+    is accepted once and removed from the URL, where browser history, shared
+    links and proxy logs would keep it.
+
+    The token's signature and expiry are checked on every rerun, which needs
+    no database access. The session store is asked the first time this
+    browser session presents a token and then at most every
+    SESSION_REVALIDATE_SECONDS, so a logout on another node takes effect here
+    within that interval.
+    """
+    pending_cookie = st.session_state.pop('session_cookie', None)
+    if pending_cookie is not None:
+        _write_session_cookie(pending_cookie)
+    url_token = st.query_params.get(SESSION_QUERY_PARAM)
+    if url_token:
+        st.query_params.pop(SESSION_QUERY_PARAM, None)
+    token = st.session_state.get('session_token')
+    if not token:
+        # Cookies are read once when the browser session connects, so a revoked one stays visible
+        cookie_token = st.context.cookies.get(SESSION_COOKIE_NAME)
+        if pending_cookie is None and cookie_token != st.session_state.get('rejected_session_token'):
+            token = cookie_token
+        if url_token:
+            token = url_token
+    if not token:
+        return
+    session = verify_token(token)
+    now = time.time()
+    if session is not None and (
+        st.session_state.get('session_token') != token
+        or now - st.session_state.get('session_checked_at', 0) >= SESSION_REVALIDATE_SECONDS
+    ):
+        if get_session_store().exists(session.session_id):
+            st.session_state['session_checked_at'] = now
+        else:
+            session = None
+    if session is None:
+        st.session_state['authenticated'] = False
+        st.session_state.pop('username', None)
+        st.session_state.pop('session_token', None)
+        st.session_state.pop('session_checked_at', None)
+        st.session_state['rejected_session_token'] = token
+        return
+    if token == url_token:
+        _write_session_cookie(token)
+    st.session_state['authenticated'] = True
+    st.session_state['username'] = session.username
+    st.session_state['session_token'] = token
+
 def is_authenticated():
     """Check if the user is authenticated."""
     return 'authenticated' in st.session_state and st.session_state['authenticated']
@@ -58,6 +151,10 @@ def get_current_user():
     else:
         return None
 
+def is_admin():
+    """Check if the logged-in user may access admin pages."""
+    return is_authenticated() and st.session_state.get('username') in ADMIN_USERNAMES
+
 def require_auth(func):
     """Decorator to require authentication for a function."""
     def wrapper(*args, **kwargs):
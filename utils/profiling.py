@@ -0,0 +1,240 @@
+# utils/profiling.py
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from config import RERUN_LOG_PATH, RERUN_TRACE_HISTORY
+
+# One JSON object per rerun, ready to be shipped to a metrics pipeline
+rerun_logger = logging.getLogger('timemanagement.rerun')
+if RERUN_LOG_PATH and not rerun_logger.handlers:
+    _handler = logging.FileHandler(RERUN_LOG_PATH)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    rerun_logger.addHandler(_handler)
+    rerun_logger.setLevel(logging.INFO)
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is unbounded
+HISTOGRAM_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+
+
+class Histogram:
+    """Fixed-bucket latency histogram."""
+
+    __slots__ = ('counts', 'count', 'total_ms', 'max_ms')
+
+    def __init__(self):
+        self.counts = [0] * len(HISTOGRAM_BUCKETS_MS)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, value_ms):
+        for index, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+            if value_ms <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.total_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def quantile(self, q):
+        """Estimate a quantile as the upper bound of the bucket that contains it."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for bound, bucket_count in zip(HISTOGRAM_BUCKETS_MS, self.counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 2) if self.count else 0.0,
+            'p50_ms': round(self.quantile(0.5), 2),
+            'p95_ms': round(self.quantile(0.95), 2),
+            'max_ms': round(self.max_ms, 2),
+        }
+
+
+class RerunTracer:
+    """Collects per-rerun timings for the whole server process."""
+
+    def __init__(self):
+        self.rerun_by_page = {}
+        self.rerun_by_cause = {}
+        self.chart_by_name = {}
+        self.recent = deque(maxlen=RERUN_TRACE_HISTORY)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def current(self):
+        """The trace of the rerun running on this thread, if any."""
+        return getattr(self._local, 'trace', None)
+
+    @contextmanager
+    def trace(self, section=None):
+        """Trace one script run, or with section one fragment rerun, recording its cause, page and duration."""
+        trace = {
+            'timestamp': datetime.now().isoformat(),
+            'cause': 'fragment' if section else st.session_state.pop('_rerun_cause', None),
+            'page': None,
+            'duration_ms': 0.0,
+            'charts': [],
+        }
+        self._local.trace = trace
+        start = time.perf_counter()
+        try:
+            yield trace
+        except BaseException as e:
+            # st.rerun() interrupts the script with a RerunException
+            if type(e).__name__ == 'RerunException':
+                st.session_state.setdefault('_rerun_cause', 'rerun')
+            raise
+        finally:
+            trace['duration_ms'] = round((time.perf_counter() - start) * 1000, 3)
+            page = st.session_state.get('navigation')
+            if section:
+                # Fragment reruns are histogrammed per section and leave the page tracking alone
+                trace['page'] = f'{page}/{section}'
+            else:
+                trace['page'] = page
+                trace['cause'] = trace['cause'] or _infer_rerun_cause(page)
+                st.session_state['_trace_last_page'] = page
+            self._local.trace = None
+            self._record(trace)
+
+    def record_chart(self, name, duration_ms):
+        """Attribute chart rendering time to the current rerun."""
+        trace = self.current
+        if trace is not None:
+            trace['charts'].append({'name': name, 'duration_ms': round(duration_ms, 3)})
+        with self._lock:
+            self.chart_by_name.setdefault(name, Histogram()).observe(duration_ms)
+
+    def _record(self, trace):
+        with self._lock:
+            self.rerun_by_page.setdefault(trace['page'], Histogram()).observe(trace['duration_ms'])
+            self.rerun_by_cause.setdefault(trace['cause'], Histogram()).observe(trace['duration_ms'])
+            self.recent.append(trace)
+        rerun_logger.info(json.dumps(trace, default=str))
+
+    def summary(self):
+        """Return the histograms as plain dictionaries."""
+        with self._lock:
+            return {
+                'by_page': {str(k): v.as_dict() for k, v in self.rerun_by_page.items()},
+                'by_cause': {k: v.as_dict() for k, v in self.rerun_by_cause.items()},
+                'charts': {k: v.as_dict() for k, v in self.chart_by_name.items()},
+            }
+
+    def last_trace(self):
+        with self._lock:
+            return self.recent[-1] if self.recent else None
+
+
+def _infer_rerun_cause(page):
+    """Work out why an unlabelled script run happened, once its page is known."""
+    if '_trace_last_page' not in st.session_state:
+        return 'initial'
+    if page != st.session_state['_trace_last_page']:
+        return 'navigation'
+    return 'widget'
+
+
+# Shared tracer for every session served by this process
+tracer = RerunTracer()
+
+_original_plotly_chart = None
+
+
+def instrument_streamlit():
+    """Wrap st.plotly_chart so each chart's render time is recorded."""
+    global _original_plotly_chart
+    if _original_plotly_chart is not None:
+        return
+    _original_plotly_chart = st.plotly_chart
+
+    @wraps(_original_plotly_chart)
+    def timed_plotly_chart(figure_or_data, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return _original_plotly_chart(figure_or_data, *args, **kwargs)
+        finally:
+            tracer.record_chart(_chart_name(figure_or_data), (time.perf_counter() - start) * 1000)
+
+    st.plotly_chart = timed_plotly_chart
+
+
+def _chart_name(figure):
+    try:
+        title = figure.layout.title.text
+    except AttributeError:
+        title = None
+    if not title and isinstance(figure, dict):
+        title = figure.get('layout', {}).get('title', {}).get('text')
+    return title or 'untitled'
+
+
+def traced_fragment(func=None, *, run_every=None):
+    """
+    st.fragment that also traces its own reruns.
+
+    When the whole script runs, the fragment is part of that trace. When only
+    the fragment reruns (a widget inside it, or run_every), app.main is
+    skipped, so the rerun is traced here under '<page>/<function name>' with
+    cause 'fragment'.
+    """
+    def decorator(func):
+        @wraps(func)
+        def run(*args, **kwargs):
+            ctx = get_script_run_ctx()
+            if tracer.current is not None or ctx is None or not ctx.fragment_ids_this_run:
+                return func(*args, **kwargs)
+            with tracer.trace(section=func.__name__):
+                return func(*args, **kwargs)
+        return st.fragment(run, run_every=run_every)
+    return decorator if func is None else decorator(func)
+
+
+def set_rerun_cause(cause):
+    """Label the next rerun, e.g. before calling st.rerun()."""
+    st.session_state['_rerun_cause'] = cause
+
+
+def render_performance_panel():
+    """Render the debug performance panel in the sidebar."""
+    last = tracer.last_trace()
+    with st.sidebar.expander("Performance", expanded=False):
+        if last:
+            st.write(f"**Last rerun:** {last['duration_ms']:.1f} ms ({last['cause']}, {last['page']})")
+            for chart in last['charts']:
+                st.write(f"- {chart['name']}: {chart['duration_ms']:.1f} ms")
+        summary = tracer.summary()
+        if summary['by_page']:
+            st.write("**Reruns by page**")
+            st.table({page: stats for page, stats in summary['by_page'].items()})
+        if summary['by_cause']:
+            st.write("**Reruns by cause**")
+            st.table({cause: stats for cause, stats in summary['by_cause'].items()})
+        if summary['charts']:
+            st.write("**Charts**")
+            st.table({name: stats for name, stats in summary['charts'].items()})
+        st.download_button(
+            label="Download Summary",
+            data=json.dumps(summary, indent=2),
+            file_name='rerun_summary.json',
+            mime='application/json'
+        )
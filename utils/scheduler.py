@@ -0,0 +1,296 @@
+# utils/scheduler.py
+
+import logging
+import os
+import random
+import socket
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+
+from config import (
+    SCHEDULER_ENABLED,
+    SCHEDULER_TICK_SECONDS,
+    JOB_LOCK_TTL_SECONDS,
+    JOB_HISTORY_LIMIT,
+)
+from data.database import create_connection, rebuild_rollups, iter_shard_connections
+from data.teams import refresh_team_aggregates
+from data.maintenance import optimize, vacuum_if_needed, record_size
+from data.archive import archive_activities
+from data.changes import prune_change_log
+from utils.sessions import get_session_store
+
+logger = logging.getLogger('timemanagement.scheduler')
+
+# Identifies this process in job_locks
+OWNER_ID = f'{socket.gethostname()}:{os.getpid()}'
+
+
+class Job:
+    """A registered background job; func receives a fresh database connection."""
+
+    __slots__ = ('name', 'func', 'interval', 'jitter', 'description', 'next_run')
+
+    def __init__(self, name, func, interval, jitter, description):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.description = description
+        self.next_run = None
+
+    def schedule_next(self, now):
+        # Jitter spreads runs out so several server processes do not all fire together
+        self.next_run = now + self.interval + random.uniform(0, self.jitter)
+
+
+_jobs = {}
+
+
+def register_job(name, interval, jitter=0, description=None):
+    """
+    Decorator registering a function as a background job.
+
+    Args:
+        name (str): Unique job name, used in history and on the command line.
+        interval (float): Seconds between runs.
+        jitter (float): Up to this many extra seconds are added to every interval.
+        description (str): Shown by the CLI; defaults to the function's docstring.
+    """
+    def decorator(func):
+        _jobs[name] = Job(name, func, interval, jitter, description or (func.__doc__ or '').strip())
+        return func
+    return decorator
+
+
+def get_jobs():
+    return dict(_jobs)
+
+
+def _acquire_lock(conn, name):
+    """Take the job's lease in job_locks; returns False if another run holds it."""
+    now = time.time()
+    cursor = conn.cursor()
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        cursor.execute('SELECT owner, expires_at FROM job_locks WHERE job_name = ?', (name,))
+        row = cursor.fetchone()
+        if row is not None and row[1] > now:
+            conn.rollback()
+            return False
+        cursor.execute('''
+            INSERT INTO job_locks (job_name, owner, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(job_name) DO UPDATE SET owner=excluded.owner, expires_at=excluded.expires_at
+        ''', (name, OWNER_ID, now + JOB_LOCK_TTL_SECONDS))
+        conn.commit()
+        return True
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _release_lock(conn, name):
+    conn.execute('DELETE FROM job_locks WHERE job_name = ? AND owner = ?', (name, OWNER_ID))
+    conn.commit()
+
+
+def run_job(name, trigger='manual'):
+    """
+    Run one job now, unless a run of it is already in progress anywhere.
+
+    Returns the run's status: 'success', 'failed' or 'skipped'.
+    """
+    job = _jobs[name]
+    conn = create_connection()
+    try:
+        if not _acquire_lock(conn, name):
+            logger.info('Job %s skipped: already running', name)
+            return 'skipped'
+        started_at = datetime.now().isoformat()
+        start = time.perf_counter()
+        status, error = 'success', None
+        try:
+            job.func(conn)
+        except Exception:
+            status, error = 'failed', traceback.format_exc()
+            logger.exception('Job %s failed', name)
+        finally:
+            # Commit or discard anything the job left open before recording the run
+            if status == 'failed':
+                conn.rollback()
+            else:
+                conn.commit()
+            conn.execute('''
+                INSERT INTO job_runs (job_name, trigger, status, started_at, finished_at, duration_ms, error)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (name, trigger, status, started_at, datetime.now().isoformat(),
+                  round((time.perf_counter() - start) * 1000, 3), error))
+            conn.execute('''
+                DELETE FROM job_runs WHERE job_name = ? AND run_id <= (
+                    SELECT run_id FROM job_runs WHERE job_name = ?
+                    ORDER BY run_id DESC LIMIT 1 OFFSET ?
+                )
+            ''', (name, name, JOB_HISTORY_LIMIT))
+            conn.commit()
+            _release_lock(conn, name)
+        return status
+    finally:
+        conn.close()
+
+
+def get_job_history(name=None, limit=50):
+    """Get recent (run_id, job_name, trigger, status, started_at, duration_ms, error) rows, newest first."""
+    conn = create_connection()
+    query = 'SELECT run_id, job_name, trigger, status, started_at, duration_ms, error FROM job_runs'
+    params = []
+    if name:
+        query += ' WHERE job_name = ?'
+        params.append(name)
+    rows = conn.execute(query + ' ORDER BY run_id DESC LIMIT ?', params + [limit]).fetchall()
+    conn.close()
+    return rows
+
+
+class Scheduler(threading.Thread):
+    """Daemon thread running due jobs one at a time."""
+
+    def __init__(self, tick=SCHEDULER_TICK_SECONDS):
+        super().__init__(name='job-scheduler', daemon=True)
+        self.tick = tick
+        self._stop_event = threading.Event()
+
+    def run(self):
+        now = time.time()
+        for job in _jobs.values():
+            # Start each job somewhere inside its first interval, not all at once
+            job.next_run = now + random.uniform(0, job.jitter or job.interval)
+        while not self._stop_event.wait(self.tick):
+            now = time.time()
+            for job in list(_jobs.values()):
+                if job.next_run is None or now < job.next_run:
+                    continue
+                try:
+                    run_job(job.name, trigger='schedule')
+                except Exception:
+                    logger.exception('Scheduler could not run %s', job.name)
+                job.schedule_next(time.time())
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def start_scheduler():
+    """Start the scheduler thread once per server process (no-op if disabled or already running)."""
+    global _scheduler
+    if not SCHEDULER_ENABLED:
+        return None
+    with _scheduler_lock:
+        if _scheduler is None or not _scheduler.is_alive():
+            _scheduler = Scheduler()
+            _scheduler.start()
+        return _scheduler
+
+
+# Built-in maintenance and precomputation jobs
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+
+@register_job('rebuild_rollups', interval=DAY, jitter=HOUR)
+def rebuild_rollups_job(conn):
+    """Recompute the daily activity rollups from the activities table."""
+    rebuild_rollups(conn)
+    for shard_conn in iter_shard_connections():
+        rebuild_rollups(shard_conn)
+
+
+@register_job('optimize', interval=DAY, jitter=HOUR)
+def optimize_job(conn):
+    """Refresh planner statistics with PRAGMA optimize."""
+    optimize(conn)
+    for shard_conn in iter_shard_connections():
+        optimize(shard_conn)
+
+
+@register_job('analyze', interval=7 * DAY, jitter=6 * HOUR)
+def analyze_job(conn):
+    """Run a full ANALYZE of every table and index."""
+    conn.execute('ANALYZE')
+    for shard_conn in iter_shard_connections():
+        shard_conn.execute('ANALYZE')
+
+
+@register_job('vacuum', interval=DAY, jitter=HOUR)
+def vacuum_job(conn):
+    """Release free pages once the freelist passes its thresholds."""
+    vacuum_if_needed(conn)
+    for shard_conn in iter_shard_connections():
+        vacuum_if_needed(shard_conn)
+
+
+@register_job('record_db_size', interval=HOUR, jitter=5 * 60)
+def record_db_size_job(conn):
+    """Sample page counts and file sizes into db_size_history."""
+    record_size(conn)
+
+
+@register_job('wal_checkpoint', interval=HOUR, jitter=5 * 60)
+def wal_checkpoint_job(conn):
+    """Checkpoint and truncate the write-ahead log (only in WAL mode)."""
+    if conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal':
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+
+@register_job('purge_sessions', interval=DAY, jitter=HOUR)
+def purge_sessions_job(conn):
+    """Remove expired login sessions from the session store."""
+    get_session_store().purge_expired()
+
+
+@register_job('archive_activities', interval=DAY, jitter=HOUR)
+def archive_activities_job(conn):
+    """Move activities older than ARCHIVE_HORIZON_DAYS into yearly archive databases."""
+    archive_activities()
+
+
+@register_job('prune_change_log', interval=DAY, jitter=HOUR)
+def prune_change_log_job(conn):
+    """Delete change_log entries older than CHANGE_LOG_RETENTION_DAYS."""
+    prune_change_log(conn)
+    for shard_conn in iter_shard_connections():
+        prune_change_log(shard_conn)
+
+
+@register_job('warm_team_aggregates', interval=15 * 60, jitter=60)
+def warm_team_aggregates_job(conn):
+    """Refresh cached team dashboards so the next page load is incremental."""
+    refresh_team_aggregates()
+
+
+if __name__ == '__main__':
+    # Usage: python -m utils.scheduler [list | run <job> | history [job]]
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else 'list'
+    if command == 'list':
+        for job in _jobs.values():
+            print(f"{job.name:<24} every {job.interval:>7}s (+{job.jitter}s jitter)  {job.description}")
+    elif command == 'run' and len(sys.argv) > 2:
+        name = sys.argv[2]
+        if name not in _jobs:
+            sys.exit(f"Unknown job: {name}")
+        status = run_job(name)
+        print(f"{name}: {status}")
+        sys.exit(0 if status != 'failed' else 1)
+    elif command == 'history':
+        for run_id, job_name, trigger, status, started_at, duration_ms, error in get_job_history(sys.argv[2] if len(sys.argv) > 2 else None):
+            print(f"{run_id:>6} {started_at} {job_name:<24} {trigger:<8} {status:<8} {duration_ms or 0:>10.1f} ms")
+    else:
+        sys.exit("Usage: python -m utils.scheduler [list | run <job> | history [job]]")
@@ -0,0 +1,204 @@
+# utils/sessions.py
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from config import SECRET_KEY, SESSION_TTL_SECONDS, SESSION_STORE, SESSION_STORE_DIRECTORY
+from data import create_connection
+
+if SECRET_KEY == 'your-secret-key':
+    print("Warning: SECRET_KEY is the default value; set it (the same on every app node) before deploying")
+
+
+class SessionToken:
+    """The verified contents of a session token."""
+
+    __slots__ = ('user_id', 'username', 'expires_at', 'session_id')
+
+    def __init__(self, user_id, username, expires_at, session_id):
+        self.user_id = user_id
+        self.username = username
+        self.expires_at = expires_at
+        self.session_id = session_id
+
+
+class SessionStore(ABC):
+    """
+    Server-side record of issued sessions, shared by every app node.
+
+    Tokens are verified from their signature alone; the store is consulted
+    when a browser session first presents a token and again every
+    SESSION_REVALIDATE_SECONDS, so logging out revokes a token everywhere.
+    """
+
+    @abstractmethod
+    def save(self, session_id, user_id, expires_at):
+        """Record a newly issued session."""
+
+    @abstractmethod
+    def exists(self, session_id):
+        """Whether the session was issued, not revoked and has not expired."""
+
+    @abstractmethod
+    def delete(self, session_id):
+        """Revoke a session; deleting an unknown session is not an error."""
+
+    @abstractmethod
+    def purge_expired(self, now=None):
+        """Forget expired sessions; returns how many were removed."""
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in the sessions table of the application database."""
+
+    def save(self, session_id, user_id, expires_at):
+        conn = create_connection()
+        try:
+            conn.execute('INSERT INTO sessions (session_id, user_id, expires_at) VALUES (?, ?, ?)', (session_id, user_id, expires_at))
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error: {e}")
+            conn.rollback()
+        finally:
+            conn.close()
+
+    def exists(self, session_id):
+        conn = create_connection()
+        row = conn.execute('SELECT 1 FROM sessions WHERE session_id = ? AND expires_at > ?', (session_id, int(time.time()))).fetchone()
+        conn.close()
+        return row is not None
+
+    def delete(self, session_id):
+        conn = create_connection()
+        conn.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+        conn.commit()
+        conn.close()
+
+    def purge_expired(self, now=None):
+        conn = create_connection()
+        cursor = conn.execute('DELETE FROM sessions WHERE expires_at <= ?', (int(now or time.time()),))
+        conn.commit()
+        conn.close()
+        return cursor.rowcount
+
+
+class FileSessionStore(SessionStore):
+    """One small file per session in a directory, e.g. on storage shared by the nodes."""
+
+    def __init__(self, directory=SESSION_STORE_DIRECTORY):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session_id):
+        return os.path.join(self.directory, session_id)
+
+    def save(self, session_id, user_id, expires_at):
+        with open(self._path(session_id), 'w') as f:
+            json.dump({'user_id': user_id, 'expires_at': expires_at}, f)
+
+    def exists(self, session_id):
+        try:
+            with open(self._path(session_id)) as f:
+                return json.load(f)['expires_at'] > time.time()
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def delete(self, session_id):
+        try:
+            os.remove(self._path(session_id))
+        except FileNotFoundError:
+            pass
+
+    def purge_expired(self, now=None):
+        now = now or time.time()
+        removed = 0
+        for session_id in os.listdir(self.directory):
+            try:
+                with open(self._path(session_id)) as f:
+                    expired = json.load(f)['expires_at'] <= now
+            except (OSError, ValueError, KeyError):
+                expired = True
+            if expired:
+                self.delete(session_id)
+                removed += 1
+        return removed
+
+
+SESSION_STORES = {
+    'sqlite': SQLiteSessionStore,
+    'file': FileSessionStore,
+}
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """Return the process-wide store selected by SESSION_STORE."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SESSION_STORES[SESSION_STORE]()
+        return _store
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _sign(payload):
+    return hmac.new(SECRET_KEY.encode('utf-8'), payload.encode('ascii'), hashlib.sha256).digest()
+
+
+def issue_token(user_id, username, ttl=SESSION_TTL_SECONDS):
+    """Create a session for the user and return its signed token."""
+    session_id = secrets.token_urlsafe(16)
+    expires_at = int(time.time()) + ttl
+    get_session_store().save(session_id, user_id, expires_at)
+    payload = _b64encode(json.dumps([user_id, username, expires_at, session_id], separators=(',', ':')).encode('utf-8'))
+    return f'{payload}.{_b64encode(_sign(payload))}'
+
+
+def verify_token(token):
+    """
+    Check a token's signature and expiry without touching any store.
+
+    Returns a SessionToken, or None for tampered, malformed or expired tokens.
+    """
+    try:
+        payload, signature = token.split('.')
+        if not hmac.compare_digest(_b64decode(signature), _sign(payload)):
+            return None
+        session = SessionToken(*json.loads(_b64decode(payload)))
+    except (ValueError, TypeError):
+        return None
+    if session.expires_at <= time.time():
+        return None
+    return session
+
+
+def revoke_token(token):
+    """Delete the token's session from the store, so other nodes stop accepting it."""
+    session = verify_token(token)
+    if session is not None:
+        get_session_store().delete(session.session_id)
+
+
+if __name__ == '__main__':
+    # Usage: python -m utils.sessions purge
+    if sys.argv[1:] != ['purge']:
+        sys.exit("Usage: python -m utils.sessions purge")
+    print(f"{get_session_store().purge_expired()} expired sessions removed")